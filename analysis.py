@@ -0,0 +1,342 @@
+import numpy as np
+from parse import DATA_SECTION, TIME_COLUMN, parse_items, split_value_units
+
+VOLTAGE_COLUMN = "Vout(mv)"
+CURRENT_COLUMN = "Iout(mA)"
+# Перепад времени больше интервала во столько раз считается началом состояния покоя
+REST_JUMP_FACTOR = 5
+# Допуски полного цикла: на момент начала и на момент окончания
+FULL_START_TOLERANCE = 0.10
+FULL_END_TOLERANCE = 0.02
+
+def get_voltage_limits(items):
+    """Минимальное и максимальное напряжение батареи в мВ: DV * Cells и CV * Cells"""
+    cells, _ = split_value_units(items.get("Cells", ""))
+    dv, _ = split_value_units(items.get("DV", ""))
+    cv, _ = split_value_units(items.get("CV", ""))
+    if not cells:
+        return None, None
+    v_min = dv * cells if dv else None
+    v_max = cv * cells if cv else None
+    return v_min, v_max
+
+def detect_interval(dt):
+    """Интервал записи лога - самый частый положительный шаг времени"""
+    steps = dt[dt > 0]
+    if not steps.size:
+        return 1
+    values, counts = np.unique(steps, return_counts=True)
+    return int(values[np.argmax(counts)])
+
+def segment_cycles(time):
+    """
+    Делит столбец времени на циклы и состояния покоя.
+    Цикл начинается со сброса времени в 0:0:0, покой - с резкого перепада времени внутри цикла.
+    """
+    time = np.asarray(time, dtype=np.int64)
+    n = len(time)
+    index = np.arange(n)
+    dt = np.diff(time)
+    interval = detect_interval(dt)
+
+    reset = np.zeros(n, dtype=bool)
+    if n:
+        reset[0] = time[0] == 0
+    reset[1:] = (time[1:] == 0) & (time[:-1] != 0)
+
+    jump = np.zeros(n, dtype=bool)
+    jump[1:] = ((dt <= 0) | (dt > REST_JUMP_FACTOR * interval)) & ~reset[1:]
+
+    starts = np.flatnonzero(reset)
+    segment_start = np.maximum.accumulate(np.where(reset, index, 0)) if n else index
+    jumps = np.cumsum(jump)
+    working = (jumps - jumps[segment_start]) == 0
+    working[:starts[0] if starts.size else n] = False
+    if starts.size:
+        ends = starts + np.add.reduceat(working.astype(np.int64), starts)
+    else:
+        ends = starts.copy()
+
+    # Нормализованная шкала без разрывов: на месте перепада берется интервал записи
+    steps = np.where((dt > 0) & ~jump[1:] & ~reset[1:], dt, interval)
+    normalized = np.concatenate(([0], np.cumsum(steps))) if n else np.zeros(0, dtype=np.int64)
+
+    return {
+        'interval': interval,
+        'starts': starts,
+        'ends': ends,
+        'working': working,
+        'segment_start': segment_start,
+        'reset': reset,
+        'time': normalized,
+    }
+
+def integrate_cycles(time, voltage, current, segments):
+    """
+    Считает мощность |I|*V и накопленные в пределах цикла ёмкость (Ач) и энергию (Втч)
+    методом трапеций; в состоянии покоя значения равны нулю.
+    """
+    n = len(time)
+    voltage = np.asarray(voltage, dtype=np.float64)
+    current = np.abs(np.asarray(current, dtype=np.float64))
+    power = current * voltage / 1e6
+    working = segments['working']
+
+    same_cycle = np.zeros(n, dtype=bool)
+    same_cycle[1:] = working[1:] & working[:-1] & ~segments['reset'][1:]
+    dt_hours = np.zeros(n)
+    dt_hours[1:] = np.where(same_cycle[1:], np.diff(np.asarray(time, dtype=np.float64)), 0) / 3600
+
+    capacity_step = np.zeros(n)
+    capacity_step[1:] = (current[1:] + current[:-1]) / 2000 * dt_hours[1:]
+    energy_step = np.zeros(n)
+    energy_step[1:] = (power[1:] + power[:-1]) / 2 * dt_hours[1:]
+
+    segment_start = segments['segment_start']
+    capacity = np.cumsum(capacity_step)
+    capacity -= capacity[segment_start]
+    energy = np.cumsum(energy_step)
+    energy -= energy[segment_start]
+    capacity[~working] = 0
+    energy[~working] = 0
+    return power, capacity, energy
+
+def analyze_log(sections):
+    """Полный анализ секции Data: разбиение на циклы, интегралы и сводка по каждому циклу"""
+    data = sections.get(DATA_SECTION) or {}
+    items = parse_items(sections.get("Items", []))
+    v_min, v_max = get_voltage_limits(items)
+
+    time = np.asarray(data.get(TIME_COLUMN, []), dtype=np.int64)
+    voltage = np.asarray(data.get(VOLTAGE_COLUMN, np.zeros(len(time))), dtype=np.float64)
+    current = np.asarray(data.get(CURRENT_COLUMN, np.zeros(len(time))), dtype=np.float64)
+
+    segments = segment_cycles(time)
+    power, capacity, energy = integrate_cycles(time, voltage, current, segments)
+    starts, ends = segments['starts'], segments['ends']
+    last = ends - 1
+
+    charge = np.add.reduceat(np.where(segments['working'], current, 0), starts) > 0 if starts.size else np.zeros(0, dtype=bool)
+    start_voltage = voltage[starts]
+    end_voltage = voltage[last]
+    if v_min and v_max:
+        low_start = np.abs(start_voltage - v_min) <= FULL_START_TOLERANCE * v_min
+        high_start = np.abs(start_voltage - v_max) <= FULL_START_TOLERANCE * v_max
+        low_end = np.abs(end_voltage - v_min) <= FULL_END_TOLERANCE * v_min
+        high_end = np.abs(end_voltage - v_max) <= FULL_END_TOLERANCE * v_max
+        full = np.where(charge, low_start & high_end, high_start & low_end)
+    else:
+        full = np.zeros(len(starts), dtype=bool)
+
+    normalized = segments['time']
+    durations = normalized[last] - normalized[starts]
+    cycles = []
+    for i in range(len(starts)):
+        cycles.append({
+            'number': i + 1,
+            'type': "charge" if charge[i] else "discharge",
+            'full': bool(full[i]),
+            'start': int(starts[i]),
+            'end': int(ends[i]),
+            'duration': float(durations[i]),
+            'start_voltage': float(start_voltage[i]) / 1000,
+            'end_voltage': float(end_voltage[i]) / 1000,
+            'capacity': float(capacity[last[i]]),
+            'energy': float(energy[last[i]]),
+        })
+
+    return {
+        'items': items,
+        'v_min': v_min,
+        'v_max': v_max,
+        'interval': segments['interval'],
+        'time': normalized,
+        'working': segments['working'],
+        'power': power,
+        'capacity': capacity,
+        'energy': energy,
+        'cycles': cycles,
+        'total_time': float(normalized[-1]) if len(normalized) else 0.0,
+    }
+
+def _value_stats(values, unit):
+    values = [round(v, 3) for v in values]
+    if not values:
+        return {"average": 0, "spread": 0, "values": [], "unit": unit}
+    average = float(np.mean(values))
+    spread = (max(values) - min(values)) / average * 100 if len(values) > 1 and average else 0.0
+    return {"average": average, "spread": spread, "values": values, "unit": unit}
+
+def battery_parameters(analysis):
+    """
+    Итоговые параметры теста. Ёмкость и энергия усредняются по полным циклам,
+    а если полных циклов нет - по всем циклам соответствующего типа.
+    """
+    parameters = {}
+    for kind, suffix in (("charge", "Chg"), ("discharge", "Dsc")):
+        cycles = [c for c in analysis['cycles'] if c['type'] == kind]
+        full = [c for c in cycles if c['full']]
+        measured = full or cycles
+        parameters['Cap' + suffix] = _value_stats([c['capacity'] * 1000 for c in measured], "mAh")
+        parameters['Ene' + suffix] = _value_stats([c['energy'] * 1000 for c in measured], "mWh")
+        parameters['Time' + suffix] = _value_stats([c['duration'] / 3600 for c in full], "hours")
+        parameters['Cyc' + suffix] = len(cycles)
+        parameters['Cyc' + suffix + 'Full'] = len(full)
+    parameters['TimeTotal'] = round(analysis['total_time'] / 3600, 2)
+    return parameters
+
+class IncrementalAnalysis:
+    """
+    Анализ лога по мере дописывания: update() принимает только новые строки Data
+    и продолжает разбиение на циклы и интегралы с того места, где остановился.
+    Интервал записи уточняется по всем шагам времени, уже принятые решения не пересматриваются.
+    """
+
+    def __init__(self, items=None):
+        self.items = items or {}
+        self.v_min, self.v_max = get_voltage_limits(self.items)
+        self.rows = 0
+        self.step_counts = {}
+        self.interval = 1
+        self.cycles = []
+        # Состояние на последней принятой строке
+        self.last_time = None
+        self.last_current = 0.0
+        self.last_power = 0.0
+        self.working = False
+        self.normalized = 0
+        self.capacity = 0.0
+        self.energy = 0.0
+
+    def set_items(self, items):
+        self.items = items
+        self.v_min, self.v_max = get_voltage_limits(items)
+
+    def _update_interval(self, dt):
+        values, counts = np.unique(dt[dt > 0], return_counts=True)
+        for value, count in zip(values.tolist(), counts.tolist()):
+            self.step_counts[value] = self.step_counts.get(value, 0) + count
+        if self.step_counts:
+            self.interval = max(self.step_counts, key=self.step_counts.get)
+
+    def update(self, data):
+        """Добавляет новые строки (словарь столбцов как у parse_sections_file); возвращает номера изменённых циклов"""
+        time = np.asarray(data.get(TIME_COLUMN, []), dtype=np.int64)
+        n = len(time)
+        if not n:
+            return []
+        voltage = np.asarray(data.get(VOLTAGE_COLUMN, np.zeros(n)), dtype=np.float64)
+        signed_current = np.asarray(data.get(CURRENT_COLUMN, np.zeros(n)), dtype=np.float64)
+        current = np.abs(signed_current)
+        power = current * voltage / 1e6
+        index = np.arange(n)
+
+        first = self.last_time is None
+        previous = time[0] if first else self.last_time
+        dt = np.diff(time, prepend=previous)
+        self._update_interval(dt[1:] if first else dt)
+        interval = self.interval
+
+        reset = (time == 0) & (np.concatenate(([previous], time[:-1])) != 0)
+        if first:
+            reset[0] = time[0] == 0
+        jump = ((dt <= 0) | (dt > REST_JUMP_FACTOR * interval)) & ~reset
+        if first:
+            jump[0] = False
+
+        # Строки до первого сброса продолжают текущий цикл
+        segment_start = np.maximum.accumulate(np.where(reset, index, -1))
+        in_new = segment_start >= 0
+        jumps = np.cumsum(jump)
+        base = np.where(in_new, jumps[np.maximum(segment_start, 0)], 0)
+        working = (jumps - base == 0) & (in_new | self.working)
+
+        previous_working = np.concatenate(([self.working], working[:-1]))
+        same_cycle = working & previous_working & ~reset
+        if first:
+            same_cycle[0] = False
+        dt_hours = np.where(same_cycle, dt, 0) / 3600
+        previous_current = np.concatenate(([self.last_current], current[:-1]))
+        previous_power = np.concatenate(([self.last_power], power[:-1]))
+        capacity = np.cumsum((current + previous_current) / 2000 * dt_hours)
+        energy = np.cumsum((power + previous_power) / 2 * dt_hours)
+        # Накопленное внутри цикла: от начала пачки или от строки сброса
+        capacity_base = np.where(in_new, capacity[np.maximum(segment_start, 0)], -self.capacity)
+        energy_base = np.where(in_new, energy[np.maximum(segment_start, 0)], -self.energy)
+        capacity -= capacity_base
+        energy -= energy_base
+
+        steps = np.where((dt > 0) & ~jump & ~reset, dt, interval)
+        if first:
+            steps[0] = 0
+        normalized = self.normalized + np.cumsum(steps)
+
+        changed = []
+        cycle_of_row = len(self.cycles) - 1 + np.cumsum(reset)
+        for start in np.flatnonzero(reset).tolist():
+            self.cycles.append({
+                'number': len(self.cycles) + 1,
+                'start': self.rows + start,
+                'end': self.rows + start,
+                'start_voltage': float(voltage[start]) / 1000,
+                'start_time': float(normalized[start]),
+                'current_sum': 0.0,
+            })
+        rows = np.flatnonzero(working)
+        if rows.size:
+            bounds = np.flatnonzero(np.diff(cycle_of_row[rows])) + 1
+            for group in np.split(rows, bounds):
+                cycle = self.cycles[int(cycle_of_row[group[0]])]
+                last = group[-1]
+                cycle['end'] = self.rows + int(last) + 1
+                cycle['end_voltage'] = float(voltage[last]) / 1000
+                cycle['duration'] = float(normalized[last]) - cycle['start_time']
+                cycle['capacity'] = float(capacity[last])
+                cycle['energy'] = float(energy[last])
+                cycle['current_sum'] += float(signed_current[group].sum())
+                changed.append(cycle['number'])
+
+        self.rows += n
+        self.last_time = int(time[-1])
+        self.last_current = float(current[-1])
+        self.last_power = float(power[-1])
+        self.working = bool(working[-1])
+        self.normalized = int(normalized[-1])
+        self.capacity = float(capacity[-1]) if self.working else 0.0
+        self.energy = float(energy[-1]) if self.working else 0.0
+        return changed
+
+    def cycle_stats(self):
+        """Сводка по циклам в том же виде, что и analysis['cycles'] у analyze_log"""
+        cycles = []
+        for cycle in self.cycles:
+            charge = cycle['current_sum'] > 0
+            start_voltage = cycle['start_voltage'] * 1000
+            end_voltage = cycle.get('end_voltage', cycle['start_voltage']) * 1000
+            full = False
+            if self.v_min and self.v_max:
+                if charge:
+                    full = (abs(start_voltage - self.v_min) <= FULL_START_TOLERANCE * self.v_min
+                            and abs(end_voltage - self.v_max) <= FULL_END_TOLERANCE * self.v_max)
+                else:
+                    full = (abs(start_voltage - self.v_max) <= FULL_START_TOLERANCE * self.v_max
+                            and abs(end_voltage - self.v_min) <= FULL_END_TOLERANCE * self.v_min)
+            cycles.append({
+                'number': cycle['number'],
+                'type': "charge" if charge else "discharge",
+                'full': bool(full),
+                'start': cycle['start'],
+                'end': cycle['end'],
+                'duration': cycle.get('duration', 0.0),
+                'start_voltage': cycle['start_voltage'],
+                'end_voltage': end_voltage / 1000,
+                'capacity': cycle.get('capacity', 0.0),
+                'energy': cycle.get('energy', 0.0),
+            })
+        return cycles
+
+    def summary(self):
+        """Данные для battery_parameters: циклы и общее время"""
+        return {'items': self.items, 'v_min': self.v_min, 'v_max': self.v_max,
+                'interval': self.interval, 'cycles': self.cycle_stats(),
+                'total_time': float(self.normalized)}
@@ -0,0 +1,137 @@
+import argparse
+import contextlib
+import glob
+import io
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fleet_db import FLEET_DB
+from log_io import COMPRESSED_EXTENSIONS
+import tracing
+
+LOG_EXTENSIONS = (".tsv",) + tuple(".tsv" + extension for extension in COMPRESSED_EXTENSIONS)
+
+def collect_logs(source):
+    """Список логов: все файлы с подходящим расширением в каталоге либо файлы по glob-шаблону"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+        paths = [path for path in paths if path.lower().endswith(LOG_EXTENSIONS)]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+def report_name(tsv_path, output_dir):
+    """Имя PDF-отчёта для лога: <каталог вывода>/<имя лога>.pdf"""
+    name = os.path.basename(tsv_path)
+    for extension in LOG_EXTENSIONS:
+        if name.lower().endswith(extension):
+            name = name[:-len(extension)]
+            break
+    return os.path.join(output_dir, name + ".pdf")
+
+def render_one(tsv_path, pdf_path, quiet=True, db=None, export=None, data_format=None):
+    """
+    Строит отчёт по одному логу в рабочем процессе; ошибка не выходит за пределы файла.
+    При export в результат добавляется сводка по циклам, при data_format ('xlsx' или 'csv')
+    рядом с PDF пишется таблица столбцов Data.
+    """
+    started = time.perf_counter()
+    output = io.StringIO()
+    try:
+        from test import generate_report
+        if not tracing.enabled():
+            tracing.configure_from_env()
+        if not quiet:
+            logging.basicConfig(level=logging.INFO, format=f"[{os.getpid()}] %(message)s")
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            generate_report(tsv_path, pdf_path, db)
+            cycles = None
+            if export or data_format:
+                from export import export_log
+                data_path = os.path.splitext(pdf_path)[0] + "." + data_format if data_format else None
+                cycles = export_log(tsv_path, data_path)
+        # Рабочие процессы пула завершаются без atexit, поэтому трасса пишется после каждого отчёта
+        tracing.flush()
+        return {'log': tsv_path, 'pdf': pdf_path, 'ok': True, 'error': None, 'cycles': cycles,
+                'seconds': time.perf_counter() - started}
+    except Exception as e:
+        return {'log': tsv_path, 'pdf': pdf_path, 'ok': False,
+                'error': f"{e}\n{traceback.format_exc()}",
+                'seconds': time.perf_counter() - started}
+
+def run_batch(source, output_dir="reports", workers=None, quiet=True, db=None, export=None, data_format=None):
+    """
+    Параллельно строит PDF-отчёты по всем найденным логам и печатает сводку.
+    Если задан db, сводки по циклам каждого лога пишутся в базу fleet_db.
+    Если задан export (.xlsx или .csv), сводки по циклам дописываются в эту таблицу по мере готовности логов.
+    """
+    logs = collect_logs(source)
+    if not logs:
+        print(f"Логи не найдены: {source}")
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"Найдено логов: {len(logs)}, процессов: {workers}")
+
+    started = time.perf_counter()
+    results = []
+    table = None
+    if export:
+        from export import CYCLE_COLUMNS, TableExport
+        table = TableExport(export, single_sheet=True)
+        table.add_sheet("Cycles", CYCLE_COLUMNS)
+    with ProcessPoolExecutor(max_workers=workers) as executor, table or contextlib.nullcontext():
+        futures = {executor.submit(render_one, path, report_name(path, output_dir), quiet, db,
+                                   export, data_format): path
+                   for path in logs}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Падение самого рабочего процесса
+                result = {'log': futures[future], 'pdf': None, 'ok': False,
+                          'error': str(e), 'seconds': 0.0}
+            results.append(result)
+            if table and result.get('cycles'):
+                table.extend("Cycles", result['cycles'])
+                table.flush()
+            status = "OK" if result['ok'] else "ОШИБКА"
+            print(f"[{done}/{len(logs)}] {status} {result['log']} ({result['seconds']:.2f} s)")
+
+    failed = [r for r in results if not r['ok']]
+    print("\n" + "=" * 70)
+    print(f"Готово: {len(results) - len(failed)} из {len(results)} за {time.perf_counter() - started:.2f} s")
+    for result in failed:
+        print(f"\n{result['log']}:\n{result['error']}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетное построение PDF-отчётов по логам зарядного устройства")
+    parser.add_argument("source", help="каталог с логами или glob-шаблон, например '4.1/data/*.tsv'")
+    parser.add_argument("-o", "--output", default="reports", help="каталог для PDF-отчётов")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="не подавлять вывод рабочих процессов")
+    parser.add_argument("--db", default=FLEET_DB, help="база SQLite для сводок по циклам")
+    parser.add_argument("--no-db", action="store_true", help="не сохранять сводки в базу")
+    parser.add_argument("--export", help="сводка по циклам всех логов в один файл .xlsx или .csv")
+    parser.add_argument("--export-data", choices=("xlsx", "csv"), help="таблица Data каждого лога рядом с его PDF")
+    parser.add_argument("--trace", help="записать трассу этапов в JSON (по файлу на рабочий процесс)")
+    parser.add_argument("--trace-format", choices=("json", "chrome"), default="json", help="формат трассы")
+    parser.add_argument("--trace-memory", action="store_true", help="добавить в трассу пик памяти (tracemalloc)")
+    parser.add_argument("--profile", help="дамп cProfile (по файлу на рабочий процесс)")
+    args = parser.parse_args()
+    # Рабочие процессы включают трассировку при импорте tracing по переменным окружения
+    if args.trace:
+        os.environ["REPORT_TRACE"] = os.path.abspath(args.trace)
+        os.environ["REPORT_TRACE_FORMAT"] = args.trace_format
+        os.environ["REPORT_TRACE_MEMORY"] = "1" if args.trace_memory else "0"
+    if args.profile:
+        os.environ["REPORT_PROFILE"] = os.path.abspath(args.profile)
+    results = run_batch(args.source, args.output, args.workers, quiet=not args.verbose,
+                        db=None if args.no_db else args.db, export=args.export, data_format=args.export_data)
+    raise SystemExit(0 if results and all(r['ok'] for r in results) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Бенчмарки горячих путей отчёта 4.1 на синтетических логах (log_generator).
+
+    python -m pytest benchmarks                       # замер и сохранение в benchmarks/results
+    python -m pytest benchmarks --benchmark-compare   # сравнение с последним сохранённым прогоном
+    BENCH_ROWS=10000,100000,1000000,10000000 python -m pytest benchmarks
+
+Сгенерированные логи кэшируются в benchmarks/.data и используются повторно.
+"""
+import os
+import sys
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from log_generator import write_log
+
+DATA_DIR = os.environ.get("BENCH_DATA_DIR", os.path.join(BENCH_DIR, ".data"))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SIZES = [int(size) for size in os.environ.get("BENCH_ROWS", "10000,100000").split(",")]
+
+def pytest_configure(config):
+    # Результаты каждого прогона сохраняются рядом с бенчмарками, чтобы сравнивать версии
+    if hasattr(config.option, "benchmark_autosave"):
+        if not config.option.benchmark_autosave:
+            from pytest_benchmark.utils import get_tag
+            config.option.benchmark_autosave = get_tag()
+        if config.option.benchmark_storage == "file://./.benchmarks":
+            config.option.benchmark_storage = "file://" + RESULTS_DIR
+
+def pytest_generate_tests(metafunc):
+    if "rows" in metafunc.fixturenames:
+        metafunc.parametrize("rows", SIZES, ids=[f"{size // 1000}k" for size in SIZES])
+
+@pytest.fixture(scope="session")
+def log_files():
+    """Синтетический лог для каждого размера: 10 циклов, интервал 1 s"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    files = {}
+    for rows in SIZES:
+        path = os.path.join(DATA_DIR, f"log_{rows}.tsv")
+        if not os.path.exists(path):
+            write_log(path, rows=rows, cycles=10, interval=1, seed=rows)
+        files[rows] = path
+    return files
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import os
+import tracemalloc
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from analysis import analyze_log
+from parse import parse_for_table, parse_sections_file
+from test import build_document_compact
+
+# Сколько раз повторять замер: большие логи - один раз
+ROUNDS = {10000: 5, 100000: 3}
+
+def _quiet(function, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+def _measure(benchmark, function, *args):
+    """Пиковая память одного вызова (tracemalloc) и время по нескольким вызовам"""
+    tracemalloc.start()
+    _quiet(function, *args)
+    benchmark.extra_info['peak_memory_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+    tracemalloc.stop()
+    rounds = ROUNDS.get(benchmark.extra_info.get('rows'), 1)
+    return benchmark.pedantic(_quiet, args=(function,) + args, rounds=rounds, iterations=1)
+
+@pytest.fixture
+def sections(log_files, rows):
+    return _quiet(parse_sections_file, log_files[rows])
+
+def test_parse_sections_file(benchmark, log_files, rows):
+    benchmark.extra_info['rows'] = rows
+    result = _measure(benchmark, parse_sections_file, log_files[rows])
+    assert len(result['Data']['Time(h/m/s)']) == rows
+
+def test_parse_for_table(benchmark, sections, rows):
+    benchmark.extra_info['rows'] = rows
+    table = _measure(benchmark, parse_for_table, sections)
+    assert len(table['Data']) == rows + 1
+
+def test_analyze_log(benchmark, sections, rows):
+    benchmark.extra_info['rows'] = rows
+    analysis = _measure(benchmark, analyze_log, sections)
+    assert len(analysis['cycles']) == 10
+
+def test_build_document_compact(benchmark, sections, rows, tmp_path):
+    benchmark.extra_info['rows'] = rows
+    tables = _quiet(parse_for_table, sections)
+    output = str(tmp_path / "report.pdf")
+    _measure(benchmark, build_document_compact, tables, output)
+    assert os.path.getsize(output) > 0
@@ -0,0 +1,68 @@
+import re
+
+# Поля свидетельства, извлекаемые из текста: общие для 4.2 (PDF) и 4.3 (страницы ФИПС)
+FIELD_COLUMNS = [
+    'Название', 'Авторы', 'Регистрационный номер', 'Номер заявки', 'Правообладатель',
+    'Дата поступления', 'Дата регистрации'
+]
+NOT_FOUND = "Не указано"
+
+MONTHS = {
+    'января': 1, 'февраля': 2, 'марта': 3, 'апреля': 4, 'мая': 5, 'июня': 6,
+    'июля': 7, 'августа': 8, 'сентября': 9, 'октября': 10, 'ноября': 11, 'декабря': 12
+}
+DATE = r'(\d{2}\.\d{2}\.\d{4}|\d{1,2}\s+[а-яё]+\s+\d{4})'
+NUMBER = r'(\d{10})'
+PERSON = re.compile(r'([А-ЯЁ][а-яё-]+(?:\s+[А-ЯЁ][а-яё-]+){1,2})\s*\([A-Z]{2}\)')
+
+def _clean(value):
+    return re.sub(r'\s+', ' ', value).strip(' ,.:;') if value else ""
+
+def normalize_date(value):
+    """Приводит дату к виду ДД.ММ.ГГГГ (OCR выдаёт даты вида '22 мая 2023 г.')"""
+    match = re.match(r'(\d{1,2})\s+([а-яё]+)\s+(\d{4})', value or "")
+    if match and match.group(2) in MONTHS:
+        return f"{int(match.group(1)):02d}.{MONTHS[match.group(2)]:02d}.{match.group(3)}"
+    return value
+
+def _search(pattern, text, group=1):
+    match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+    return match.group(group) if match else ""
+
+def _between(text, start, end):
+    return _clean(_search(start + r'\s*(.*?)\s*' + end, text))
+
+def extract_fields(text):
+    """
+    Извлекает поля свидетельства из текста страницы. Поддерживаются оба макета:
+    выписка из реестра (текстовый слой) и само свидетельство (скан после OCR).
+    """
+    fields = dict.fromkeys(FIELD_COLUMNS, "")
+    if not text:
+        return {key: NOT_FOUND for key in fields}
+
+    # Выписка из реестра: "Номер регистрации (свидетельства): ..."
+    fields['Регистрационный номер'] = (_search(r'Номер регистрации \(свидетельства\):\s*' + NUMBER, text)
+                                       or _search(r'№\s*' + NUMBER, text)
+                                       or _search(r'RU\s?' + NUMBER, text))
+    fields['Дата регистрации'] = (_search(r'Дата регистрации:\s*' + DATE, text)
+                                  or _search(r'Дата государственной регистрации.*?' + DATE, text))
+    application = re.search(r'Номер и дата поступления заявки:.*?' + NUMBER + r'\s+' + DATE, text, re.DOTALL)
+    if application:
+        fields['Номер заявки'], fields['Дата поступления'] = application.group(1), application.group(2)
+    else:
+        fields['Номер заявки'] = _search(r'Заявка\s*№\s*' + NUMBER, text)
+        fields['Дата поступления'] = _search(r'Дата поступления\s*' + DATE, text)
+
+    fields['Название'] = (_between(text, r'Название программы для ЭВМ:', r'(?:Реферат:|$)')
+                          or _between(text, r'для ЭВМ\s*№\s*\d{10}', r'Правообладател'))
+    fields['Правообладатель'] = (_between(text, r'Правообладатель\(и\):', r'Название программы')
+                                 or _between(text, r'Правообладатель:', r'Автор'))
+
+    authors_text = (_search(r'Автор\(ы\):(.*?)Правообладатель', text)
+                    or _search(r'Автор(?:\(ы\)|ы)?:(.*?)(?:Заявка|$)', text))
+    fields['Авторы'] = ", ".join(_clean(name) for name in PERSON.findall(authors_text))
+
+    for key in ('Дата регистрации', 'Дата поступления'):
+        fields[key] = normalize_date(fields[key])
+    return {key: value or NOT_FOUND for key, value in fields.items()}
@@ -0,0 +1,580 @@
+import argparse
+import csv
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unicodedata
+import numpy as np
+from cert_fields import NOT_FOUND
+
+CERT_INDEX_DIR = os.environ.get("CERT_INDEX_DIR", ".cert_index")
+INDEX_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+RECORDS_FILE = "records.jsonl"
+OFFSETS_FILE = "records.offsets"
+SEGMENT_PREFIX = "seg_"
+# Больше стольких сегментов - все сливаются в один
+MAX_SEGMENTS = 8
+# Терминов, в которые разворачивается один префикс
+MAX_EXPANSIONS = 64
+# Доля слов запроса, которые должны найтись в записи
+MIN_MATCH = 0.75
+
+# Столбец записи -> поле индекса: n - название, a - авторы, h - правообладатель,
+# x - номера и даты, s - имя файла или номер документа из ссылки
+FIELDS = {
+    'Название': 'n', 'Авторы': 'a', 'Правообладатель': 'h', 'Регистрационный номер': 'x',
+    'Номер заявки': 'x', 'Дата поступления': 'x', 'Дата регистрации': 'x',
+}
+PATH_COLUMN = 'Полный путь до файла'
+LINK_COLUMN = 'Ссылка на страницу документа'
+RECORD_COLUMNS = list(FIELDS) + [PATH_COLUMN, LINK_COLUMN, 'Тип документа']
+SEARCH_FIELDS = {'title': 'n', 'authors': 'a', 'holder': 'h', 'number': 'x', 'source': 's'}
+
+_TOKEN = re.compile(r'\d{1,2}\.\d{1,2}\.\d{4}|[^\W_]+')
+_CYRILLIC = re.compile('[а-я]')
+_DOC_NUMBER = re.compile(r'DocNumber=(\d+)')
+# Латинские буквы и цифры, которые OCR путает с похожими русскими буквами
+_LOOKALIKE = str.maketrans("aeopcxykmthb0", "аеорсхукмтнво")
+_STOPWORDS = {'в', 'во', 'на', 'с', 'со', 'для', 'по', 'от', 'к', 'ко', 'из', 'о', 'об', 'за', 'при', 'и', 'или', 'rus', 'ru'}
+_VOWELS = set("аеиоуыэюя")
+# Окончания прилагательных, существительных и возвратных глаголов (упрощённый Snowball)
+_ENDINGS = sorted({
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой", "ем", "им",
+    "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею", "иями", "ями", "ами", "ией", "иям", "ием",
+    "иях", "ев", "ов", "ье", "еи", "ии", "ям", "ам", "ах", "ях", "ию", "ью", "ия", "ья", "ся", "сь",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+}, key=len, reverse=True)
+# Женские и мужские формы фамилий приводятся к одной основе: Иванова -> иванов
+_SURNAME_ENDINGS = (("ова", "ов"), ("ева", "ев"), ("ина", "ин"), ("ына", "ын"),
+                    ("ская", "ск"), ("ский", "ск"), ("цкая", "цк"), ("цкий", "цк"))
+
+def normalize(text):
+    return unicodedata.normalize("NFKC", str(text or "")).lower().replace("ё", "е")
+
+def stem(word):
+    """Отбрасывает окончание, оставляя не меньше трёх букв и не заходя левее первой гласной"""
+    if len(word) <= 3 or not _CYRILLIC.search(word):
+        return word
+    first = next((i for i, ch in enumerate(word) if ch in _VOWELS), None)
+    if first is None:
+        return word
+    keep = max(first + 1, 3)
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= keep:
+            return word[:-len(ending)]
+    return word
+
+def stem_name(word):
+    for ending, base in _SURNAME_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)] + base
+    return stem(word)
+
+def words(text):
+    """Нормализованные слова: NFKC, нижний регистр, ё/е, латиница-двойник внутри русских слов"""
+    result = []
+    for token in _TOKEN.findall(normalize(text)):
+        if not token.isdigit() and '.' not in token and _CYRILLIC.search(token):
+            token = token.translate(_LOOKALIKE)
+        if token in _STOPWORDS or (len(token) == 1 and not token.isdigit()):
+            continue
+        result.append(token)
+    return result
+
+def term(field, word):
+    """Термин поля из нормализованного слова: основа (для авторов - основа фамилии), числа и даты без изменений"""
+    if not word.isalpha():
+        return word
+    return stem_name(word) if field == 'a' else stem(word)
+
+def field_terms(field, text):
+    if field == 's':
+        # Из ссылки ФИПС - номер документа, из пути - имя файла без расширения
+        number = _DOC_NUMBER.search(str(text or ""))
+        text = number.group(1) if number else os.path.splitext(os.path.basename(str(text or "")))[0]
+    return [term(field, word) for word in words(text)]
+
+def distance(a, b, limit):
+    """Расстояние Левенштейна с отсечкой: при превышении limit возвращает limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def max_typos(word):
+    """Допустимое число ошибок OCR в слове: короткие слова и числа - только точное совпадение"""
+    if not word.isalpha() or len(word) < 4:
+        return 0
+    return 1 if len(word) <= 6 else 2
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def _owned(name):
+    """Файл или каталог, принадлежащий индексу: только их можно удалять при пересоздании"""
+    return (name in (MANIFEST_FILE, RECORDS_FILE, OFFSETS_FILE) or name.startswith(SEGMENT_PREFIX)
+            or name.startswith(MANIFEST_FILE + "."))
+
+def record_key(record):
+    """Ключ записи для обновления: регистрационный номер, иначе ссылка или путь к файлу"""
+    number = str(record.get('Регистрационный номер') or "").strip()
+    if number and number != NOT_FOUND:
+        return "reg:" + number
+    return "src:" + str(record.get(LINK_COLUMN) or record.get(PATH_COLUMN) or record.get('Название') or "")
+
+def record_terms(record):
+    terms = set()
+    for column, field in FIELDS.items():
+        value = record.get(column)
+        if value and value != NOT_FOUND:
+            terms.update(f"{field}|{word}" for word in field_terms(field, value))
+    for column in (PATH_COLUMN, LINK_COLUMN):
+        if record.get(column):
+            terms.update(f"s|{word}" for word in field_terms('s', record[column]))
+    return terms
+
+class _Segment:
+    """
+    Неизменяемый сегмент индекса: отсортированный словарь терминов, списки записей (postings)
+    и словарь удалений одной буквы для нечёткого поиска. Массивы открываются через mmap.
+    """
+
+    FILES = ("terms", "offsets", "postings", "variants", "variant_terms")
+
+    def __init__(self, path):
+        self.path = path
+        for name in self.FILES:
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode='r'))
+
+    @staticmethod
+    def _width(array):
+        return array.dtype.itemsize // 4
+
+    def _range(self, array, lo_key, hi_key=None):
+        # searchsorted обрезает ключ до ширины строк массива, поэтому длинные ключи отсекаются заранее
+        width = self._width(array)
+        if len(lo_key) > width:
+            return 0, 0
+        lo = int(np.searchsorted(array, lo_key, side='left'))
+        if hi_key is None:
+            hi = int(np.searchsorted(array, lo_key, side='right'))
+        elif len(hi_key) > width:
+            hi = int(np.searchsorted(array, lo_key, side='right'))
+        else:
+            hi = int(np.searchsorted(array, hi_key, side='left'))
+        return lo, hi
+
+    def find(self, key):
+        lo, hi = self._range(self.terms, key)
+        return lo if hi > lo else -1
+
+    def prefixed(self, prefix, limit=MAX_EXPANSIONS):
+        lo, hi = self._range(self.terms, prefix, prefix + "\U0010ffff")
+        return range(lo, min(hi, lo + limit))
+
+    def similar(self, variant):
+        lo, hi = self._range(self.variants, variant)
+        return self.variant_terms[lo:hi]
+
+    def postings_of(self, term_id):
+        return self.postings[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    def pairs(self):
+        """Все пары (термин, запись) сегмента"""
+        return np.repeat(np.asarray(self.terms), np.diff(self.offsets)), np.asarray(self.postings)
+
+    @staticmethod
+    def write(path, terms, ids):
+        """Строит сегмент из пар (термин, запись) и атомарно кладёт его в каталог path"""
+        tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path), prefix=SEGMENT_PREFIX + "tmp")
+        try:
+            terms = np.asarray(terms, dtype=str)
+            ids = np.asarray(ids, dtype=np.uint32)
+            order = np.lexsort((ids, terms))
+            terms, ids = terms[order], ids[order]
+            unique, starts = np.unique(terms, return_index=True)
+            offsets = np.append(starts, len(ids)).astype(np.int64)
+            variants, variant_terms = [], []
+            for term_id, key in enumerate(unique.tolist()):
+                field, word = key.split("|", 1)
+                if max_typos(word):
+                    for variant in _deletions(word) | {word}:
+                        variants.append(f"{field}|{variant}")
+                        variant_terms.append(term_id)
+            variants = np.asarray(variants, dtype=str) if variants else np.zeros(0, dtype='<U1')
+            variant_terms = np.asarray(variant_terms, dtype=np.uint32)
+            order = np.argsort(variants, kind='stable')
+            arrays = {'terms': unique, 'offsets': offsets, 'postings': ids,
+                      'variants': variants[order], 'variant_terms': variant_terms[order]}
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, name + ".npy"), array)
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+class CertIndex:
+    """
+    Локальный полнотекстовый индекс свидетельств (строки 4.2 и результаты ФИПС 4.3).
+    Записи дописываются в records.jsonl, каждая пачка новых записей - отдельный сегмент
+    инвертированного индекса; при накоплении сегментов они сливаются в один.
+    Поиск - по основам слов, по префиксу и с поправкой на ошибки OCR (1-2 буквы).
+    Одним объектом можно пользоваться из нескольких потоков.
+    """
+
+    def __init__(self, path=CERT_INDEX_DIR, max_segments=MAX_SEGMENTS):
+        self.path = path
+        self.max_segments = max_segments
+        self.lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._read_manifest()
+        self.segments = [_Segment(os.path.join(path, name)) for name in self.manifest['segments']]
+        self.deleted = set(self.manifest['deleted'])
+        self._records = None
+        self._offsets = None
+        self._map_records()
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST_FILE), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            if manifest.get('version') == INDEX_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        names = os.listdir(self.path)
+        foreign = [name for name in names if not _owned(name)]
+        if foreign and not os.path.exists(os.path.join(self.path, MANIFEST_FILE)):
+            raise ValueError(f"Каталог '{self.path}' не пуст и не содержит индекса свидетельств "
+                             f"(нет {MANIFEST_FILE}): {', '.join(sorted(foreign)[:5])}")
+        # Нет индекса, манифест повреждён или другая версия формата - начинаем заново,
+        # удаляя только файлы самого индекса
+        for name in names:
+            if _owned(name):
+                target = os.path.join(self.path, name)
+                shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+        return {'version': INDEX_VERSION, 'count': 0, 'next_segment': 0, 'segments': [], 'deleted': [], 'keys': {}}
+
+    def _write_manifest(self):
+        self.manifest['deleted'] = sorted(self.deleted)
+        handle, tmp_path = tempfile.mkstemp(dir=self.path, prefix=MANIFEST_FILE + ".")
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            json.dump(self.manifest, file, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+
+    def _map_records(self):
+        if self._records is not None:
+            self._records.close()
+        self._records = self._offsets = None
+        count = self.manifest['count']
+        if count:
+            with open(os.path.join(self.path, RECORDS_FILE), 'rb') as file:
+                self._records = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets = np.memmap(os.path.join(self.path, OFFSETS_FILE), dtype=np.int64, mode='r',
+                                      shape=(count + 1,))
+
+    def __len__(self):
+        return self.manifest['count'] - len(self.deleted)
+
+    def record(self, record_id):
+        start, end = int(self._offsets[record_id]), int(self._offsets[record_id + 1])
+        return json.loads(self._records[start:end])
+
+    def add(self, rows):
+        """
+        Добавляет или обновляет записи (по регистрационному номеру, иначе по ссылке/пути).
+        Неизменившиеся записи пропускаются; возвращает число добавленных и обновлённых.
+        """
+        with self.lock:
+            keys = self.manifest['keys']
+            fresh = {}
+            for row in rows:
+                record = {column: row[column] for column in RECORD_COLUMNS if row.get(column)}
+                # Пустые строки «не найдено» из 4.3 пропускаются; документ без распознанных полей
+                # всё равно ищется по имени файла
+                if record.get('Название') == "Не найдено" or not record_terms(record):
+                    continue
+                key = record_key(record)
+                if key in keys and key not in fresh and self.record(keys[key]) == record:
+                    continue
+                fresh[key] = record
+            if not fresh:
+                return 0
+
+            count = self.manifest['count']
+            records_path = os.path.join(self.path, RECORDS_FILE)
+            position = os.path.getsize(records_path) if os.path.exists(records_path) else 0
+            # Обрезаем хвост, не попавший в манифест после прерванной записи
+            valid = int(self._offsets[count]) if count else 0
+            offsets = [] if count else [0]
+            terms, ids = [], []
+            with open(records_path, 'ab') as file:
+                if position != valid:
+                    file.truncate(valid)
+                for number, (key, record) in enumerate(fresh.items(), count):
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+                    file.write(line)
+                    valid += len(line)
+                    offsets.append(valid)
+                    if key in keys:
+                        self.deleted.add(keys[key])
+                    keys[key] = number
+                    for key_term in record_terms(record):
+                        terms.append(key_term)
+                        ids.append(number)
+            with open(os.path.join(self.path, OFFSETS_FILE), 'r+b' if count else 'wb') as file:
+                file.seek((count + 1) * 8 if count else 0)
+                file.truncate()
+                file.write(np.asarray(offsets, dtype=np.int64).tobytes())
+
+            if terms:
+                name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:06d}"
+                _Segment.write(os.path.join(self.path, name), terms, ids)
+                self.manifest['next_segment'] += 1
+                self.manifest['segments'].append(name)
+                self.segments.append(_Segment(os.path.join(self.path, name)))
+            self.manifest['count'] = count + len(fresh)
+            self._write_manifest()
+            self._map_records()
+            if len(self.segments) > self.max_segments:
+                self.compact()
+            return len(fresh)
+
+    def compact(self):
+        """Сливает все сегменты в один и убирает из него заменённые записи"""
+        with self.lock:
+            if not self.segments:
+                return
+            pairs = [segment.pairs() for segment in self.segments]
+            terms = np.concatenate([p[0] for p in pairs])
+            ids = np.concatenate([p[1] for p in pairs])
+            if self.deleted:
+                alive = ~np.isin(ids, np.fromiter(self.deleted, dtype=np.uint32))
+                terms, ids = terms[alive], ids[alive]
+            old = self.manifest['segments']
+            name = f"{SEGMENT_PREFIX}{self.manifest['next_segment']:06d}"
+            _Segment.write(os.path.join(self.path, name), terms, ids)
+            self.manifest['next_segment'] += 1
+            self.manifest['segments'] = [name]
+            self.segments = [_Segment(os.path.join(self.path, name))]
+            self._write_manifest()
+            for segment in old:
+                shutil.rmtree(os.path.join(self.path, segment), ignore_errors=True)
+
+    def _matches(self, field, word, prefix, fuzzy):
+        """Записи, подходящие под одно слово запроса: {id: вес}; точное совпадение весит больше"""
+        scores = {}
+
+        def collect(segment, term_id, weight):
+            for record_id in segment.postings_of(term_id).tolist():
+                if weight > scores.get(record_id, 0.0):
+                    scores[record_id] = weight
+
+        key = f"{field}|{word}"
+        limit = max_typos(word) if fuzzy else 0
+        for segment in self.segments:
+            exact = segment.find(key)
+            if exact >= 0:
+                collect(segment, exact, 1.0)
+            if prefix and len(word) >= 3:
+                for term_id in segment.prefixed(key):
+                    if term_id != exact:
+                        collect(segment, term_id, 0.7)
+            if limit:
+                candidates = set()
+                for variant in _deletions(word) | {word}:
+                    candidates.update(segment.similar(f"{field}|{variant}").tolist())
+                candidates.discard(exact)
+                for term_id in candidates:
+                    typos = distance(word, str(segment.terms[term_id]).split("|", 1)[1], limit)
+                    if typos <= limit:
+                        collect(segment, term_id, 0.6 - 0.1 * (typos - 1))
+        return scores
+
+    def query(self, parts, limit=10, prefix=True, fuzzy=True, min_match=MIN_MATCH):
+        """
+        Поиск по списку (поля, текст): поля - буквы из FIELDS (несколько - любое из них).
+        Возвращает [(оценка 0..1, запись), ...] по убыванию оценки.
+        """
+        with self.lock:
+            # Слово запроса, искомое в нескольких полях, засчитывается один раз - по лучшему полю
+            groups = [[(field, term(field, word)) for field in fields]
+                      for fields, text in parts for word in words(text)]
+            if not groups:
+                return []
+            totals = {}
+            matched = {}
+            for variants in groups:
+                best = {}
+                for field, word in variants:
+                    for record_id, weight in self._matches(field, word, prefix, fuzzy).items():
+                        if weight > best.get(record_id, 0.0):
+                            best[record_id] = weight
+                for record_id, weight in best.items():
+                    totals[record_id] = totals.get(record_id, 0.0) + weight
+                    matched[record_id] = matched.get(record_id, 0) + 1
+            needed = max(1, int(np.ceil(len(groups) * min_match)))
+            ranked = sorted(((totals[i] / len(groups), i) for i in totals
+                             if matched[i] >= needed and i not in self.deleted), reverse=True)
+            return [(round(score, 3), self.record(record_id)) for score, record_id in ranked[:limit]]
+
+    def search(self, text, field=None, limit=10, prefix=True, fuzzy=True):
+        """Поиск по всем полям или по одному из SEARCH_FIELDS ('title', 'authors', ...)"""
+        fields = SEARCH_FIELDS[field] if field else "nahxs"
+        return self.query([(fields, text)], limit, prefix, fuzzy)
+
+    def lookup(self, title="", authors="", limit=10):
+        """Записи, подходящие под запрос ФИПС (название и/или авторы)"""
+        # Название ищется и в имени файла: у сканов без OCR другого текста нет
+        parts = [(fields, text) for fields, text in (('ns', title), ('a', authors)) if text and text.strip()]
+        return [record for _, record in self.query(parts, limit)] if parts else []
+
+    def match(self, title="", authors="", limit=10):
+        """
+        Строгое совпадение - по нему решается, можно ли не искать на сайте ФИПС.
+        Основы слов названия совпадают с названием записи полностью (без лишних и недостающих),
+        каждая фамилия запроса дословно есть среди авторов записи; префиксы и опечатки не засчитываются.
+        """
+        parts = [(field, text) for field, text in (('n', title), ('a', authors)) if text and text.strip()]
+        if not parts:
+            return []
+        title_terms = set(field_terms('n', title))
+        author_words = set(words(authors))
+        records = []
+        for _, record in self.query(parts, None, prefix=False, fuzzy=False, min_match=1.0):
+            if title_terms and set(field_terms('n', record.get('Название', ""))) != title_terms:
+                continue
+            if not author_words <= set(words(record.get('Авторы', ""))):
+                continue
+            records.append(record)
+            if len(records) >= limit:
+                break
+        return records
+
+    def stats(self):
+        with self.lock:
+            terms = sum(len(segment.terms) for segment in self.segments)
+            size = sum(os.path.getsize(os.path.join(root, name))
+                       for root, _, names in os.walk(self.path) for name in names)
+        return {'records': len(self), 'segments': len(self.segments), 'terms': terms, 'bytes': size}
+
+    def close(self):
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_rows(filename):
+    """Строки из результатов 4.2/4.3: CSV (pdf_results.csv, fips_results.csv) или JSON-массив"""
+    if filename.lower().endswith(".json"):
+        with open(filename, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    with open(filename, 'r', encoding='utf-8-sig', newline='') as file:
+        return list(csv.DictReader(file))
+
+def cached_documents(cache):
+    """Разобранные страницы документов из кэша ФИПС в виде строк результатов"""
+    return [dict(fields, **{LINK_COLUMN: url}) for url, fields in cache.documents()]
+
+def find(index, title="", authors="", limit=10, base_url=None, cache=None):
+    """
+    Сначала локальный индекс (строгое совпадение); только при промахе - HTTP-поиск на сайте ФИПС,
+    найденное сразу добавляется в индекс. Возвращает (записи, 'local' | 'remote').
+    """
+    records = index.match(title, authors, limit)
+    # Сайт ФИПС ищет только по названию: без него искать там нечего
+    if records or not (title or "").strip():
+        return records, 'local'
+    from fips_bulk import search_one
+    from fips_http import FIPSHttpSearch
+    searcher = FIPSHttpSearch(base_url=base_url) if base_url else FIPSHttpSearch()
+    try:
+        rows = search_one(searcher, {'title': title, 'authors': authors}, limit, cache)
+    finally:
+        searcher.close()
+    index.add(rows)
+    return [row for row in rows if row.get(LINK_COLUMN)], 'remote'
+
+def _print_records(records, elapsed):
+    for score, record in records:
+        source = record.get(LINK_COLUMN) or record.get(PATH_COLUMN, "")
+        print(f"{score:.2f}  {record.get('Название', '')} | {record.get('Авторы', NOT_FOUND)} | "
+              f"{record.get('Регистрационный номер', NOT_FOUND)} | {source}")
+    print(f"Найдено: {len(records)} за {elapsed * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный полнотекстовый индекс свидетельств о регистрации")
+    parser.add_argument("--index", default=CERT_INDEX_DIR, help="каталог индекса")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="добавить результаты 4.2/4.3 (CSV или JSON)")
+    add.add_argument("files", nargs="*", help="файлы результатов")
+    add.add_argument("--fips-cache", help="добавить страницы документов из кэша ФИПС")
+    search = commands.add_parser("search", help="поиск по всем полям")
+    search.add_argument("text", help="слова запроса")
+    search.add_argument("--field", choices=sorted(SEARCH_FIELDS), help="искать только в этом поле")
+    search.add_argument("-n", "--limit", type=int, default=10, help="число результатов")
+    search.add_argument("--exact", action="store_true", help="без поиска по префиксу и исправления ошибок OCR")
+    lookup = commands.add_parser("lookup", help="поиск по названию и авторам, при промахе - на сайте ФИПС")
+    lookup.add_argument("--title", default="", help="название")
+    lookup.add_argument("--authors", default="", help="авторы")
+    lookup.add_argument("-n", "--limit", type=int, default=10, help="число результатов")
+    lookup.add_argument("--remote", action="store_true", help="при промахе искать на сайте ФИПС")
+    lookup.add_argument("--base-url", help="адрес страницы поиска ФИПС")
+    commands.add_parser("compact", help="слить сегменты индекса в один")
+    commands.add_parser("stats", help="число записей и размер")
+    args = parser.parse_args()
+
+    with CertIndex(args.index) as index:
+        if args.command == "add":
+            rows = []
+            for filename in args.files:
+                rows.extend(read_rows(filename))
+            if args.fips_cache:
+                from fips_cache import FIPSCache
+                cache = FIPSCache(args.fips_cache)
+                try:
+                    rows.extend(cached_documents(cache))
+                finally:
+                    cache.close()
+            started = time.perf_counter()
+            added = index.add(rows)
+            print(f"Добавлено или обновлено записей: {added} из {len(rows)} за {time.perf_counter() - started:.2f} s")
+        elif args.command == "search":
+            started = time.perf_counter()
+            records = index.search(args.text, args.field, args.limit, not args.exact, not args.exact)
+            _print_records(records, time.perf_counter() - started)
+        elif args.command == "lookup":
+            started = time.perf_counter()
+            if args.remote:
+                records, source = find(index, args.title, args.authors, args.limit, args.base_url)
+                print("Источник: " + ("локальный индекс" if source == 'local' else "сайт ФИПС"))
+            else:
+                records = index.lookup(args.title, args.authors, args.limit)
+            _print_records([(1.0, record) for record in records], time.perf_counter() - started)
+        elif args.command == "compact":
+            index.compact()
+            print(f"Сегментов: {len(index.segments)}")
+        stats = index.stats()
+        print(f"Записей: {stats['records']}, сегментов: {stats['segments']}, терминов: {stats['terms']}, "
+              f"размер: {stats['bytes'] / (1024 * 1024):.2f} МБ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import json
+import mmap
+import os
+import tempfile
+import time
+import numpy as np
+from analysis import IncrementalAnalysis
+from log_io import detect_compression
+from parse import CHUNK_ROWS, DATA_SECTION, SECTION_HEADER, DataColumnsBuilder, parse_items
+
+INDEX_SUFFIX = ".cycles.json"
+INDEX_VERSION = 1
+
+def index_path(log_path):
+    """Файл индекса рядом с логом: <лог>.cycles.json"""
+    return log_path + INDEX_SUFFIX
+
+def _file_stamp(log_path):
+    stat = os.stat(log_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+class _Scanner:
+    """Состояние одного последовательного прохода по логу"""
+
+    def __init__(self):
+        self.sections = {}
+        self.text = {}
+        self.builder = None
+        self.data_header = None
+        self.lines = []
+        self.offsets = []
+        self.analysis = IncrementalAnalysis()
+        self.offsets_by_cycle = {}
+        # Конец цикла, строка которого ещё не прочитана: смещение берётся из следующей пачки
+        self.pending_ends = []
+
+    def flush(self):
+        if not self.lines:
+            return
+        block, kept = self.builder.convert(self.lines)
+        offsets = np.asarray(self.offsets, dtype=np.int64)[kept]
+        self.lines, self.offsets = [], []
+        if not len(block):
+            return
+        if self.pending_ends:
+            for number in self.pending_ends:
+                self.offsets_by_cycle[number]['end_offset'] = int(offsets[0])
+            self.pending_ends = []
+        base = self.analysis.rows
+        columns = {name: block[:, i] for i, name in enumerate(self.builder.names)}
+        self.analysis.update(columns)
+        end_row = base + len(block)
+        for cycle in self.analysis.cycles:
+            if cycle['end'] < base:
+                continue
+            entry = self.offsets_by_cycle.setdefault(cycle['number'], {})
+            if base <= cycle['start'] < end_row:
+                entry['start_offset'] = int(offsets[cycle['start'] - base])
+            if cycle['end'] < end_row:
+                entry['end_offset'] = int(offsets[cycle['end'] - base])
+            else:
+                entry.pop('end_offset', None)
+                self.pending_ends.append(cycle['number'])
+
+def build_index(log_path, output=None):
+    """
+    Один последовательный проход по логу: смещения секций, заголовка Data, начала каждого
+    цикла (сброс времени), начала покоя после него и сводка по циклам. Индекс пишется в JSON.
+    """
+    if detect_compression(log_path):
+        raise ValueError(f"Сжатый лог '{log_path}' не поддерживает произвольный доступ - распакуйте его")
+    scanner = _Scanner()
+    current = None
+    offset = 0
+    with open(log_path, 'rb') as file:
+        for raw in file:
+            start = offset
+            offset += len(raw)
+            if raw.lstrip().startswith(b"=="):
+                header = SECTION_HEADER.match(raw.decode('utf-8', errors='replace'))
+                if header:
+                    if current == DATA_SECTION and scanner.builder is not None:
+                        scanner.flush()
+                    current = header.group(1).strip()
+                    scanner.sections[current] = {'offset': start, 'data_offset': offset}
+                    continue
+            if current is None or not raw.strip():
+                continue
+            line = raw.decode('utf-8', errors='replace')
+            if current == DATA_SECTION:
+                if scanner.builder is None:
+                    scanner.builder = DataColumnsBuilder(line)
+                    scanner.data_header = line
+                    scanner.sections[DATA_SECTION]['data_offset'] = offset
+                    continue
+                scanner.lines.append(line)
+                scanner.offsets.append(start)
+                if len(scanner.lines) >= CHUNK_ROWS:
+                    scanner.flush()
+            else:
+                scanner.text.setdefault(current, []).append(line.rstrip())
+    if scanner.builder is not None:
+        scanner.flush()
+
+    # Конец данных: начало следующей за Data секции или конец файла
+    data_end = offset
+    if DATA_SECTION in scanner.sections:
+        following = [s['offset'] for s in scanner.sections.values()
+                     if s['offset'] > scanner.sections[DATA_SECTION]['offset']]
+        data_end = min(following) if following else offset
+    for number in scanner.pending_ends:
+        scanner.offsets_by_cycle[number]['end_offset'] = data_end
+    scanner.analysis.set_items(parse_items(scanner.text.get("Items", [])))
+
+    cycles = []
+    stats = scanner.analysis.cycle_stats()
+    for i, cycle in enumerate(stats):
+        offsets = scanner.offsets_by_cycle.get(cycle['number'], {})
+        next_start = (scanner.offsets_by_cycle.get(stats[i + 1]['number'], {}).get('start_offset', data_end)
+                      if i + 1 < len(stats) else data_end)
+        next_row = stats[i + 1]['start'] if i + 1 < len(stats) else scanner.analysis.rows
+        cycles.append(dict(cycle,
+                           start_offset=offsets.get('start_offset', data_end),
+                           rest_offset=offsets.get('end_offset', data_end),
+                           rest_row=cycle['end'],
+                           next_offset=next_start,
+                           next_row=next_row))
+
+    index = dict(_file_stamp(log_path),
+                 version=INDEX_VERSION,
+                 rows=scanner.analysis.rows,
+                 interval=scanner.analysis.interval,
+                 data_header=scanner.data_header,
+                 data_end=data_end,
+                 sections=scanner.sections,
+                 text=scanner.text,
+                 cycles=cycles)
+    output = output or index_path(log_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), suffix=".tmp")
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        json.dump(index, file, ensure_ascii=False)
+    os.replace(tmp_path, output)
+    return index
+
+def load_index(log_path, rebuild=True):
+    """Индекс лога; устаревший (файл изменился) или отсутствующий индекс строится заново"""
+    path = index_path(log_path)
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        stamp = _file_stamp(log_path)
+        if index.get('version') == INDEX_VERSION and all(index.get(k) == v for k, v in stamp.items()):
+            return index
+    except (OSError, ValueError):
+        pass
+    return build_index(log_path) if rebuild else None
+
+def _read_rows(log_path, header, start, stop):
+    """Строки Data в диапазоне байтов [start, stop) через mmap - без чтения остального файла"""
+    builder = DataColumnsBuilder(header)
+    if stop > start:
+        with open(log_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            text = view[start:stop].decode('utf-8', errors='replace')
+        for line in text.splitlines():
+            if line.strip():
+                builder.add_line(line)
+    return builder.build()
+
+def load_cycle(log_path, number, include_rest=False, index=None):
+    """
+    Секции лога, урезанные до одного цикла (нумерация с 1): Items/End/Error целиком,
+    Data - только строки цикла (и покоя после него при include_rest=True).
+    Результат можно передать в analyze_log или test.build_report.
+    """
+    index = index or load_index(log_path)
+    cycles = index['cycles']
+    if not 1 <= number <= len(cycles):
+        raise IndexError(f"В логе {len(cycles)} циклов, запрошен {number}")
+    cycle = cycles[number - 1]
+    stop = cycle['next_offset'] if include_rest else cycle['rest_offset']
+    sections = {name: list(lines) for name, lines in index['text'].items()}
+    sections[DATA_SECTION] = _read_rows(log_path, index['data_header'], cycle['start_offset'], stop)
+    return sections
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс циклов лога для чтения отдельных циклов")
+    parser.add_argument("log", help="TSV-лог")
+    parser.add_argument("cycle", nargs="?", type=int, help="номер цикла для загрузки")
+    parser.add_argument("--rebuild", action="store_true", help="построить индекс заново")
+    parser.add_argument("--rest", action="store_true", help="вместе с покоем после цикла")
+    parser.add_argument("--pdf", help="построить отчёт по циклу в этот PDF")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build_index(args.log) if args.rebuild else load_index(args.log)
+    print(f"Индекс: {len(index['cycles'])} циклов, {index['rows']} строк, {time.perf_counter() - started:.3f} s")
+    if args.cycle is None:
+        for cycle in index['cycles']:
+            print(f"  Цикл {cycle['number']}: {cycle['type']}, строки {cycle['start']}-{cycle['end']}, "
+                  f"байты {cycle['start_offset']}-{cycle['rest_offset']}, {cycle['capacity'] * 1000:.0f} mAh")
+        return
+    started = time.perf_counter()
+    sections = load_cycle(args.log, args.cycle, args.rest, index)
+    rows = len(next(iter(sections[DATA_SECTION].values()), []))
+    print(f"Цикл {args.cycle}: {rows} строк за {(time.perf_counter() - started) * 1000:.1f} ms")
+    if args.pdf:
+        from test import build_report
+        build_report(sections, args.pdf)
+
+if __name__ == "__main__":
+    main()
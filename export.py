@@ -0,0 +1,161 @@
+import argparse
+import csv
+import os
+import time
+from analysis import analyze_log
+from log_cache import load_sections_cached
+from parse import DATA_SECTION, TIME_COLUMN, format_time
+
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# Строк Data, переводимых из столбцов NumPy в строки таблицы за один шаг
+EXPORT_CHUNK_ROWS = 65536
+CSV_BUFFER = 1024 * 1024
+# Предел строк листа Excel; дальше данные продолжаются на листе "<имя> (2)" и т.д.
+XLSX_MAX_ROWS = 1048576
+
+CYCLE_COLUMNS = ["Log", "Cycle", "Type", "Full", "Start row", "End row", "Duration (h)",
+                 "Start V", "End V", "Capacity (Ah)", "Energy (Wh)"]
+
+class TableExport:
+    """
+    Потоковая запись таблиц по мере поступления строк. Для .xlsx - книга openpyxl
+    в режиме write_only: строки листа сразу уходят во временный XML, в памяти не копятся.
+    Для остальных имён - CSV с буферизованной записью, по файлу на лист: <имя>_<лист>.csv
+    (единственный лист пишется прямо в <имя>.csv).
+    """
+
+    def __init__(self, path, single_sheet=False):
+        self.path = path
+        self.xlsx = path.lower().endswith(".xlsx")
+        self.single_sheet = single_sheet
+        self.sheets = {}
+        if self.xlsx:
+            if not OPENPYXL_AVAILABLE:
+                raise RuntimeError("Для экспорта в .xlsx нужен пакет openpyxl")
+            self.workbook = Workbook(write_only=True)
+
+    def _csv_path(self, name):
+        root, extension = os.path.splitext(self.path)
+        if self.single_sheet:
+            return root + (extension or ".csv")
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name).strip("_")
+        return f"{root}_{safe}{extension or '.csv'}"
+
+    def add_sheet(self, name, columns):
+        """Новый лист (или CSV-файл) с заголовком columns"""
+        sheet = {'name': name, 'columns': list(columns), 'rows': 0, 'part': 1}
+        if self.xlsx:
+            sheet['sheet'] = self._new_worksheet(sheet)
+        else:
+            sheet['handle'] = open(self._csv_path(name), 'w', encoding='utf-8-sig', newline='', buffering=CSV_BUFFER)
+            sheet['writer'] = csv.writer(sheet['handle'])
+            sheet['writer'].writerow(sheet['columns'])
+        self.sheets[name] = sheet
+        return sheet
+
+    def _new_worksheet(self, sheet):
+        title = sheet['name'] if sheet['part'] == 1 else f"{sheet['name']} ({sheet['part']})"
+        # Excel ограничивает название листа 31 символом и запрещает некоторые знаки
+        title = "".join(c for c in title if c not in "[]:*?/\\")[:31]
+        worksheet = self.workbook.create_sheet(title)
+        worksheet.append(sheet['columns'])
+        sheet['rows'] = 1
+        return worksheet
+
+    def extend(self, name, rows):
+        """Дописывает строки (списки значений) в конец листа"""
+        sheet = self.sheets[name]
+        if not self.xlsx:
+            sheet['writer'].writerows(rows)
+            return
+        worksheet = sheet['sheet']
+        for row in rows:
+            if sheet['rows'] >= XLSX_MAX_ROWS:
+                sheet['part'] += 1
+                worksheet = sheet['sheet'] = self._new_worksheet(sheet)
+            worksheet.append(row)
+            sheet['rows'] += 1
+
+    def append(self, name, row):
+        self.extend(name, [row])
+
+    def flush(self):
+        """Сбрасывает CSV на диск, чтобы уже записанное было видно во время пакетной обработки"""
+        for sheet in self.sheets.values():
+            if 'handle' in sheet:
+                sheet['handle'].flush()
+
+    def close(self):
+        if self.xlsx:
+            self.workbook.save(self.path)
+        else:
+            for sheet in self.sheets.values():
+                sheet['handle'].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def data_rows(data, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Строки секции Data блоками по chunk_rows: время в виде h:m:s, остальные столбцы - целые числа"""
+    names = list(data)
+    rows = len(data[names[0]]) if names else 0
+    for start in range(0, rows, chunk_rows):
+        columns = []
+        for name in names:
+            values = data[name][start:start + chunk_rows].tolist()
+            columns.append([format_time(v) for v in values] if name == TIME_COLUMN else values)
+        yield zip(*columns)
+
+def export_data(sections, export, sheet="Data"):
+    """Пишет столбцы Data блоками; в памяти держится только текущий блок"""
+    data = sections.get(DATA_SECTION) or {}
+    export.add_sheet(sheet, list(data))
+    for rows in data_rows(data):
+        export.extend(sheet, rows)
+
+def cycle_rows(log_name, cycles):
+    """Сводка по циклам одного лога в виде строк листа Cycles"""
+    return [[log_name, c['number'], c['type'], "yes" if c['full'] else "no", c['start'], c['end'],
+             round(c['duration'] / 3600, 4), round(c['start_voltage'], 3), round(c['end_voltage'], 3),
+             round(c['capacity'], 4), round(c['energy'], 4)] for c in cycles]
+
+def export_rows(rows, export, sheet, columns, missing=""):
+    """Строки-словари (результаты ФИПС, данные из PDF 4.2) в порядке столбцов columns"""
+    if sheet not in export.sheets:
+        export.add_sheet(sheet, columns)
+    export.extend(sheet, ([row.get(column, missing) for column in columns] for row in rows))
+
+def export_log(log_path, output, with_data=True):
+    """Экспорт одного лога: лист Data (при with_data) и лист Cycles; возвращает строки сводки по циклам"""
+    sections = load_sections_cached(log_path)
+    if not sections:
+        raise ValueError(f"Не удалось прочитать данные из '{log_path}'")
+    cycles = cycle_rows(os.path.basename(log_path), analyze_log(sections)['cycles'])
+    if output:
+        with TableExport(output, single_sheet=not with_data) as export:
+            if with_data:
+                export_data(sections, export)
+            export.add_sheet("Cycles", CYCLE_COLUMNS)
+            export.extend("Cycles", cycles)
+    return cycles
+
+def main():
+    parser = argparse.ArgumentParser(description="Экспорт столбцов Data и сводки по циклам лога в xlsx или CSV")
+    parser.add_argument("log", help="TSV-лог")
+    parser.add_argument("output", help="файл .xlsx или .csv (для CSV листы пишутся в <имя>_Data.csv и <имя>_Cycles.csv)")
+    parser.add_argument("--cycles-only", action="store_true", help="только сводка по циклам")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    cycles = export_log(args.log, args.output, not args.cycles_only)
+    print(f"Экспортировано циклов: {len(cycles)} в {args.output} за {time.perf_counter() - started:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import csv
+import json
+import logging
+import queue
+import threading
+import time
+from cert_index import CERT_INDEX_DIR, CertIndex
+from export import TableExport, export_rows
+from fips_cache import FIPS_CACHE, QUERY_TTL, FIPSCache
+from fips_details import DETAIL_WORKERS, PER_HOST_LIMIT, DetailFetcher
+from fips_fixture import FixtureServer
+from fips_http import FIPSHttpSearch
+from laba_4_3 import FIPS_COLUMNS, FIPS_SEARCH_URL, NOT_FOUND, FIPSSearch
+
+logger = logging.getLogger(__name__)
+
+QUERY_COLUMNS = ['Запрос: название', 'Запрос: авторы']
+RESULT_COLUMNS = QUERY_COLUMNS + FIPS_COLUMNS
+# Найденные в сети записи добавляются в локальный индекс пачками по столько строк
+INDEX_BATCH = 200
+
+def read_queries(csv_file):
+    """
+    Читает список запросов из CSV. Название ищется в столбцах 'Название'/'title',
+    авторы - в 'Авторы'/'authors'; файл без заголовка считается списком названий.
+    Строки без названия пропускаются: на сайте ФИПС поиск ведётся только по названию.
+    """
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+        sample = file.read(4096)
+        file.seek(0)
+        has_header = any(name in sample.splitlines()[0] for name in ('Название', 'title', 'Авторы', 'authors')) if sample else False
+        if not has_header:
+            return [{'title': row[0].strip(), 'authors': ""} for row in csv.reader(file) if row and row[0].strip()]
+        queries = []
+        reader = csv.DictReader(file)
+        for row in reader:
+            title = (row.get('Название') or row.get('title') or "").strip()
+            authors = (row.get('Авторы') or row.get('authors') or "").strip()
+            if title:
+                queries.append({'title': title, 'authors': authors})
+            elif authors:
+                logger.warning("Строка %d пропущена: нет названия, поиск только по авторам не поддерживается (%s)",
+                               reader.line_num, authors)
+        return queries
+
+class ResultWriter:
+    """
+    Потоковая запись результатов в CSV и JSON по мере поступления: каждая строка
+    сразу сбрасывается на диск, JSON-массив закрывается при close().
+    При xlsx_file строки также дописываются в лист книги openpyxl (write_only).
+    """
+
+    def __init__(self, csv_file="fips_results.csv", json_file="fips_results.json", columns=RESULT_COLUMNS,
+                 xlsx_file=None):
+        self.columns = columns
+        self.xlsx = TableExport(xlsx_file) if xlsx_file else None
+        if self.xlsx:
+            self.xlsx.add_sheet("FIPS", columns)
+        self.count = 0
+        self.csv_handle = open(csv_file, 'w', encoding='utf-8-sig', newline='') if csv_file else None
+        self.json_handle = open(json_file, 'w', encoding='utf-8') if json_file else None
+        if self.csv_handle:
+            self.csv_writer = csv.DictWriter(self.csv_handle, fieldnames=columns, extrasaction='ignore')
+            self.csv_writer.writeheader()
+        if self.json_handle:
+            self.json_handle.write("[")
+
+    def write(self, row):
+        row = {column: row.get(column, NOT_FOUND) for column in self.columns}
+        if self.csv_handle:
+            self.csv_writer.writerow(row)
+            self.csv_handle.flush()
+        if self.xlsx:
+            export_rows([row], self.xlsx, "FIPS", self.columns, NOT_FOUND)
+        if self.json_handle:
+            prefix = ",\n  " if self.count else "\n  "
+            self.json_handle.write(prefix + json.dumps(row, ensure_ascii=False))
+            self.json_handle.flush()
+        self.count += 1
+
+    def close(self):
+        if self.csv_handle:
+            self.csv_handle.close()
+        if self.json_handle:
+            self.json_handle.write("\n]\n" if self.count else "]\n")
+            self.json_handle.close()
+        if self.xlsx:
+            self.xlsx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def query_rows(query, results):
+    """Строки выходной таблицы по результатам запроса вместе с полями запроса"""
+    rows = [dict(result) for result in results]
+    if not rows:
+        rows = [{'Название': "Не найдено", 'Ссылка на страницу документа': ""}]
+    for row in rows:
+        row['Запрос: название'] = query['title']
+        row['Запрос: авторы'] = query['authors']
+    return rows
+
+def cache_key(query):
+    """
+    (название, авторы) для FIPSCache. Оба клиента ищут на сайте только по названию,
+    поэтому авторы в ключ не входят: результат одинаков для любых авторов.
+    """
+    return query['title'], ""
+
+def search_one(searcher, query, max_docs=10, cache=None):
+    """Один запрос на уже запущенном клиенте; строки результата вместе с полями запроса"""
+    if not query['title'].strip():
+        raise ValueError("пустое название: на сайте ФИПС поиск ведётся только по названию")
+    results = []
+    if searcher.search_document(title=query['title'], authors=query['authors']):
+        if searcher.extract_document_links(max_docs=max_docs):
+            results = [dict(result) for result in searcher.results]
+    elif getattr(searcher, 'last_error', None):
+        # Сбой запроса, а не пустой результат: пусть решает вызывающий (например, перейдёт на Selenium)
+        raise RuntimeError(searcher.last_error)
+    if cache is not None:
+        cache.put_query(*cache_key(query), results, max_docs, searcher.page_url, searcher.page_source)
+    return query_rows(query, results)
+
+def _worker(tasks, results, headless, base_url, max_docs, backend, cache=None, details=None, local=None):
+    """
+    Рабочий поток: один клиент на весь поток, запросы берутся из общей очереди.
+    При backend='http' браузер запускается только как запасной вариант, если HTTP-запрос не удался.
+    Клиент создаётся при первом промахе кэша: запросы, найденные в кэше, не обращаются к сети.
+    При details (DetailFetcher) строки дополняются данными со страниц документов.
+    При local (CertIndex) сначала ищется строгое совпадение в локальном индексе, в сеть - только при промахе.
+    """
+    # Клиенты потока создаются один раз; ошибка создания запоминается, чтобы не повторять
+    # запуск браузера на каждом запросе
+    clients = {}
+    failures = {}
+
+    def client(name):
+        if name not in clients and name not in failures:
+            try:
+                clients[name] = (FIPSHttpSearch(base_url=base_url) if name == "http"
+                                 else FIPSSearch(headless=headless, base_url=base_url))
+            except Exception as e:
+                failures[name] = f"Не удалось запустить клиент поиска ({name}): {e}"
+                results.put(('error', None, None, [], failures[name]))
+        return clients.get(name)
+
+    def search(name, query):
+        searcher = client(name)
+        if searcher is None:
+            raise RuntimeError(failures[name])
+        return search_one(searcher, query, max_docs, cache)
+
+    def put(kind, index, query, rows, error=None):
+        if details is not None and rows:
+            details.fill(rows)
+        results.put((kind, index, query, rows, error))
+
+    try:
+        while True:
+            try:
+                index, query = tasks.get_nowait()
+            except queue.Empty:
+                break
+            if local is not None:
+                records = local.match(query['title'], query['authors'], max_docs)
+                if records:
+                    results.put(('local', index, query, query_rows(query, records), None))
+                    continue
+            if cache is not None:
+                entry = cache.get_query(*cache_key(query), max_docs)
+                if entry is not None:
+                    put('cached', index, query, query_rows(query, entry['results']))
+                    continue
+            try:
+                put('result', index, query, search(backend, query))
+                continue
+            except Exception as e:
+                error = str(e)
+            if backend == "http":
+                try:
+                    put('result', index, query, search("selenium", query))
+                    continue
+                except Exception as e:
+                    error = f"{error}; Selenium: {e}"
+            # Сеть недоступна - отдаём устаревшую запись кэша, если она есть
+            entry = cache.get_query(*cache_key(query), max_docs, allow_stale=True) if cache else None
+            if entry is not None:
+                put('stale', index, query, query_rows(query, entry['results']), error)
+                continue
+            # Каждый взятый запрос получает строку результата, даже если клиент не запустился
+            results.put(('result', index, query, [], error))
+    finally:
+        for searcher in clients.values():
+            searcher.close()
+        results.put(('done', None, None, [], None))
+
+def run_bulk(queries, workers=2, headless=True, base_url=FIPS_SEARCH_URL, max_docs=10,
+             csv_file="fips_results.csv", json_file="fips_results.json", backend="selenium", xlsx_file=None,
+             cache=None, refresh_stale=False, details=None, local=None):
+    """
+    Выполняет запросы на пуле клиентов (браузеров или HTTP-сессий) и пишет результаты по мере поступления.
+    С cache (FIPSCache) свежие записи берутся из кэша, в сеть уходят только новые и устаревшие запросы.
+    При refresh_stale обрабатываются только новые и устаревшие запросы; без списка - все устаревшие из кэша.
+    details (DetailFetcher) заполняет остальные столбцы со страниц документов, общий для всех потоков.
+    local (CertIndex) отвечает на запросы без обращения к сети; найденное в сети и в кэше в него добавляется.
+    """
+    if cache is not None and refresh_stale:
+        queries = [query for query in queries if not cache.is_fresh(*cache_key(query))] \
+            if queries else cache.stale_queries()
+        print(f"К обновлению: {len(queries)}")
+    tasks = queue.Queue()
+    for item in enumerate(queries):
+        tasks.put(item)
+    results = queue.Queue()
+    workers = max(1, min(workers, len(queries)))
+    # При обновлении устаревших запросов локальный индекс не должен подменять ответ сайта
+    lookup = None if refresh_stale else local
+    threads = [threading.Thread(target=_worker, daemon=True,
+                                args=(tasks, results, headless, base_url, max_docs, backend, cache, details, lookup))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    done = processed = failed = cached = stale = indexed = 0
+    found = []
+    with ResultWriter(csv_file, json_file, xlsx_file=xlsx_file) as writer:
+        while done < workers:
+            kind, index, query, rows, error = results.get()
+            if kind == 'done':
+                done += 1
+                continue
+            if kind == 'error':
+                print(error)
+                continue
+            processed += 1
+            if error and kind != 'stale':
+                failed += 1
+                print(f"[{processed}/{len(queries)}] Ошибка запроса '{query['title']}': {error}")
+                continue
+            for row in rows:
+                writer.write(row)
+            if local is not None and kind != 'local':
+                found.extend(rows)
+                if len(found) >= INDEX_BATCH:
+                    indexed += local.add(found)
+                    found = []
+            source = {'cached': " (кэш)", 'local': " (локальный индекс)", 'stale': f" (устаревший кэш, ошибка сети: {error})"}.get(kind, "")
+            cached += kind in ('cached', 'local')
+            stale += kind == 'stale'
+            print(f"[{processed}/{len(queries)}] '{query['title'][:50]}': строк {len(rows)}{source}")
+
+    for thread in threads:
+        thread.join()
+    if local is not None:
+        indexed += local.add(found)
+        print(f"Локальный индекс: добавлено или обновлено {indexed}, всего записей {len(local)}")
+    print(f"\nЗапросов: {processed} из {len(queries)}, без обращения к сети: {cached}, "
+          f"из устаревшего кэша после ошибки сети: {stale}, ошибок: {failed}, "
+          f"строк записано: {writer.count}, время: {time.perf_counter() - started:.2f} s")
+    if cache is not None:
+        removed = cache.evict()
+        stats = cache.stats()
+        print(f"Кэш ФИПС: запросов {stats['queries']}, {stats['bytes'] / (1024 * 1024):.1f} МБ, "
+              f"удалено записей {removed}")
+    return processed
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный поиск документов на сайте ФИПС")
+    parser.add_argument("queries", nargs="?", help="CSV со столбцами 'Название' и 'Авторы' (необязательно)")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="число параллельных клиентов")
+    parser.add_argument("--backend", choices=("http", "selenium"), default="http",
+                        help="http - запросы без браузера (Selenium как запасной вариант), selenium - только браузер")
+    parser.add_argument("--max-docs", type=int, default=10, help="ссылок на документы на один запрос")
+    parser.add_argument("--base-url", default=FIPS_SEARCH_URL, help="адрес страницы поиска")
+    parser.add_argument("--fixture", action="store_true", help="искать на локальном сервере с сохранёнными страницами")
+    parser.add_argument("--show-browser", action="store_true", help="не использовать headless-режим")
+    parser.add_argument("--csv", default="fips_results.csv", help="CSV-файл результатов")
+    parser.add_argument("--json", default="fips_results.json", help="JSON-файл результатов")
+    parser.add_argument("--xlsx", help="дополнительно писать результаты в книгу Excel")
+    parser.add_argument("--cache", default=FIPS_CACHE, help="файл кэша запросов SQLite")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш")
+    parser.add_argument("--ttl", type=float, default=QUERY_TTL / 3600, help="срок жизни записи кэша, часов")
+    parser.add_argument("--index", default=CERT_INDEX_DIR, help="каталог локального индекса свидетельств")
+    parser.add_argument("--no-index", action="store_true", help="не искать в локальном индексе и не пополнять его")
+    parser.add_argument("--details", action="store_true", help="заполнить все столбцы со страниц документов")
+    parser.add_argument("--detail-workers", type=int, default=DETAIL_WORKERS, help="потоков загрузки страниц")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help="одновременных запросов к одному сайту")
+    parser.add_argument("--refresh-stale", action="store_true",
+                        help="обработать только новые и устаревшие запросы (без списка - все устаревшие в кэше)")
+    args = parser.parse_args()
+    if args.queries is None and not args.refresh_stale:
+        parser.error("нужен CSV с запросами или --refresh-stale")
+    # Ход каждого запроса клиенты пишут в журнал на уровне INFO; здесь видны только их ошибки
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    queries = read_queries(args.queries) if args.queries else []
+    cache = None if args.no_cache else FIPSCache(args.cache, query_ttl=args.ttl * 3600)
+    details = DetailFetcher(args.detail_workers, args.per_host, cache=cache) if args.details else None
+    local = None if args.no_index else CertIndex(args.index)
+    print(f"Запросов: {len(queries)}, клиентов: {args.workers}, режим: {args.backend}")
+    try:
+        if args.fixture:
+            with FixtureServer() as server:
+                run_bulk(queries, args.workers, not args.show_browser, server.url + "/iiss/search.xhtml",
+                         args.max_docs, args.csv, args.json, args.backend, args.xlsx, cache,
+                         args.refresh_stale, details, local)
+        else:
+            run_bulk(queries, args.workers, not args.show_browser, args.base_url, args.max_docs,
+                     args.csv, args.json, args.backend, args.xlsx, cache, args.refresh_stale, details, local)
+    finally:
+        if local is not None:
+            local.close()
+        if details is not None:
+            details.close()
+        if cache is not None:
+            cache.close()
+
+if __name__ == "__main__":
+    main()
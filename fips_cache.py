@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+
+FIPS_CACHE = os.environ.get("FIPS_CACHE", "fips_cache.db")
+# Срок жизни записи по умолчанию: запрос - неделя, страница документа - месяц
+QUERY_TTL = 7 * 24 * 3600
+DOCUMENT_TTL = 30 * 24 * 3600
+# Предельный размер базы кэша
+FIPS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queries (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    authors TEXT,
+    max_docs INTEGER,
+    results TEXT NOT NULL,
+    page_url TEXT,
+    html BLOB,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    url TEXT PRIMARY KEY,
+    fields TEXT,
+    html BLOB,
+    size INTEGER NOT NULL,
+    fetched REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queries_accessed ON queries(accessed);
+CREATE INDEX IF NOT EXISTS documents_accessed ON documents(accessed);
+"""
+
+_SPACES = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'[«»"„“”\'`.,;:!?()\[\]]')
+
+def normalize_query(text):
+    """Регистр, ё/е, кавычки, знаки препинания и лишние пробелы не влияют на ключ запроса"""
+    text = unicodedata.normalize("NFKC", text or "").lower().replace("ё", "е")
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+def query_key(title, authors):
+    return normalize_query(title) + "\x1f" + normalize_query(authors)
+
+def _pack(html):
+    return zlib.compress(html.encode('utf-8'), 6) if html else None
+
+def _unpack(blob):
+    return zlib.decompress(blob).decode('utf-8') if blob else ""
+
+class FIPSCache:
+    """
+    Постоянный кэш поиска ФИПС в SQLite: списки результатов по нормализованному запросу
+    (название/авторы) и страницы документов по URL. У каждой записи свой срок жизни;
+    при превышении max_bytes удаляются записи, к которым дольше всего не обращались.
+    Одним объектом можно пользоваться из нескольких потоков.
+    """
+
+    def __init__(self, path=FIPS_CACHE, query_ttl=QUERY_TTL, document_ttl=DOCUMENT_TTL,
+                 max_bytes=FIPS_CACHE_MAX_BYTES):
+        self.path = path
+        self.query_ttl = query_ttl
+        self.document_ttl = document_ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+
+    def get_query(self, title, authors, max_docs=10, allow_stale=False):
+        """
+        Запись {'results': [...], 'page_url', 'html', 'fetched', 'stale'} или None.
+        Запись, сохранённая с меньшим max_docs и полным списком, не подходит для большего max_docs.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT key, max_docs, results, page_url, html, fetched, expires FROM queries WHERE key = ?",
+                (query_key(title, authors),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            key, stored_docs, results, page_url, html, fetched, expires = row
+            results = json.loads(results)
+            if stored_docs < max_docs and len(results) >= stored_docs:
+                self.misses += 1
+                return None
+            stale = expires <= time.time()
+            if stale and not allow_stale:
+                self.stale += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE queries SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        return {'results': results[:max_docs], 'page_url': page_url, 'html': _unpack(html),
+                'fetched': fetched, 'stale': stale}
+
+    def put_query(self, title, authors, results, max_docs=10, page_url=None, html=None, ttl=None):
+        """Сохраняет результат запроса; пустой список - запомненное «не найдено»"""
+        now = time.time()
+        packed = _pack(html)
+        content = json.dumps(results, ensure_ascii=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO queries (key, title, authors, max_docs, results, page_url, html, size,"
+                " fetched, expires, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (query_key(title, authors), title, authors, max_docs, content, page_url, packed,
+                 len(content) + len(packed or b""), now, now + (self.query_ttl if ttl is None else ttl), now))
+
+    def get_document(self, url, allow_stale=False):
+        """Запись {'fields': {...}, 'html', 'fetched', 'stale'} страницы документа или None"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fields, html, fetched, expires FROM documents WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            fields, html, fetched, expires = row
+            stale = expires <= time.time()
+            if stale and not allow_stale:
+                self.stale += 1
+                return None
+            self.hits += 1
+            self.connection.execute("UPDATE documents SET accessed = ? WHERE url = ?", (time.time(), url))
+            self.connection.commit()
+        return {'fields': json.loads(fields) if fields else {}, 'html': _unpack(html),
+                'fetched': fetched, 'stale': stale}
+
+    def put_document(self, url, fields, html=None, ttl=None):
+        now = time.time()
+        packed = _pack(html)
+        content = json.dumps(fields, ensure_ascii=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO documents (url, fields, html, size, fetched, expires, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, content, packed, len(content) + len(packed or b""), now,
+                 now + (self.document_ttl if ttl is None else ttl), now))
+
+    def documents(self):
+        """Все разобранные страницы документов: [(url, {...}), ...]"""
+        with self.lock:
+            rows = self.connection.execute("SELECT url, fields FROM documents").fetchall()
+        return [(url, json.loads(fields) if fields else {}) for url, fields in rows]
+
+    def is_fresh(self, title, authors):
+        with self.lock:
+            row = self.connection.execute("SELECT expires FROM queries WHERE key = ?",
+                                          (query_key(title, authors),)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def stale_queries(self):
+        """Запросы с истёкшим сроком: [{'title', 'authors'}, ...] - для режима обновления устаревших"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT title, authors FROM queries WHERE expires <= ? ORDER BY accessed DESC",
+                (time.time(),)).fetchall()
+        return [{'title': title or "", 'authors': authors or ""} for title, authors in rows]
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока суммарный размер не уложится в max_bytes"""
+        with self.lock, self.connection:
+            total = self.connection.execute(
+                "SELECT (SELECT COALESCE(SUM(size), 0) FROM queries) + (SELECT COALESCE(SUM(size), 0) FROM documents)"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            entries = self.connection.execute(
+                "SELECT 'queries', key, size, accessed FROM queries UNION ALL"
+                " SELECT 'documents', url, size, accessed FROM documents ORDER BY accessed").fetchall()
+            removed = 0
+            for table, key, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                column = "key" if table == "queries" else "url"
+                self.connection.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self):
+        with self.lock:
+            queries, query_bytes = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM queries").fetchone()
+            documents, document_bytes = self.connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents").fetchone()
+        lookups = self.hits + self.stale + self.misses
+        return {'queries': queries, 'documents': documents, 'bytes': query_bytes + document_bytes,
+                'hits': self.hits, 'stale': self.stale, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def close(self):
+        self.connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Кэш запросов и страниц документов ФИПС")
+    parser.add_argument("--cache", default=FIPS_CACHE, help="файл кэша SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="число записей и размер")
+    commands.add_parser("stale", help="список запросов с истёкшим сроком")
+    evict = commands.add_parser("evict", help="ужать кэш до заданного размера")
+    evict.add_argument("--max-size", type=int, default=FIPS_CACHE_MAX_BYTES // (1024 * 1024), help="МБ")
+    args = parser.parse_args()
+
+    cache = FIPSCache(args.cache)
+    try:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"Запросов: {stats['queries']}, документов: {stats['documents']}, "
+                  f"размер: {stats['bytes'] / (1024 * 1024):.1f} МБ")
+        elif args.command == "stale":
+            for query in cache.stale_queries():
+                print(f"{query['title']}\t{query['authors']}")
+        else:
+            cache.max_bytes = args.max_size * 1024 * 1024
+            print(f"Удалено записей: {cache.evict()}")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    main()
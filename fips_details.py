@@ -0,0 +1,173 @@
+import argparse
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+import tracing
+from fips_fixture import FixtureServer
+from fips_http import create_session
+from fips_page import parse_document_page
+from laba_4_3 import FIPS_COLUMNS, NOT_FOUND
+
+logger = logging.getLogger(__name__)
+
+LINK_COLUMN = 'Ссылка на страницу документа'
+DETAIL_WORKERS = 8
+# Не больше стольких одновременных запросов к одному сайту
+PER_HOST_LIMIT = 4
+RETRIES = 4
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class DetailFetcher:
+    """
+    Параллельная загрузка страниц документов на пуле keep-alive соединений: число
+    одновременных запросов к одному хосту ограничено per_host, при 429/5xx и сбоях сети -
+    повтор с экспоненциальной задержкой (с учётом Retry-After). Одновременные запросы одной
+    страницы объединяются в одну загрузку; при заданном cache (FIPSCache) разбор берётся из кэша по URL.
+    """
+
+    def __init__(self, workers=DETAIL_WORKERS, per_host=PER_HOST_LIMIT, retries=RETRIES, backoff=BACKOFF,
+                 timeout=30, cache=None, session=None):
+        self.per_host = per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        # Повторы делает сам загрузчик, поэтому у адаптера сессии они отключены
+        self.session = session or create_session(pool_size=max(workers, per_host), retries=0)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.hosts = {}
+        # Одна загрузка на URL, даже если ссылка встречается в нескольких запросах одновременно
+        self.pending = {}
+        self.fetched = 0
+        self.failed = 0
+
+    def _host_slot(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self.hosts[host]
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        return min(self.backoff * 2 ** attempt, MAX_BACKOFF) * (0.5 + random.random() / 2)
+
+    def _download(self, url):
+        slot = self._host_slot(url)
+        for attempt in range(self.retries + 1):
+            response = None
+            error = None
+            with slot:
+                try:
+                    with tracing.stage("FIPS detail GET", url=url):
+                        response = self.session.get(url, timeout=self.timeout)
+                    if response.status_code not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        response.encoding = response.encoding or "utf-8"
+                        return response.text
+                    error = f"HTTP {response.status_code}"
+                except requests.HTTPError:
+                    raise
+                except requests.RequestException as e:
+                    error = str(e)
+            if attempt == self.retries:
+                raise RuntimeError(f"{url}: {error}")
+            # Пауза вне семафора: ожидающий повтора не занимает место в лимите хоста
+            time.sleep(self._delay(attempt, response))
+
+    def fetch(self, url):
+        """Разобранные столбцы страницы документа"""
+        if self.cache is not None:
+            entry = self.cache.get_document(url)
+            if entry is not None:
+                return entry['fields']
+        page = self._download(url)
+        fields = parse_document_page(page, url)
+        if self.cache is not None:
+            self.cache.put_document(url, fields, page)
+        with self.lock:
+            self.fetched += 1
+        return fields
+
+    def _finished(self, url, future):
+        # В pending остаются только загрузки в работе: неудачная повторится при следующем
+        # запросе этого URL, удачная при кэше берётся из него, без кэша - загружается заново
+        with self.lock:
+            if self.pending.get(url) is future:
+                del self.pending[url]
+
+    def submit(self, url):
+        with self.lock:
+            future = self.pending.get(url)
+            # Завершённая загрузка могла ещё не убраться из pending
+            if future is None or future.done():
+                future = self.pending[url] = self.executor.submit(self.fetch, url)
+                created = True
+            else:
+                created = False
+        if created:
+            future.add_done_callback(lambda done: self._finished(url, done))
+        return future
+
+    def fill(self, rows):
+        """
+        Дополняет строки результатов столбцами со страниц документов (на месте).
+        Страницы всех строк загружаются одновременно; ошибка одной страницы не мешает остальным.
+        """
+        futures = [(row, self.submit(row[LINK_COLUMN])) for row in rows if row.get(LINK_COLUMN)]
+        for row, future in futures:
+            try:
+                fields = future.result()
+            except Exception as e:
+                with self.lock:
+                    self.failed += 1
+                logger.warning("Не удалось загрузить страницу документа: %s", e)
+                continue
+            for column in FIPS_COLUMNS:
+                if fields.get(column) and fields[column] != NOT_FOUND:
+                    row[column] = fields[column]
+        return rows
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка загрузки страниц документов на локальном сервере-заглушке")
+    parser.add_argument("-n", "--documents", type=int, default=50, help="число страниц")
+    parser.add_argument("-w", "--workers", type=int, default=DETAIL_WORKERS, help="число потоков")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT, help="одновременных запросов к хосту")
+    parser.add_argument("--delay", type=float, default=0.2, help="задержка ответа заглушки, s")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    with FixtureServer(delay=args.delay) as server:
+        rows = [{'Название': f"Ссылка {i + 1}",
+                 LINK_COLUMN: f"{server.url}/registers-doc-view/fips_servlet?DB=EVM&DocNumber={2023612345 + i}"}
+                for i in range(args.documents)]
+        started = time.perf_counter()
+        with DetailFetcher(args.workers, args.per_host) as fetcher:
+            fetcher.fill(rows)
+        elapsed = time.perf_counter() - started
+        complete = sum(all(row.get(column, NOT_FOUND) != NOT_FOUND for column in FIPS_COLUMNS) for row in rows)
+        print(f"Страниц: {len(rows)} за {elapsed:.2f} s, заполнены все столбцы: {complete}, "
+              f"одновременных запросов: {server.max_active}")
+        print(rows[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Заготовки страниц ФИПС для проверок лежат вместе с тестами
+FIXTURE_DIR = os.path.join(BASE_DIR, "tests", "fixtures")
+# Сохранённые страницы ФИПС, которые подставляются вместо сайта
+DEFAULT_ROUTES = {
+    "/iiss/search.xhtml": os.path.join(FIXTURE_DIR, "search_form.html"),
+    "/iiss/db.xhtml": os.path.join(BASE_DIR, "page_content.html"),
+    "/registers-doc-view/fips_servlet": os.path.join(FIXTURE_DIR, "document_page.html"),
+}
+# Ответы на отправку формы (POST): выдача по форме поиска
+DEFAULT_POST_ROUTES = {
+    "/iiss/search.xhtml": os.path.join(FIXTURE_DIR, "search_results.html"),
+}
+
+class FixtureServer:
+    """
+    Локальный HTTP-сервер, отдающий сохранённые HTML-страницы вместо fips.ru.
+    На GET и POST по пути из routes отдаётся соответствующий файл (для POST сначала ищется
+    в post_routes), остальное - 404. Поля отправленных форм сохраняются в posts.
+    delay имитирует задержку сайта; max_active - наибольшее число одновременных запросов.
+    """
+
+    def __init__(self, routes=None, host="127.0.0.1", port=0, delay=0.0, post_routes=None):
+        self.routes = dict(DEFAULT_ROUTES if routes is None else routes)
+        self.post_routes = dict(DEFAULT_POST_ROUTES if post_routes is None else post_routes)
+        self.requests = []
+        self.posts = []
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def _send_fixture(self):
+                with server.lock:
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    self._respond()
+                finally:
+                    with server.lock:
+                        server.active -= 1
+
+            def _respond(self):
+                path = urlparse(self.path).path
+                server.requests.append((self.command, self.path))
+                if server.delay:
+                    time.sleep(server.delay)
+                filename = server.routes.get(path)
+                if self.command == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    form = self.rfile.read(length).decode('utf-8')
+                    server.posts.append((path, dict(parse_qsl(form, keep_blank_values=True))))
+                    filename = server.post_routes.get(path, filename)
+                if filename is None or not os.path.isfile(filename):
+                    self.send_error(404)
+                    return
+                with open(filename, 'rb') as file:
+                    body = file.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _send_fixture
+            do_POST = _send_fixture
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,184 @@
+import logging
+import time
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html
+import tracing
+from fips_page import parse_results_page
+from laba_4_3 import FIPS_SEARCH_URL, site_domain
+
+logger = logging.getLogger(__name__)
+
+VIEW_STATE = "javax.faces.ViewState"
+SEARCH_FORMS = etree.XPath(f"//form[.//input[@name='{VIEW_STATE}'] or contains(@action, 'search.xhtml')]")
+TITLE_FIELD_SELECTORS = (
+    ".//input[contains(@id, 'docName') or contains(@name, 'docName')]",
+    ".//input[@placeholder='Название документа' or contains(@placeholder, 'назван')]",
+    ".//input[@type='text' and @name]",
+)
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0 Safari/537.36"
+
+def create_session(pool_size=10, retries=3):
+    """Сессия requests с пулом keep-alive соединений и повтором при сбоях сети/5xx"""
+    session = requests.Session()
+    # retries=0 - ответы 5xx возвращаются как есть, повторы остаются вызывающему
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504) if retries else (),
+                  allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "ru-RU,ru;q=0.9"})
+    return session
+
+class FIPSHttpSearch:
+    """
+    Поиск на сайте ФИПС без браузера: повтор отправки JSF-формы search.xhtml через
+    requests.Session (cookies, ViewState, keep-alive). Интерфейс совпадает с FIPSSearch.
+    """
+
+    def __init__(self, base_url=FIPS_SEARCH_URL, session=None, timeout=30):
+        self.base_url = base_url
+        self.domain = site_domain(base_url)
+        self.session = session or create_session()
+        self.timeout = timeout
+        self.results = []
+        self.timings = []
+        self.page_source = ""
+        self.page_url = base_url
+        self.last_error = None
+        # Последняя страница с формой поиска: её ViewState используется для следующего запроса
+        self._form_page = None
+        # Разобранная страница результатов последнего запроса
+        self._page = None
+
+    def _request(self, method, url, **kwargs):
+        started = time.perf_counter()
+        with tracing.stage(f"FIPS HTTP {method}", url=url):
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        self.timings.append((f"{method} {url}", time.perf_counter() - started))
+        response.raise_for_status()
+        response.encoding = response.encoding or "utf-8"
+        return response
+
+    def _load_search_page(self):
+        response = self._request("GET", self.base_url)
+        self._form_page = (response.url, response.text)
+        return self._form_page
+
+    def _find_title_field(self, tree):
+        """
+        Поле названия - по тем же признакам, что и в FIPSSearch, но только внутри JSF-формы
+        поиска (с ViewState или с action search.xhtml): поле «Поиск по сайту» в шапке не подходит
+        """
+        forms = SEARCH_FORMS(tree)
+        for selector in TITLE_FIELD_SELECTORS:
+            for form in forms:
+                fields = form.xpath(selector)
+                if fields:
+                    return fields[0]
+        return None
+
+    def _find_submit(self, form):
+        for selector in (".//button[contains(., 'Найти')]", ".//button[contains(., 'Поиск')]",
+                         ".//input[@type='submit' and contains(@value, 'Найти')]",
+                         ".//button[@type='submit']", ".//input[@type='submit']"):
+            buttons = form.xpath(selector)
+            if buttons:
+                return buttons[0]
+        return None
+
+    def _form_data(self, form, title_field, title):
+        """Все поля формы, как их отправил бы браузер, включая ViewState и имя кнопки"""
+        data = []
+        for field in form.xpath(".//input[@name] | .//select[@name] | .//textarea[@name]"):
+            name = field.get("name")
+            kind = (field.get("type") or "text").lower()
+            if field.tag == "input":
+                if kind in ("submit", "button", "image", "reset", "file"):
+                    continue
+                if kind in ("checkbox", "radio") and field.get("checked") is None:
+                    continue
+                value = field.get("value") or ("on" if kind in ("checkbox", "radio") else "")
+            elif field.tag == "select":
+                selected = field.xpath(".//option[@selected]") or field.xpath(".//option")
+                value = selected[0].get("value", selected[0].text_content()) if selected else ""
+            else:
+                value = field.text_content()
+            if field is title_field:
+                value = title
+            data.append((name, value))
+        button = self._find_submit(form)
+        if button is not None and button.get("name"):
+            data.append((button.get("name"), button.get("value") or button.get("name")))
+        return data
+
+    def _submit(self, page_url, page_html, title):
+        tree = html.fromstring(page_html)
+        title_field = self._find_title_field(tree)
+        if title_field is None:
+            raise ValueError(f"На странице {page_url} нет JSF-формы поиска с полем названия "
+                             f"({VIEW_STATE} или action search.xhtml)")
+        form = next(title_field.iterancestors("form"))
+        data = self._form_data(form, title_field, title)
+        action = urljoin(page_url, form.get("action") or page_url)
+        if (form.get("method") or "get").lower() == "post":
+            return self._request("POST", action, data=data, headers={"Referer": page_url})
+        return self._request("GET", action, params=data, headers={"Referer": page_url})
+
+    def search_document(self, title=None, authors=None):
+        """Поиск документа по названию и/или авторам"""
+        self.last_error = None
+        self._page = None
+        try:
+            page_url, page_html = self._form_page or self._load_search_page()
+            try:
+                response = self._submit(page_url, page_html, title or "")
+                if "ViewExpiredException" in response.text:
+                    raise ValueError("ViewState устарел")
+            except (requests.HTTPError, ValueError):
+                # Устаревший ViewState: берём свежую форму и повторяем один раз
+                page_url, page_html = self._load_search_page()
+                response = self._submit(page_url, page_html, title or "")
+
+            self.page_url = response.url
+            self.page_source = response.text
+            if VIEW_STATE in self.page_source and self._find_title_field(html.fromstring(self.page_source)) is not None:
+                self._form_page = (self.page_url, self.page_source)
+            return self._check_results()
+
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Ошибка при поиске: %s", str(e)[:200])
+            return False
+
+    def _parse_page(self, max_docs=10):
+        """Разбор страницы результатов один раз на запрос"""
+        if self._page is None or self._page_max_docs < max_docs:
+            self._page = parse_results_page(self.page_source, self.page_url, self.domain, max_docs)
+            self._page_max_docs = max_docs
+        return self._page
+
+    def _check_results(self):
+        """Проверка наличия результатов поиска"""
+        self._parse_page()
+        if self._page['no_results']:
+            logger.info("Найдена фраза '%s' - документы не найдены", self._page['no_results'])
+            return False
+        logger.info("Найдено ссылок на документы: %s", self._page['doc_links'])
+        return bool(self._page['doc_links'])
+
+    def extract_document_links(self, max_docs=10):
+        """Извлечение ссылок на документы"""
+        try:
+            page = self._parse_page(max_docs)
+            self.results = [dict(result) for result in page['results'][:max_docs]]
+            logger.info("Найдено ссылок: %d", len(self.results))
+            return len(self.results) > 0
+        except Exception as e:
+            logger.warning("Ошибка при извлечении ссылок: %s", e)
+            return False
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,73 @@
+import re
+from urllib.parse import urljoin
+from lxml import etree, html
+from cert_fields import extract_fields
+
+# Фразы, по которым страница сообщает об отсутствии результатов
+NO_RESULTS_PHRASES = [
+    "ничего не найдено", "не найдено", "нет результатов",
+    "no results found", "не найдены"
+]
+NO_RESULTS = re.compile("|".join(re.escape(phrase) for phrase in NO_RESULTS_PHRASES), re.IGNORECASE)
+DOC_LINKS_XPATH = "//a[contains(@href, 'document') or contains(@href, 'id=')]"
+# Все возможные ссылки на документы одним запросом (раньше - четыре отдельных XPath)
+CANDIDATE_LINKS = etree.XPath(
+    "//a[contains(@href, 'document') or contains(@href, 'id=') or contains(@href, 'search_result')"
+    " or contains(text(), 'патент') or contains(text(), 'заявка')]")
+# Строка выдачи, в которой стоит ссылка: из неё берётся регистрационный номер
+RESULT_ROW = etree.XPath("ancestor::*[self::tr or self::li][1]")
+REG_NUMBER = re.compile(r'(?<!\d)(\d{7,10})(?!\d)')
+
+def parse_results_page(page_source, page_url, domain, max_docs=10):
+    """
+    Разбор страницы выдачи за один проход по снимку page_source. Возвращает
+    {'no_results': фраза или None, 'doc_links': число ссылок на документы,
+     'results': [{'Название', 'Регистрационный номер' (если найден), 'Ссылка на страницу документа'}, ...]}
+    """
+    page = {'no_results': None, 'doc_links': 0, 'results': []}
+    match = NO_RESULTS.search(page_source)
+    if match:
+        page['no_results'] = match.group(0).lower()
+        return page
+    if not page_source.strip():
+        return page
+
+    tree = html.fromstring(page_source)
+    seen_hrefs = set()
+    for link in CANDIDATE_LINKS(tree):
+        raw_href = link.get("href") or ""
+        if 'document' in raw_href or 'id=' in raw_href:
+            page['doc_links'] += 1
+        href = urljoin(page_url, raw_href)
+        if not raw_href or href in seen_hrefs or domain not in href:
+            continue
+        seen_hrefs.add(href)
+        if len(page['results']) >= max_docs:
+            continue
+        text = " ".join(link.text_content().split())
+        row = RESULT_ROW(link)
+        number = REG_NUMBER.search(row[0].text_content() if row else text)
+        result = {'Название': text if text else f"Ссылка {len(page['results']) + 1}"}
+        if number:
+            result['Регистрационный номер'] = number.group(1)
+        result['Ссылка на страницу документа'] = href
+        page['results'].append(result)
+    return page
+
+def page_text(page_source):
+    """Текст страницы без скриптов и стилей, блоки разделены переводами строк"""
+    tree = html.fromstring(page_source)
+    for element in tree.xpath("//script | //style | //noscript"):
+        element.drop_tree()
+    for element in tree.xpath("//br | //p | //tr | //div | //li | //td"):
+        element.tail = "\n" + (element.tail or "")
+    return "\n".join(line.strip() for line in tree.text_content().splitlines() if line.strip())
+
+def parse_document_page(page_source, page_url):
+    """
+    Все столбцы fips_results со страницы документа (карточки реестра) за один разбор:
+    поля ищутся теми же шаблонами, что и в выписках из реестра в 4.2.
+    """
+    fields = extract_fields(page_text(page_source) if page_source.strip() else "")
+    fields['Ссылка на страницу документа'] = page_url
+    return fields
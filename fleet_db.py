@@ -0,0 +1,201 @@
+import argparse
+import os
+import sqlite3
+import time
+from analysis import analyze_log
+from log_cache import load_sections_cached
+from parse import parse_items, split_value_units
+
+FLEET_DB = os.environ.get("FLEET_DB", "fleet.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    battery_type TEXT,
+    cells INTEGER,
+    mode TEXT,
+    rows INTEGER,
+    total_time REAL,
+    imported REAL
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    log_id INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    value TEXT,
+    number REAL,
+    unit TEXT,
+    PRIMARY KEY (log_id, section, name, position)
+);
+CREATE TABLE IF NOT EXISTS cycles (
+    log_id INTEGER NOT NULL REFERENCES logs(id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    full INTEGER NOT NULL,
+    start_row INTEGER,
+    end_row INTEGER,
+    duration REAL,
+    start_voltage REAL,
+    end_voltage REAL,
+    capacity REAL,
+    energy REAL,
+    PRIMARY KEY (log_id, number)
+);
+CREATE INDEX IF NOT EXISTS logs_battery ON logs(battery_type, cells);
+CREATE INDEX IF NOT EXISTS parameters_name ON parameters(section, name, number);
+CREATE INDEX IF NOT EXISTS cycles_type ON cycles(type, full, log_id);
+"""
+
+# Итоговые параметры отчёта: столбец таблицы cycles, тип цикла, только полные циклы
+PARAMETERS = {
+    'CapChg': ("capacity * 1000", "charge", False),
+    'CapDsc': ("capacity * 1000", "discharge", False),
+    'EneChg': ("energy * 1000", "charge", False),
+    'EneDsc': ("energy * 1000", "discharge", False),
+    'TimeChg': ("duration / 3600.0", "charge", True),
+    'TimeDsc': ("duration / 3600.0", "discharge", True),
+}
+
+def connect(db_path=FLEET_DB):
+    """Соединение с базой; схема создаётся при первом обращении"""
+    connection = sqlite3.connect(db_path, timeout=60)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+def _parameter_rows(section, items):
+    for name, value in items.items():
+        values = value if isinstance(value, list) else [value]
+        for position, item in enumerate(values):
+            number, unit = split_value_units(item)
+            yield (section, name, position, item, number, unit if number is not None else None)
+
+def store_log(connection, path, sections, analysis=None):
+    """
+    Записывает параметры Items/End и сводку по циклам одного лога в одной транзакции.
+    Повторный импорт того же файла заменяет прежние записи.
+    """
+    if analysis is None:
+        analysis = analyze_log(sections)
+    items = analysis['items']
+    end = parse_items(sections.get("End", []))
+    cells, _ = split_value_units(items.get("Cells", ""))
+    stat = os.stat(path) if os.path.exists(path) else None
+    rows = len(analysis['time'])
+
+    with connection:
+        connection.execute("DELETE FROM logs WHERE path = ?", (os.path.abspath(path),))
+        log_id = connection.execute(
+            "INSERT INTO logs (path, name, size, mtime, battery_type, cells, mode, rows, total_time, imported)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(path), os.path.basename(path), stat.st_size if stat else None,
+             stat.st_mtime if stat else None, items.get("Type"), int(cells) if cells else None,
+             items.get("Mode"), rows, analysis['total_time'], time.time())).lastrowid
+        parameters = list(_parameter_rows("Items", items)) + list(_parameter_rows("End", end))
+        connection.executemany(
+            "INSERT INTO parameters (log_id, section, name, position, value, number, unit)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(log_id,) + row for row in parameters])
+        connection.executemany(
+            "INSERT INTO cycles (log_id, number, type, full, start_row, end_row, duration,"
+            " start_voltage, end_voltage, capacity, energy) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(log_id, c['number'], c['type'], int(c['full']), c['start'], c['end'], c['duration'],
+              c['start_voltage'], c['end_voltage'], c['capacity'], c['energy'])
+             for c in analysis['cycles']])
+    return log_id
+
+def import_logs(source, db_path=FLEET_DB):
+    """Импорт всех логов из каталога или по glob-шаблону"""
+    from batch import collect_logs
+    logs = collect_logs(source)
+    connection = connect(db_path)
+    try:
+        for path in logs:
+            started = time.perf_counter()
+            sections = load_sections_cached(path)
+            if not sections:
+                print(f"Пропущен {path}: не удалось прочитать")
+                continue
+            store_log(connection, path, sections)
+            print(f"{path}: {time.perf_counter() - started:.2f} s")
+    finally:
+        connection.close()
+    return len(logs)
+
+def _battery_filter(battery_type, cells):
+    conditions, params = [], []
+    if battery_type:
+        conditions.append("l.battery_type = ?")
+        params.append(battery_type)
+    if cells:
+        conditions.append("l.cells = ?")
+        params.append(cells)
+    return "".join(" AND " + condition for condition in conditions), params
+
+def parameter_trend(connection, parameter="CapDsc", battery_type=None, cells=None):
+    """
+    Значение итогового параметра (CapDsc, EneChg, TimeDsc, ...) по каждому логу,
+    в порядке логов: [(имя лога, среднее, число циклов), ...]. Как и в отчёте,
+    ёмкость и энергия берутся по полным циклам, а без них - по всем циклам типа.
+    """
+    if parameter not in PARAMETERS:
+        raise ValueError(f"Неизвестный параметр '{parameter}', доступны: {', '.join(PARAMETERS)}")
+    expression, kind, full_only = PARAMETERS[parameter]
+    where, params = _battery_filter(battery_type, cells)
+    full_condition = "c.full = 1" if full_only else (
+        "(c.full = 1 OR NOT EXISTS (SELECT 1 FROM cycles f"
+        " WHERE f.log_id = c.log_id AND f.type = c.type AND f.full = 1))")
+    query = (f"SELECT l.name, AVG({expression}), COUNT(*) FROM cycles c JOIN logs l ON l.id = c.log_id"
+             f" WHERE c.type = ? AND {full_condition}{where}"
+             " GROUP BY l.id ORDER BY l.name")
+    return connection.execute(query, [kind] + params).fetchall()
+
+def cycle_history(connection, kind="discharge", battery_type=None, cells=None, full_only=True):
+    """Все циклы одного типа по всем логам: [(имя лога, номер, ёмкость мАч, энергия мВтч), ...]"""
+    where, params = _battery_filter(battery_type, cells)
+    query = ("SELECT l.name, c.number, c.capacity * 1000, c.energy * 1000 FROM cycles c"
+             " JOIN logs l ON l.id = c.log_id WHERE c.type = ?"
+             + (" AND c.full = 1" if full_only else "") + where + " ORDER BY l.name, c.number")
+    return connection.execute(query, [kind] + params).fetchall()
+
+def parameter_values(connection, section, name, battery_type=None, cells=None):
+    """Значения параметра Items/End по логам, например IntRes: [(имя лога, позиция, число, единица), ...]"""
+    where, params = _battery_filter(battery_type, cells)
+    query = ("SELECT l.name, p.position, p.number, p.unit FROM parameters p JOIN logs l ON l.id = p.log_id"
+             " WHERE p.section = ? AND p.name = ?" + where + " ORDER BY l.name, p.position")
+    return connection.execute(query, [section, name] + params).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="База сводок по циклам всех обработанных логов")
+    parser.add_argument("--db", default=FLEET_DB, help="файл базы SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="импортировать логи")
+    importer.add_argument("source", help="каталог с логами или glob-шаблон")
+    trend = commands.add_parser("trend", help="итоговый параметр по логам")
+    trend.add_argument("parameter", nargs="?", default="CapDsc", choices=list(PARAMETERS))
+    trend.add_argument("--type", help="тип батареи, например LiPo")
+    trend.add_argument("--cells", type=int, help="число банок")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        started = time.perf_counter()
+        count = import_logs(args.source, args.db)
+        print(f"Импортировано логов: {count} за {time.perf_counter() - started:.2f} s")
+        return
+    connection = connect(args.db)
+    started = time.perf_counter()
+    rows = parameter_trend(connection, args.parameter, args.type, args.cells)
+    elapsed = time.perf_counter() - started
+    for name, value, cycles in rows:
+        print(f"{name}\t{value:.2f}\t(циклов: {cycles})")
+    print(f"Логов: {len(rows)}, запрос: {elapsed * 1000:.1f} ms")
+    connection.close()
+
+if __name__ == "__main__":
+    main()
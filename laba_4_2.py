@@ -0,0 +1,199 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import fitz
+from cert_fields import FIELD_COLUMNS, NOT_FOUND, extract_fields
+from cert_index import CERT_INDEX_DIR, CertIndex
+from export import TableExport, export_rows
+from ocr_cache import OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES, OCRCache, page_hash, settings_key
+
+try:
+    import pytesseract
+    from PIL import Image
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+COLUMNS = FIELD_COLUMNS + ['Полный путь до файла', 'Тип документа']
+DEFAULT_DATA_DIR = os.path.join("4.2", "data")
+OCR_LANG = "rus"
+OCR_DPI = 300
+# Страница считается текстовой, если в её текстовом слое достаточно кириллицы
+MIN_TEXT_LETTERS = 100
+MIN_CYRILLIC_SHARE = 0.6
+
+def has_text_layer(text):
+    """Проверяет, что текстовый слой страницы осмысленный, а не мусор от встроенного скана"""
+    letters = [c for c in text if c.isalpha()]
+    if len(letters) < MIN_TEXT_LETTERS:
+        return False
+    cyrillic = sum(1 for c in letters if 'а' <= c.lower() <= 'я' or c in 'ёЁ')
+    return cyrillic / len(letters) >= MIN_CYRILLIC_SHARE
+
+@lru_cache(maxsize=None)
+def tesseract_version():
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+def ocr_settings(dpi=OCR_DPI, lang=OCR_LANG):
+    """Движок и настройки OCR - часть ключа кэша распознавания"""
+    return {'engine': "tesseract", 'version': tesseract_version() if OCR_AVAILABLE else None,
+            'lang': lang, 'dpi': dpi}
+
+def ocr_page(page, dpi=OCR_DPI, lang=OCR_LANG):
+    """Растеризует страницу и распознаёт её локальным Tesseract; возвращает текст и рамки слов"""
+    if not OCR_AVAILABLE:
+        raise RuntimeError("OCR недоступен: установите pytesseract и Tesseract")
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+    data = pytesseract.image_to_data(image, lang=lang, output_type=pytesseract.Output.DICT)
+
+    words = []
+    lines = {}
+    for i, word in enumerate(data['text']):
+        if not word.strip():
+            continue
+        words.append({
+            'text': word,
+            'left': data['left'][i], 'top': data['top'][i],
+            'width': data['width'][i], 'height': data['height'][i],
+            'conf': float(data['conf'][i]),
+        })
+        line = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(line, []).append(word)
+    text = "\n".join(" ".join(line_words) for _, line_words in sorted(lines.items()))
+    return text, words
+
+def read_page(path, page_number, dpi=OCR_DPI, lang=OCR_LANG, cache_dir=None):
+    """
+    Текст одной страницы: быстрый текстовый слой, а при его отсутствии - OCR.
+    Если задан cache_dir, результат OCR берётся из кэша по хэшу содержимого страницы.
+    """
+    result = {'path': path, 'page': page_number, 'text': "", 'ocr': False, 'cached': False, 'error': None}
+    try:
+        with fitz.open(path) as document:
+            page = document[page_number]
+            text = page.get_text()
+            if has_text_layer(text):
+                result['text'] = text
+                return result
+
+            result['ocr'] = True
+            cache = OCRCache(cache_dir) if cache_dir else None
+            if cache:
+                settings = ocr_settings(dpi, lang)
+                key = settings_key(page_hash(document, page), settings)
+                entry = cache.get(key)
+                if entry is not None:
+                    result['text'] = entry['text']
+                    result['cached'] = True
+                    return result
+            result['text'], words = ocr_page(page, dpi, lang)
+            if cache:
+                cache.put(key, result['text'], words, settings)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _read_page_task(task):
+    return read_page(*task)
+
+def collect_pdfs(folder):
+    """Все PDF в каталоге и его подкаталогах"""
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+def extract_folder(folder=DEFAULT_DATA_DIR, workers=None, dpi=OCR_DPI, lang=OCR_LANG,
+                   cache_dir=OCR_CACHE_DIR, cache_max_bytes=OCR_CACHE_MAX_BYTES):
+    """
+    Параллельно читает все страницы всех PDF и собирает по строке таблицы на документ.
+    cache_dir=None отключает кэш OCR.
+    """
+    paths = collect_pdfs(folder)
+    tasks = []
+    for path in paths:
+        try:
+            with fitz.open(path) as document:
+                tasks.extend((path, number, dpi, lang, cache_dir) for number in range(document.page_count))
+        except Exception as e:
+            print(f"Не удалось открыть {path}: {e}")
+    print(f"Документов: {len(paths)}, страниц: {len(tasks)}")
+
+    pages = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        for page in executor.map(_read_page_task, tasks, chunksize=chunksize):
+            if page['error']:
+                print(f"  Ошибка: {page['path']}, стр. {page['page'] + 1}: {page['error']}")
+            pages.setdefault(page['path'], []).append(page)
+
+    if cache_dir:
+        cache = OCRCache(cache_dir, cache_max_bytes)
+        for page in (p for document_pages in pages.values() for p in document_pages if p['ocr'] and not p['error']):
+            if page['cached']:
+                cache.hits += 1
+            else:
+                cache.misses += 1
+        removed = cache.evict()
+        stats = cache.stats()
+        print(f"Кэш OCR: попаданий {stats['hits']}, промахов {stats['misses']}, "
+              f"доля попаданий {stats['hit_rate']:.0%}, удалено записей {removed}")
+
+    rows = []
+    for path in paths:
+        document_pages = sorted(pages.get(path, []), key=lambda p: p['page'])
+        if not document_pages:
+            continue
+        row = extract_fields("\n".join(p['text'] for p in document_pages))
+        row['Полный путь до файла'] = os.path.abspath(path)
+        row['Тип документа'] = "Изображение" if any(p['ocr'] for p in document_pages) else "Текст"
+        rows.append(row)
+    return rows
+
+def save_results(rows, csv_file="pdf_results.csv"):
+    """
+    Сохраняет таблицу с теми же названиями столбцов, что и fips_results.csv:
+    в CSV, а для имени .xlsx - в книгу Excel (потоковый лист openpyxl)
+    """
+    if csv_file.lower().endswith(".xlsx"):
+        with TableExport(csv_file) as export:
+            export_rows(rows, export, "PDF", COLUMNS)
+    else:
+        with open(csv_file, 'w', encoding='utf-8-sig', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+    print(f"Результаты сохранены в {csv_file}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Извлечение данных из свидетельств о регистрации программ для ЭВМ")
+    parser.add_argument("folder", nargs="?", default=DEFAULT_DATA_DIR, help="каталог с PDF")
+    parser.add_argument("-o", "--output", default="pdf_results.csv", help="файл результатов: .csv или .xlsx")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число процессов")
+    parser.add_argument("--dpi", type=int, default=OCR_DPI, help="разрешение растеризации для OCR")
+    parser.add_argument("--lang", default=OCR_LANG, help="язык Tesseract")
+    parser.add_argument("--cache-dir", default=OCR_CACHE_DIR, help="каталог кэша OCR")
+    parser.add_argument("--cache-size", type=int, default=OCR_CACHE_MAX_BYTES // (1024 * 1024), help="размер кэша OCR, МБ")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш OCR")
+    parser.add_argument("--index", default=CERT_INDEX_DIR, help="каталог локального индекса свидетельств")
+    parser.add_argument("--no-index", action="store_true", help="не добавлять документы в локальный индекс")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cache_dir = None if args.no_cache else args.cache_dir
+    rows = extract_folder(args.folder, args.workers, args.dpi, args.lang, cache_dir, args.cache_size * 1024 * 1024)
+    save_results(rows, args.output)
+    if not args.no_index:
+        with CertIndex(args.index) as index:
+            print(f"Добавлено в локальный индекс: {index.add(rows)}, всего записей: {len(index)}")
+    print(f"Обработано документов: {len(rows)} за {time.perf_counter() - started:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
+import base64
+import logging
+import os
+import threading
 import time
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -8,9 +13,98 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.keys import Keys
 from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime
+from urllib.parse import urlparse
+import tracing
+from fips_page import DOC_LINKS_XPATH, NO_RESULTS, NO_RESULTS_PHRASES, parse_results_page
+
+logger = logging.getLogger(__name__)
+
+FIPS_SEARCH_URL = "https://www.fips.ru/iiss/search.xhtml"
+# Столбцы выходной таблицы fips_results.csv/.json
+FIPS_COLUMNS = [
+    'Название', 'Авторы', 'Регистрационный номер', 'Номер заявки', 'Правообладатель',
+    'Дата поступления', 'Дата регистрации', 'Ссылка на страницу документа'
+]
+NOT_FOUND = "Не указано"
+PDF_OUTPUT_DIR = "fips_pdf"
+# Параметры Page.printToPDF: A4, с фоном, как при печати страницы из браузера
+PDF_PRINT_OPTIONS = {
+    "printBackground": True,
+    "paperWidth": 8.27,
+    "paperHeight": 11.69,
+    "marginTop": 0.4,
+    "marginBottom": 0.4,
+    "marginLeft": 0.4,
+    "marginRight": 0.4,
+}
+
+def site_domain(url):
+    """Домен сайта без www: по нему отбираются ссылки на документы"""
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+def safe_title(title, index=0):
+    """Имя файла из названия документа: только буквы, цифры, пробел, '-' и '_', не длиннее 50 символов"""
+    name = "".join(c for c in (title or "") if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return name[:50] or f"doc_{index}"
+
+_names_lock = threading.Lock()
+
+def unique_name(name, used):
+    """Добавляет номер к совпадающим именам файлов; used может быть общим для нескольких потоков"""
+    with _names_lock:
+        candidate, n = name, 2
+        while candidate in used:
+            candidate, n = f"{name}_{n}", n + 1
+        used.add(candidate)
+        return candidate
+
+def export_pdfs(results, output_dir=".", workers=2, tabs=4, base_url=FIPS_SEARCH_URL):
+    """
+    Пакетное сохранение страниц документов в PDF на нескольких headless-браузерах:
+    результаты делятся между потоками, каждый поток печатает свою часть через вкладки.
+    """
+    workers = max(1, min(workers, len(results)))
+    parts = [results[i::workers] for i in range(workers)]
+    saved = []
+    used_names = set()
+    lock = threading.Lock()
+
+    def export_part(part):
+        searcher = None
+        try:
+            searcher = FIPSSearch(headless=True, base_url=base_url)
+            searcher.results = part
+            paths = searcher.save_pages_as_pdf(output_dir, tabs, used_names)
+            with lock:
+                saved.extend(paths)
+        except Exception as e:
+            logger.warning("Ошибка запуска браузера: %s", e)
+        finally:
+            if searcher:
+                searcher.close()
+
+    threads = [threading.Thread(target=export_part, args=(part,)) for part in parts if part]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return saved
 
 class FIPSSearch:
-    def __init__(self, headless=False):
+    # Фразы, по которым страница сообщает об отсутствии результатов
+    NO_RESULTS_PHRASES = NO_RESULTS_PHRASES
+    DOC_LINKS_XPATH = DOC_LINKS_XPATH
+    # Нет незавершённых AJAX-запросов jQuery/PrimeFaces (JSF-страницы ФИПС)
+    NETWORK_IDLE_SCRIPT = """
+        if (document.readyState !== 'complete') return false;
+        if (window.jQuery && jQuery.active > 0) return false;
+        if (window.PrimeFaces && PrimeFaces.ajax && PrimeFaces.ajax.Queue
+            && !PrimeFaces.ajax.Queue.isEmpty()) return false;
+        return true;
+    """
+
+    def __init__(self, headless=False, base_url=FIPS_SEARCH_URL):
         """Инициализация драйвера Chrome"""
         chrome_options = Options()
         if headless:
@@ -23,21 +117,70 @@ class FIPSSearch:
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
         
         self.wait = WebDriverWait(self.driver, 30)
-        self.base_url = "https://www.fips.ru/iiss/search.xhtml"
+        self.base_url = base_url
+        self.domain = site_domain(base_url)
         self.results = []
+        self.timings = []
+        # Адрес и HTML последней страницы результатов (для кэша), текст последней ошибки поиска:
+        # False при заданном last_error - сбой, а не «ничего не найдено»
+        self.page_url = base_url
+        self.page_source = ""
+        self.last_error = None
+        # Документы, не сохранённые последним вызовом save_pages_as_pdf
+        self.pdf_failures = []
+        # Разобранный снимок текущей страницы результатов (см. _parse_page)
+        self._page = None
+        self._page_max_docs = 0
         
+    @contextmanager
+    def _step(self, name):
+        """Замер времени шага; результаты копятся в self.timings и в трассе tracing"""
+        started = time.perf_counter()
+        try:
+            with tracing.stage(f"FIPS: {name}"):
+                yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings.append((name, elapsed))
+            logger.info("  [%.2f s] %s", elapsed, name)
+
+    def _wait_network_idle(self):
+        """Ожидание загрузки документа и завершения AJAX-запросов"""
+        self.wait.until(lambda driver: driver.execute_script(self.NETWORK_IDLE_SCRIPT))
+
+    def _results_ready(self, driver):
+        """Условие ожидания: на странице появились ссылки на документы или сообщение об их отсутствии"""
+        if driver.find_elements(By.XPATH, self.DOC_LINKS_XPATH):
+            return True
+        return NO_RESULTS.search(driver.page_source) is not None
+
+    def _fail(self, message):
+        logger.warning(message)
+        self.last_error = message
+        return False
+
+    def print_timings(self):
+        """Сводка по времени шагов"""
+        logger.info("Время выполнения шагов:")
+        for name, elapsed in self.timings:
+            logger.info("  %s: %.2f s", name, elapsed)
+        logger.info("  Всего: %.2f s", sum(elapsed for _, elapsed in self.timings))
+
     def search_document(self, title=None, authors=None):
         """Поиск документа по названию и/или авторам"""
+        self._page = None
+        self.last_error = None
         try:
-            print("Открытие сайта ФИПС...")
-            self.driver.get(self.base_url)
-            time.sleep(5)
+            logger.info("Открытие сайта ФИПС...")
+            with self._step("Загрузка страницы поиска"):
+                self.driver.get(self.base_url)
+                self._wait_network_idle()
+                self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "input")))
             
-            if "fips.ru" not in self.driver.current_url:
-                print("Не удалось загрузить страницу ФИПС")
-                return False
+            if self.domain not in self.driver.current_url:
+                return self._fail("Не удалось загрузить страницу ФИПС")
             
-            print("Поиск полей ввода...")
+            logger.info("Поиск полей ввода...")
             
             # Поиск поля для названия
             title_field = None
@@ -55,13 +198,14 @@ class FIPSSearch:
             
             # Ввод названия
             if title and title_field:
-                print(f"Ввод названия: {title}")
-                title_field.clear()
-                title_field.send_keys(title)
-                time.sleep(1)
+                logger.info("Ввод названия: %s", title)
+                with self._step("Ввод названия"):
+                    title_field.clear()
+                    title_field.send_keys(title)
+                    self.wait.until(lambda driver: title_field.get_attribute('value') == title)
             
             # Поиск кнопки "Найти"
-            print("Поиск кнопки для выполнения поиска...")
+            logger.info("Поиск кнопки для выполнения поиска...")
             search_button = None
             
             button_selectors = [
@@ -76,177 +220,184 @@ class FIPSSearch:
                     buttons = self.driver.find_elements(By.XPATH, selector)
                     if buttons:
                         search_button = buttons[0]
-                        print(f"Найдена кнопка с селектором: {selector}")
+                        logger.info("Найдена кнопка с селектором: %s", selector)
                         break
                 except:
                     continue
             
-            if search_button:
-                print("Выполнение поиска...")
-                self.driver.execute_script("arguments[0].click();", search_button)
-                time.sleep(3)
-            else:
-                if title_field:
-                    title_field.send_keys(Keys.RETURN)
-                    time.sleep(3)
+            if not search_button and not title_field:
+                return self._fail("Не найдены элементы для поиска")
+            
+            # Снимок страницы до отправки: после неё страница перезагружается или меняется AJAX
+            old_page = self.driver.find_element(By.TAG_NAME, "html")
+            old_source = self.driver.page_source
+            with self._step("Отправка запроса"):
+                if search_button:
+                    logger.info("Выполнение поиска...")
+                    self.driver.execute_script("arguments[0].click();", search_button)
                 else:
-                    print("Не найдены элементы для поиска")
-                    return False
+                    title_field.send_keys(Keys.RETURN)
             
-            print("Ожидание загрузки результатов...")
-            time.sleep(5)
+            logger.info("Ожидание загрузки результатов...")
+            with self._step("Ожидание результатов"):
+                self.wait.until(lambda driver: EC.staleness_of(old_page)(driver)
+                                or driver.page_source != old_source)
+                self._wait_network_idle()
+                self.wait.until(self._results_ready)
+            self.page_url = self.driver.current_url
+            self.page_source = self.driver.page_source
             
             return self._check_results()
             
         except Exception as e:
-            print(f"Ошибка при поиске: {str(e)[:200]}")
-            return False
+            return self._fail(f"Ошибка при поиске: {str(e)[:200]}")
     
+    def _parse_page(self, max_docs=10):
+        """Один снимок page_source и один разбор его lxml; результат переиспользуется"""
+        if self._page is None or self._page_max_docs < max_docs:
+            with self._step("Разбор страницы результатов"):
+                self._page = parse_results_page(self.page_source or self.driver.page_source,
+                                                self.page_url or self.driver.current_url, self.domain, max_docs)
+            self._page_max_docs = max_docs
+        return self._page
+
     def _check_results(self):
         """Проверка наличия результатов поиска"""
         try:
-            no_results_phrases = [
-                "ничего не найдено", "не найдено", "нет результатов", 
-                "no results found", "не найдены"
-            ]
-            
-            page_text = self.driver.page_source.lower()
-            for phrase in no_results_phrases:
-                if phrase in page_text:
-                    print(f"Найдена фраза '{phrase}' - документы не найдены")
-                    return False
+            page = self._parse_page()
+            if page['no_results']:
+                logger.info("Найдена фраза '%s' - документы не найдены", page['no_results'])
+                return False
             
-            # Проверяем наличие ссылок на документы
-            doc_links = self.driver.find_elements(By.XPATH, "//a[contains(@href, 'document') or contains(@href, 'id=')]")
-            print(f"Найдено ссылок на документы: {len(doc_links)}")
+            logger.info("Найдено ссылок на документы: %s", page['doc_links'])
             
-            if doc_links:
-                print("Найдены потенциальные результаты поиска")
+            if page['doc_links']:
+                logger.info("Найдены потенциальные результаты поиска")
                 return True
             else:
-                print("Не найдено результатов поиска")
+                logger.info("Не найдено результатов поиска")
                 return False
                 
         except Exception as e:
-            print(f"Ошибка при проверке результатов: {e}")
-            return False
+            return self._fail(f"Ошибка при проверке результатов: {e}")
     
     def extract_document_links(self, max_docs=10):
         """Извлечение ссылок на документы"""
         try:
-            print("Извлечение ссылок на документы...")
-            
-            # Ищем все ссылки, которые могут вести к документам
-            link_selectors = [
-                "//a[contains(@href, 'document')]",
-                "//a[contains(@href, 'id=')]",
-                "//a[contains(@href, 'search_result')]",
-                "//a[contains(text(), 'патент') or contains(text(), 'заявка')]"
-            ]
-            
-            all_links = []
-            for selector in link_selectors:
-                try:
-                    links = self.driver.find_elements(By.XPATH, selector)
-                    all_links.extend(links)
-                except:
-                    continue
-            
-            # Убираем дубликаты
-            unique_links = []
-            seen_hrefs = set()
-            for link in all_links:
-                try:
-                    href = link.get_attribute('href')
-                    if href and href not in seen_hrefs and 'fips.ru' in href:
-                        seen_hrefs.add(href)
-                        unique_links.append(link)
-                except:
-                    continue
-            
-            print(f"Найдено уникальных ссылок: {len(unique_links)}")
-            
-            # Сохраняем информацию о документах
-            self.results = []
-            for i, link in enumerate(unique_links[:max_docs]):
-                try:
-                    doc_info = {
-                        'Название': link.text.strip() if link.text.strip() else f"Ссылка {i+1}",
-                        'Ссылка на страницу документа': link.get_attribute('href')
-                    }
-                    
-                    self.results.append(doc_info)
-                    print(f"  Добавлена ссылка {i+1}: {doc_info['Название'][:50]}...")
-                    
-                except Exception as e:
-                    print(f"  Ошибка при обработке ссылки {i+1}: {e}")
-                    continue
-            
+            logger.info("Извлечение ссылок на документы...")
+            page = self._parse_page(max_docs)
+            self.results = [dict(result) for result in page['results'][:max_docs]]
+            for i, doc_info in enumerate(self.results):
+                logger.info("  Добавлена ссылка %d: %s...", i + 1, doc_info['Название'][:50])
             return len(self.results) > 0
             
         except Exception as e:
-            print(f"Ошибка при извлечении ссылок: {e}")
+            logger.warning("Ошибка при извлечении ссылок: %s", e)
             return False
     
-    def save_pages_as_pdf(self):
-        """Сохранение страниц документов через печать в PDF"""
+    def print_to_pdf(self, path):
+        """Печать текущей вкладки в PDF через DevTools (Page.printToPDF) без диалога печати"""
+        pdf = self.driver.execute_cdp_cmd("Page.printToPDF", PDF_PRINT_OPTIONS)
+        with open(path, 'wb') as file:
+            file.write(base64.b64decode(pdf['data']))
+        return path
+
+    def _close_tab(self, handle, main_window):
+        """Закрывает вкладку документа (не окно поиска) и возвращается в окно поиска"""
+        try:
+            if handle != main_window and self.driver.current_window_handle == handle:
+                self.driver.close()
+        finally:
+            self.driver.switch_to.window(main_window)
+
+    def save_pages_as_pdf(self, output_dir=".", tabs=4, used_names=None):
+        """
+        Сохранение страниц документов в PDF без участия пользователя. Документы
+        загружаются пачками по tabs вкладок параллельно, затем каждая вкладка печатается.
+        Возвращает список сохранённых файлов; документы, которые не удалось открыть
+        или напечатать, остаются в self.pdf_failures как (номер, результат, ошибка).
+        """
+        saved = []
         try:
-            print(f"\nСохранение страниц документов...")
+            logger.info("Сохранение страниц документов...")
             
             if not self.results:
-                print("Нет ссылок на документы для сохранения")
-                return
+                logger.info("Нет ссылок на документы для сохранения")
+                return saved
             
-            print(f"Найдено документов для сохранения: {len(self.results)}")
+            os.makedirs(output_dir, exist_ok=True)
+            jobs = [(i, result) for i, result in enumerate(self.results)
+                    if (result.get('Ссылка на страницу документа') or "").startswith('http')]
+            logger.info("Найдено документов для сохранения: %d", len(jobs))
+            used_names = set() if used_names is None else used_names
+            self.pdf_failures = []
+            main_window = self.driver.current_window_handle
             
-            for i, result in enumerate(self.results):
-                link = result.get('Ссылка на страницу документа')
-                if link and link.startswith('http'):
+            for batch_start in range(0, len(jobs), max(1, tabs)):
+                batch = jobs[batch_start:batch_start + max(1, tabs)]
+                # Открываем все документы пачки в новых вкладках: страницы грузятся одновременно
+                opened = []
+                with self._step(f"Загрузка документов {batch_start + 1}-{batch_start + len(batch)}"):
+                    for i, result in batch:
+                        known = set(self.driver.window_handles)
+                        try:
+                            self.driver.switch_to.new_window('tab')
+                            handle = next(h for h in self.driver.window_handles if h not in known)
+                            opened.append((i, result, handle))
+                            self.driver.execute_script("window.location.href = arguments[0];",
+                                                       result['Ссылка на страницу документа'])
+                        except Exception as e:
+                            logger.warning("  Не удалось открыть вкладку документа %d: %s", i + 1, e)
+                            self.pdf_failures.append((i, result, str(e)))
+                            if opened and opened[-1][0] == i:
+                                # Вкладка открылась, но переход по ссылке не удался
+                                self._close_tab(opened.pop()[2], main_window)
+                            else:
+                                self.driver.switch_to.window(main_window)
+                
+                for i, result, handle in opened:
+                    switched = False
                     try:
-                        print(f"\nОбработка документа {i+1}/{len(self.results)}...")
-                        print(f"  Название: {result.get('Название', 'Без названия')[:50]}...")
-                        print(f"  Ссылка: {link}")
-                        
-                        # Открываем страницу документа
-                        self.driver.get(link)
-                        time.sleep(3)
-                        
-                        # Создаем имя файла
-                        safe_title = "".join(c for c in result.get('Название', f'doc_{i}') if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        safe_title = safe_title[:50]
-                        
-                        # Открываем диалог печати
-                        print("  Открытие диалога печати...")
-                        self.driver.execute_script('window.print();')
-                        
-                        print(f"  Диалог печати открыт. Для сохранения выберите 'Сохранить как PDF'")
-                        print(f"  Рекомендуемое имя файла: {safe_title}.pdf")
-                        
-                        # Ждем перед следующим документом
-                        if i < len(self.results) - 1:
-                            print("\n  Для продолжения закройте диалог печати и нажмите Enter...")
-                            input()
-                            
+                        logger.info("Обработка документа %d/%d...", i + 1, len(self.results))
+                        logger.info("  Название: %s...", result.get('Название', 'Без названия')[:50])
+                        logger.info("  Ссылка: %s", result['Ссылка на страницу документа'])
+                        self.driver.switch_to.window(handle)
+                        switched = True
+                        name = unique_name(safe_title(result.get('Название'), i), used_names)
+                        path = os.path.join(output_dir, name + ".pdf")
+                        with self._step(f"Печать документа {i+1}"):
+                            self._wait_network_idle()
+                            self.print_to_pdf(path)
+                        saved.append(path)
+                        logger.info("  Сохранено: %s", path)
                     except Exception as e:
-                        print(f"  Ошибка при обработке документа {i+1}: {e}")
-                        continue
+                        logger.warning("  Ошибка при обработке документа %d: %s", i + 1, e)
+                        self.pdf_failures.append((i, result, str(e)))
+                    finally:
+                        # Закрываем только вкладку, на которую переключились: иначе можно закрыть окно поиска
+                        if switched:
+                            self._close_tab(handle, main_window)
+                self.driver.switch_to.window(main_window)
             
-            print(f"\nЗавершено. Всего обработано: {len(self.results)} документов")
+            logger.info("Завершено. Сохранено %d из %d документов, ошибок: %d",
+                        len(saved), len(jobs), len(self.pdf_failures))
             
         except Exception as e:
-            print(f"Ошибка при сохранении PDF: {e}")
+            logger.warning("Ошибка при сохранении PDF: %s", e)
+        return saved
     
     def close(self):
         """Закрытие браузера"""
         try:
             self.driver.quit()
-            print("\nБраузер закрыт")
+            logger.info("Браузер закрыт")
         except:
             pass
 
 
 def main():
     """Основная функция программы"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("="*70)
     print("ПРОГРАММА ПОИСКА ДОКУМЕНТОВ ФИПС")
     print("="*70)
@@ -263,7 +414,8 @@ def main():
     print("="*70)
     
     # Инициализация поиска
-    searcher = FIPSSearch(headless=False)  # headless=False для отображения браузера
+    # Печать в PDF через DevTools работает только в headless-режиме
+    searcher = FIPSSearch(headless=True)
     
     try:
         # Выполнение поиска
@@ -280,16 +432,10 @@ def main():
                 
                 # Сохранение через печать
                 print("\n" + "="*70)
-                print("СОХРАНЕНИЕ СТРАНИЦ В PDF ЧЕРЕЗ ПЕЧАТЬ")
-                print("="*70)
-                print("Инструкция:")
-                print("1. Для каждого документа откроется диалог печати")
-                print("2. В диалоге печати выберите 'Сохранить как PDF'")
-                print("3. Укажите место сохранения и имя файла")
-                print("4. После сохранения закройте диалог печати")
+                print("СОХРАНЕНИЕ СТРАНИЦ В PDF")
                 print("="*70)
                 
-                searcher.save_pages_as_pdf()
+                searcher.save_pages_as_pdf(PDF_OUTPUT_DIR)
                 
             else:
                 print("\nНе удалось извлечь ссылки на документы")
@@ -300,8 +446,8 @@ def main():
         print(f"\nПроизошла ошибка: {e}")
     
     finally:
+        searcher.print_timings()
         # Закрытие браузера
-        input("\nНажмите Enter для завершения...")
         searcher.close()
 
 
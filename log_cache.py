@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from parse import DATA_SECTION, parse_sections_file
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("LOG_CACHE_DIR", ".log_cache")
+# Предельный суммарный размер кэша на диске
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+META_FILE = "meta.json"
+COLUMNS_FILE = "columns.npy"
+CACHE_VERSION = 1
+
+def file_key(filename, content_hash=False):
+    """
+    Ключ кэша: путь + размер + время изменения файла.
+    При content_hash=True вместо времени изменения используется хэш содержимого.
+    """
+    stat = os.stat(filename)
+    digest = hashlib.sha1()
+    digest.update(os.path.abspath(filename).encode('utf-8'))
+    digest.update(str(stat.st_size).encode())
+    if content_hash:
+        with open(filename, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+    else:
+        digest.update(str(stat.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+def _entry_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def _read_entry(path):
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    if meta.get('version') != CACHE_VERSION:
+        return None
+    sections = {}
+    for name in meta['order']:
+        if name == DATA_SECTION:
+            names = meta['columns']
+            if names:
+                table = np.load(os.path.join(path, COLUMNS_FILE), mmap_mode='r')
+                sections[name] = {column: table[i] for i, column in enumerate(names)}
+            else:
+                sections[name] = {}
+        else:
+            sections[name] = meta['sections'][name]
+    # Отмечаем обращение для LRU
+    os.utime(os.path.join(path, META_FILE))
+    return sections
+
+def _write_entry(path, sections):
+    parent = os.path.dirname(path)
+    tmp_path = tempfile.mkdtemp(dir=parent)
+    try:
+        data = sections.get(DATA_SECTION) or {}
+        if data:
+            # Хранение по столбцам: каждый столбец - непрерывный участок файла
+            np.save(os.path.join(tmp_path, COLUMNS_FILE), np.stack(list(data.values())))
+        meta = {
+            'version': CACHE_VERSION,
+            'order': list(sections.keys()),
+            'columns': list(data.keys()),
+            'sections': {name: content for name, content in sections.items() if name != DATA_SECTION},
+        }
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Удаляет давно не использованные записи, пока кэш не уложится в max_bytes"""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        meta = os.path.join(path, META_FILE)
+        if os.path.isfile(meta):
+            entries.append((os.path.getmtime(meta), _entry_size(path), path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+@traced("load_sections_cached")
+def load_sections_cached(filename, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, content_hash=False):
+    """
+    То же, что parse_sections_file, но через бинарный кэш: при повторном чтении
+    неизменённого лога текст не разбирается, столбцы Data отображаются в память (mmap).
+    """
+    try:
+        key = file_key(filename, content_hash)
+    except OSError:
+        return parse_sections_file(filename)
+
+    path = os.path.join(cache_dir, key)
+    if os.path.isfile(os.path.join(path, META_FILE)):
+        try:
+            sections = _read_entry(path)
+            if sections is not None:
+                return sections
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Повреждённая запись кэша %s: %s", path, e)
+        shutil.rmtree(path, ignore_errors=True)
+
+    sections = parse_sections_file(filename)
+    if not sections:
+        return sections
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_entry(path, sections)
+        evict(cache_dir, max_bytes)
+    except OSError as e:
+        logger.warning("Не удалось записать кэш: %s", e)
+    return sections
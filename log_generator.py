@@ -0,0 +1,114 @@
+import argparse
+import numpy as np
+
+DATA_HEADER = ("Time(h/m/s) \tVin(mv)  \tIin(mA) \tPower-in(W) \tVout(mv)  \tIout(mA)  \tPower-ch(W) \t"
+               "Capa(mah)  \tinTmp(C)  \texttmp(C)   \tB1(mv)  \tB2(mv)  \tB3(mv)  \tB4(mv)  \tB5(mv)  \t"
+               "B6(mv)  \tB7(mv)  \tB8(mv)")
+# Доля строк цикла, приходящаяся на покой после него, и доля этапа CV при заряде
+REST_SHARE = 0.05
+CV_SHARE = 0.25
+WRITE_CHUNK = 100000
+ROW_FORMAT = "%d:%d:%d \t%d \t%d \t%d \t%d \t%d \t%d \t%d \t%d \t-99" + " \t0" * 8
+
+def _cycle_rows(rows, charge, cells, rng, cc=1000, dc=1000, cv=4180, dv=3200):
+    """Столбцы одного цикла: заряд CC/CV от DV до CV или разряд током DC от CV до DV"""
+    position = np.linspace(0.0, 1.0, rows)
+    noise = rng.integers(-3, 4, rows)
+    if charge:
+        voltage = dv * cells + (cv - dv) * cells * np.sqrt(position) + noise
+        taper = np.clip((position - (1 - CV_SHARE)) / CV_SHARE, 0, 1)
+        current = cc * (1 - 0.9 * taper) + noise * 3
+    else:
+        voltage = cv * cells - (cv - dv) * cells * position ** 1.5 + noise
+        current = -(dc + noise * 3)
+    voltage = np.minimum(voltage, cv * cells + 5)
+    return voltage.astype(np.int64), current.astype(np.int64)
+
+def _rest_rows(rows, last_voltage, rng):
+    voltage = last_voltage + np.cumsum(rng.integers(-1, 2, rows))
+    return voltage.astype(np.int64), np.zeros(rows, dtype=np.int64)
+
+def generate_columns(rows=100000, cycles=10, interval=1, cells=2, seed=0):
+    """
+    Генерирует по циклам столбцы (time, vout, iout, capa) лога в формате 4.1:
+    чередование заряда и разряда, сброс времени в 0 в начале цикла и покой после
+    него со скачком времени вперёд или назад. Возвращает итератор по циклам.
+    """
+    rng = np.random.default_rng(seed)
+    per_cycle = max(rows // max(cycles, 1), 20)
+    produced = 0
+    for number in range(cycles):
+        if produced >= rows:
+            break
+        cycle_rows = min(per_cycle, rows - produced) if number < cycles - 1 else rows - produced
+        rest = int(cycle_rows * REST_SHARE) if cycle_rows >= 40 else 0
+        work = cycle_rows - rest
+        charge = number % 2 == 0
+        voltage, current = _cycle_rows(work, charge, cells, rng)
+        time = np.arange(work, dtype=np.int64) * interval
+        if rest:
+            rest_voltage, rest_current = _rest_rows(rest, voltage[-1], rng)
+            # Покой начинается со скачка времени: вперёд или назад, но не в 0
+            end = int(time[-1])
+            if rng.random() < 0.5 and end > 10 * interval:
+                jump_to = int(rng.integers(interval, max(end // 2, interval + 1)))
+            else:
+                jump_to = end + int(rng.integers(10 * interval, 10 * interval + 3000))
+            time = np.concatenate((time, jump_to + np.arange(rest, dtype=np.int64) * interval))
+            voltage = np.concatenate((voltage, rest_voltage))
+            current = np.concatenate((current, rest_current))
+        capacity = np.abs(np.cumsum(current)) * interval // 3600
+        produced += cycle_rows
+        yield time, voltage, current, capacity
+
+def _format_rows(time, voltage, current, capacity, rng):
+    n = len(time)
+    vin = 20000 + rng.integers(-60, 60, n)
+    iin = np.abs(current) * voltage // vin + rng.integers(0, 20, n)
+    power_in = vin * iin // 1000000
+    power_out = voltage * current // 1000000
+    temperature = 30 + (np.arange(n) * 10 // max(n, 1))
+    table = np.column_stack((time // 3600, time // 60 % 60, time % 60, vin, iin, power_in, voltage,
+                             current, power_out, capacity, temperature)).tolist()
+    return [ROW_FORMAT % tuple(row) for row in table]
+
+def write_log(path, rows=100000, cycles=10, interval=1, cells=2, seed=0):
+    """Пишет синтетический лог с секциями Items/Data/End/Error; возвращает число строк Data"""
+    rng = np.random.default_rng(seed + 1)
+    written = 0
+    total_capacity = 0
+    with open(path, 'w', encoding='utf-8', newline='\n') as file:
+        file.write("==Items==\n")
+        file.write(f"Type:LiPo  \tCells:{cells}S  \tMode:Cycle  \tDMode:Inter \tCC:1000mA \tCV:4180mV \n")
+        file.write(f"DC:1000mA  \tDV:3200mV  \tPeakV:5mV  \tCyc:{max(cycles // 2, 1)}  \tWaste:5Min  "
+                   "\tInMax:49V  \teLoad:30W\n")
+        file.write("==Data==\n")
+        file.write(DATA_HEADER + "\n")
+        for time, voltage, current, capacity in generate_columns(rows, cycles, interval, cells, seed):
+            for start in range(0, len(time), WRITE_CHUNK):
+                part = slice(start, start + WRITE_CHUNK)
+                lines = _format_rows(time[part], voltage[part], current[part], capacity[part], rng)
+                file.write("\n".join(lines) + "\n")
+            written += len(time)
+            total_capacity = int(capacity[-1])
+        file.write("==End==\n")
+        file.write(f"Capacity:{total_capacity}mAh\n")
+        file.write("IntRes1-8S(mou):\t " + "  \t ".join(str(int(v)) for v in rng.integers(20, 40, 9)) + "\n")
+        file.write("==Error==\n")
+        file.write(": NO ERROR\n")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетических логов зарядного устройства (формат 4.1)")
+    parser.add_argument("output", help="имя TSV-файла")
+    parser.add_argument("-n", "--rows", type=int, default=100000, help="число строк Data")
+    parser.add_argument("-c", "--cycles", type=int, default=10, help="число циклов заряда/разряда")
+    parser.add_argument("-i", "--interval", type=int, default=1, help="интервал записи, s")
+    parser.add_argument("--cells", type=int, default=2, help="число банок")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rows = write_log(args.output, args.rows, args.cycles, args.interval, args.cells, args.seed)
+    print(f"Записано строк: {rows} в {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zlib
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Сигнатуры сжатых файлов: формат определяется по содержимому, а не только по расширению
+MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"BZh", "bz2"),
+)
+COMPRESSED_EXTENSIONS = (".gz", ".xz", ".zst", ".bz2")
+READ_BUFFER = 1024 * 1024
+
+def strip_compression(name):
+    """Имя файла без расширения сжатия: log.tsv.gz -> log.tsv"""
+    root, extension = os.path.splitext(name)
+    return root if extension.lower() in COMPRESSED_EXTENSIONS else name
+
+def compression_of(head):
+    """Формат сжатия по первым байтам файла ('gzip', 'xz', 'zstd', 'bz2') или None для обычного текста"""
+    for magic, kind in MAGIC:
+        if head.startswith(magic):
+            return kind
+    return None
+
+def detect_compression(filename):
+    with open(filename, 'rb') as file:
+        return compression_of(file.read(6))
+
+def _require_zstd():
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError("Для чтения .zst логов нужен пакет zstandard (pip install zstandard)")
+
+def open_log(filename, mode='rt'):
+    """
+    Открывает лог для потокового чтения: сжатые gzip/xz/zstd/bz2 файлы
+    распаковываются на лету блоками, без распаковки целиком в память или на диск.
+    mode - 'rt' (текст UTF-8) или 'rb'.
+    """
+    kind = detect_compression(filename)
+    if kind is None:
+        if mode == 'rb':
+            return open(filename, 'rb')
+        return open(filename, 'r', encoding='utf-8')
+    if kind == "gzip":
+        raw = gzip.open(filename, 'rb')
+    elif kind == "xz":
+        raw = lzma.open(filename, 'rb')
+    elif kind == "bz2":
+        raw = bz2.open(filename, 'rb')
+    else:
+        _require_zstd()
+        source = open(filename, 'rb')
+        raw = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(source, read_size=READ_BUFFER,
+                                                                           closefd=True), READ_BUFFER)
+    if mode == 'rb':
+        return raw
+    return io.TextIOWrapper(raw, encoding='utf-8')
+
+class StreamDecompressor:
+    """
+    Пошаговая распаковка дописываемого сжатого файла: decompress() принимает
+    очередные сжатые байты и возвращает готовые распакованные. Несколько подряд
+    записанных потоков (например, gzip-члены после каждого сброса) склеиваются.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        if kind == "zstd":
+            _require_zstd()
+        self.decompressor = self._new()
+
+    def _new(self):
+        if self.kind == "gzip":
+            return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        if self.kind == "xz":
+            return lzma.LZMADecompressor()
+        if self.kind == "bz2":
+            return bz2.BZ2Decompressor()
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data):
+        output = []
+        while data:
+            output.append(self.decompressor.decompress(data))
+            if not getattr(self.decompressor, 'eof', False):
+                break
+            # Поток закончился, за ним может начинаться следующий
+            data = self.decompressor.unused_data
+            self.decompressor = self._new()
+        return b"".join(output)
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import tempfile
+
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", ".ocr_cache")
+# Предельный суммарный размер кэша на диске
+OCR_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+def page_hash(document, page):
+    """
+    Хэш содержимого страницы PDF: поток команд страницы и сырые потоки её изображений.
+    Не зависит от имени и пути файла, поэтому копии одного скана попадают в одну запись.
+    """
+    digest = hashlib.sha256()
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(document.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+def settings_key(content_hash, settings):
+    """Ключ записи: хэш страницы + движок OCR и его настройки"""
+    digest = hashlib.sha256(content_hash.encode())
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+class OCRCache:
+    """Постоянный кэш результатов OCR: распознанный текст и рамки слов по ключу содержимого"""
+
+    def __init__(self, cache_dir=OCR_CACHE_DIR, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        """Запись {'text': ..., 'words': [...]} или None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, text, words, settings):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {'text': text, 'words': words, 'settings': settings}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(entry, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока кэш не уложится в max_bytes"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+        }
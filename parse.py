@@ -1,35 +1,191 @@
+import logging
 import re
+import numpy as np
+from log_io import open_log
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+SECTION_HEADER = re.compile(r'^\s*==\s*(.*?)\s*==\s*$')
+DATA_SECTION = "Data"
+TIME_COLUMN = "Time(h/m/s)"
+# Сколько строк данных копится в текстовом буфере перед переводом в числа
+CHUNK_ROWS = 8192
 
 def remove_empty_lines(lines):
-    print ("Удаляет пустые строки из списка")
     return [line.replace("\t", '') for line in lines if line.strip() != '']
 
+NUMBER_WITH_UNITS = re.compile(r'^\s*(-?\d+(?:[.,]\d+)?)\s*(.*)$')
+
+def parse_items(lines):
+    """
+    Разбирает строки секций Items/End в словарь {параметр: значение}.
+    Параметр с несколькими значениями (например IntRes) возвращается списком строк.
+    """
+    items = {}
+    key = None
+    for line in lines:
+        for token in line.split():
+            if ':' in token:
+                key, value = token.split(':', 1)
+                items[key] = [value] if value else []
+            elif key is not None:
+                items[key].append(token)
+    return {key: values[0] if len(values) == 1 else values for key, values in items.items()}
+
+def split_value_units(value):
+    """Делит строку вида 4180mV на число и единицу измерения, для текста возвращает (None, value)"""
+    match = NUMBER_WITH_UNITS.match(str(value))
+    if not match:
+        return None, value
+    return float(match.group(1).replace(',', '.')), match.group(2).strip()
+
+def parse_time(value):
+    """Переводит отметку времени вида 0:0:5 в секунды"""
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+def format_time(seconds):
+    """Переводит секунды обратно в отметку времени без ведущих нулей"""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60}:{seconds % 60}"
+
+class DataColumnsBuilder:
+    """Накопитель строк секции Data, сразу переводящий их в типизированные столбцы"""
+
+    def __init__(self, header):
+        self.names = header.split()
+        self.has_time = bool(self.names) and self.names[0].startswith("Time")
+        self.blocks = []
+        self.pending = []
+
+    def add_line(self, line):
+        self.pending.append(line)
+        if len(self.pending) >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        block, _ = self.convert(self.pending)
+        if len(block):
+            self.blocks.append(block)
+        self.pending = []
+
+    def convert(self, lines):
+        """Переводит пачку строк в массив; возвращает его и номера строк пачки, которые удалось разобрать"""
+        block = self._convert_fast(lines)
+        if block is not None:
+            return block, np.arange(len(lines))
+        return self._convert_slow(lines)
+
+    def _convert_fast(self, lines):
+        # Время h:m:s превращаем в три отдельных числа и разбираем весь буфер разом
+        width = len(self.names) + (2 if self.has_time else 0)
+        # Число полей проверяется в каждой строке: лишнее поле в одной строке и недостающее в другой
+        # дают верное общее число, но сдвигают все значения между ними
+        count = len(self.names)
+        if self.has_time:
+            shapes = (len(values) == count and values[0].count(':') == 2 for values in map(str.split, lines))
+        else:
+            shapes = (len(values) == count for values in map(str.split, lines))
+        if not all(shapes):
+            return None
+        try:
+            flat = np.array(' '.join(lines).replace(':', ' ').split(), dtype=np.int32)
+        except ValueError:
+            return None
+        if width == 0 or flat.size != len(lines) * width:
+            return None
+        raw = flat.reshape(len(lines), width)
+        if not self.has_time:
+            return raw
+        block = np.empty((len(lines), len(self.names)), dtype=np.int32)
+        block[:, 0] = raw[:, 0] * 3600 + raw[:, 1] * 60 + raw[:, 2]
+        block[:, 1:] = raw[:, 3:]
+        return block
+
+    def _convert_slow(self, lines):
+        # Построчный разбор с пропуском битых строк
+        rows = []
+        kept = []
+        for i, line in enumerate(lines):
+            values = line.split()
+            if len(values) != len(self.names):
+                continue
+            try:
+                if self.has_time:
+                    row = [parse_time(values[0])] + [int(v) for v in values[1:]]
+                else:
+                    row = [int(v) for v in values]
+            except ValueError:
+                continue
+            rows.append(row)
+            kept.append(i)
+        return np.array(rows, dtype=np.int32).reshape(len(rows), len(self.names)), np.array(kept, dtype=np.int64)
+
+    def build(self):
+        """Возвращает словарь {имя столбца: массив значений}"""
+        self.flush()
+        if self.blocks:
+            table = np.concatenate(self.blocks) if len(self.blocks) > 1 else self.blocks[0]
+        else:
+            table = np.empty((0, len(self.names)), dtype=np.int32)
+        self.blocks = []
+        return {name: np.ascontiguousarray(table[:, i]) for i, name in enumerate(self.names)}
+
+def _data_rows(sections):
+    data = sections.get(DATA_SECTION) or {}
+    return len(next(iter(data.values()), []))
+
+@traced("parse_sections_file", rows=_data_rows)
 def parse_sections_file(filename):
+    """
+    Построчно читает лог, переключаясь между секциями по заголовкам ==Title==.
+    Секция Data сразу разбирается в столбцы NumPy, остальные остаются списками строк.
+    Сжатые логи (.gz, .xz, .zst) распаковываются потоком по ходу чтения.
+    """
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        pattern = r'==\s*(.*?)\s*==\s*\n?(.*?)(?=\s*==\s*|$)'
-        matches = re.findall(pattern, content, re.DOTALL)
-        
         sections = {}
-        for section_name, section_content in matches:
-            sections[section_name.strip()] = [line.rstrip() for line in section_content.split('\n') if line.strip()]
+        current = None
+        builder = None
+        with open_log(filename) as file:
+            for line in file:
+                header = SECTION_HEADER.match(line)
+                if header:
+                    if builder is not None:
+                        sections[current] = builder.build()
+                        builder = None
+                    current = header.group(1).strip()
+                    sections[current] = {} if current == DATA_SECTION else []
+                    continue
+                if current is None or not line.strip():
+                    continue
+                if current == DATA_SECTION:
+                    if builder is None:
+                        builder = DataColumnsBuilder(line)
+                    else:
+                        builder.add_line(line)
+                else:
+                    sections[current].append(line.rstrip())
+        if builder is not None:
+            sections[current] = builder.build()
 
         return sections
-        
+
     except FileNotFoundError:
-        print(f"Ошибка: Файл '{filename}' не найден")
+        logger.error("Ошибка: Файл '%s' не найден", filename)
         return {}
     except Exception as e:
-        print(f"Ошибка при чтении файла: {e}")
+        logger.error("Ошибка при чтении файла: %s", e)
         return {}
 
+@traced("parse_for_table", rows=lambda table: len(table.get(DATA_SECTION, [])))
 def parse_for_table(data):
     table = {}
-    print("Разбиение для таблицы")
+    logger.info("Разбиение для таблицы")
     for section_name, content in data.items():
-        print(f"\nСекция - {section_name} -")
+        logger.debug("Секция - %s -", section_name)
         if section_name == "Items":
             content = ''.join(content)
             content = remove_empty_lines(content.split(" "))
@@ -43,15 +199,21 @@ def parse_for_table(data):
                 tmp_table.append([tmp_content[len(tmp_content)//2+1][0], tmp_content[len(tmp_content)//2+1][1], "-empty-", "-empty-"])
             table[section_name] = tmp_table
         if section_name == "Data":
-            tmp_table = []
-            for item in content:
-                tmp_table.append(remove_empty_lines(item.split(" ")))
+            tmp_table = [list(content.keys())] if content else []
+            columns = []
+            for name, values in content.items():
+                if name == TIME_COLUMN:
+                    columns.append([format_time(v) for v in values.tolist()])
+                else:
+                    columns.append([str(v) for v in values.tolist()])
+            tmp_table.extend(list(row) for row in zip(*columns))
             table[section_name] = tmp_table
     return table
 
 def print_parse_data(data):
-    # Выводим результат
-    print("Содержимое файла разбито на разделы:")
+    # Полное содержимое секций выводится только в отладочном режиме: для длинных логов это мегабайты текста
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("Содержимое файла разбито на разделы:")
     for section_name, content in data.items():
-        print(f"\n({section_name}")
-        print(f"{content})")
\ No newline at end of file
+        logger.debug("(%s\n%s)", section_name, content)
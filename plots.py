@@ -0,0 +1,164 @@
+import io
+import re
+import numpy as np
+from analysis import VOLTAGE_COLUMN, CURRENT_COLUMN
+from parse import DATA_SECTION
+
+try:
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+INPUT_VOLTAGE_COLUMN = "Vin(mv)"
+INPUT_CURRENT_COLUMN = "Iin(mA)"
+BATTERY_TEMP_COLUMN = "exttmp(C)"
+CHARGER_TEMP_COLUMN = "inTmp(C)"
+CELL_COLUMN = re.compile(r'^B\d+')
+
+# Не больше стольких точек на одну линию графика, независимо от длины лога
+MAX_POINTS = 2000
+FIGURE_WIDTH = 8
+PANEL_HEIGHT = 2.2
+PANELS_PER_IMAGE = 4
+DPI = 100
+
+def minmax_decimate(y, max_points=MAX_POINTS):
+    """
+    Индексы точек для отрисовки: ряд делится на корзины (по пикселям),
+    в каждой сохраняются минимум и максимум, чтобы не терять пики
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = max_points // 2
+    size = -(-n // buckets)
+    padded = np.concatenate((y, np.full(buckets * size - n, y[-1])))
+    grid = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    indices = np.concatenate(([0, n - 1], offsets + grid.argmin(axis=1), offsets + grid.argmax(axis=1)))
+    return np.unique(np.minimum(indices, n - 1))
+
+def _panel(title, x, xlabel, left, left_label, right=None, right_label=None):
+    return {'title': title, 'x': x, 'xlabel': xlabel, 'left': left, 'left_label': left_label,
+            'right': right or [], 'right_label': right_label}
+
+def build_panels(data, analysis, start, stop, overall=False):
+    """Описания графиков для участка лога [start, stop) - одного цикла или всего теста"""
+    time = analysis['time'][start:stop]
+    if overall:
+        x, xlabel = time / 3600, "Time (h)"
+    else:
+        x, xlabel = (time - time[0]) / 60, "Time (min)"
+
+    def column(name):
+        return np.asarray(data[name][start:stop], dtype=np.float64)
+
+    voltage = column(VOLTAGE_COLUMN) / 1000
+    current = np.abs(column(CURRENT_COLUMN)) / 1000
+    panels = [
+        _panel("Battery voltage / current", x, xlabel, [("V", voltage)], "Voltage (V)", [("|I|", current)], "Current (A)"),
+        _panel("Battery power", x, xlabel, [("|P|", analysis['power'][start:stop])], "Power (W)"),
+        _panel("Capacity / energy", x, xlabel, [("Capacity", analysis['capacity'][start:stop])], "Capacity (Ah)",
+               [("Energy", analysis['energy'][start:stop])], "Energy (Wh)"),
+    ]
+
+    cells = [(name.split('(')[0], column(name) / 1000) for name in data if CELL_COLUMN.match(name)]
+    cells = [(name, values) for name, values in cells if values.size and values.max() > 0]
+    if cells:
+        panels.append(_panel("Cell voltages", x, xlabel, cells, "Voltage (V)"))
+
+    temperatures = []
+    if BATTERY_TEMP_COLUMN in data:
+        battery = column(BATTERY_TEMP_COLUMN)
+        if battery.size and battery.max() > 0:
+            temperatures.append(("Battery", battery))
+    if overall and CHARGER_TEMP_COLUMN in data:
+        temperatures.append(("Charger", column(CHARGER_TEMP_COLUMN)))
+    if temperatures:
+        panels.append(_panel("Temperature", x, xlabel, temperatures, "Temperature (°C)"))
+
+    if overall and INPUT_VOLTAGE_COLUMN in data and INPUT_CURRENT_COLUMN in data:
+        input_voltage = column(INPUT_VOLTAGE_COLUMN) / 1000
+        input_current = np.abs(column(INPUT_CURRENT_COLUMN)) / 1000
+        panels.append(_panel("Input voltage / current", x, xlabel, [("Vin", input_voltage)], "Voltage (V)",
+                             [("Iin", input_current)], "Current (A)"))
+        panels.append(_panel("Input power", x, xlabel, [("Pin", input_voltage * input_current)], "Power (W)"))
+    return panels
+
+class ChartRenderer:
+    """Рисует графики на одной переиспользуемой фигуре Agg и отдаёт PNG из памяти"""
+
+    def __init__(self, max_points=MAX_POINTS):
+        self.figure = Figure(dpi=DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.max_points = max_points
+
+    def _plot(self, ax, x, series, colors):
+        for (label, y), color in zip(series, colors):
+            indices = minmax_decimate(y, self.max_points)
+            ax.plot(x[indices], y[indices], color=color, linewidth=0.8, label=label)
+
+    def render(self, panels, title=None):
+        """Один PNG на группу графиков, расположенных друг под другом"""
+        self.figure.clear()
+        self.figure.set_size_inches(FIGURE_WIDTH, PANEL_HEIGHT * len(panels))
+        axes = self.figure.subplots(len(panels), 1, squeeze=False)[:, 0]
+        for ax, panel in zip(axes, panels):
+            self._plot(ax, panel['x'], panel['left'], ["C0", "C2", "C3", "C4", "C5", "C6", "C7", "C8"])
+            ax.set_ylabel(panel['left_label'], fontsize=8)
+            ax.set_xlabel(panel['xlabel'], fontsize=8)
+            ax.set_title(panel['title'], fontsize=9)
+            ax.tick_params(labelsize=7)
+            ax.grid(True, linewidth=0.3)
+            if len(panel['left']) > 1:
+                ax.legend(fontsize=6, loc="best")
+            if panel['right']:
+                twin = ax.twinx()
+                self._plot(twin, panel['x'], panel['right'], ["C1"])
+                twin.set_ylabel(panel['right_label'], fontsize=8)
+                twin.tick_params(labelsize=7)
+        if title:
+            self.figure.suptitle(title, fontsize=10)
+        self.figure.tight_layout()
+        buffer = io.BytesIO()
+        self.canvas.print_png(buffer)
+        return buffer.getvalue()
+
+    def render_panels(self, panels, title=None):
+        """Разбивает длинный набор графиков на несколько изображений по PANELS_PER_IMAGE"""
+        return [self.render(panels[i:i + PANELS_PER_IMAGE], title if i == 0 else None)
+                for i in range(0, len(panels), PANELS_PER_IMAGE)]
+
+def chart_sections(analysis):
+    """Разделы графиков в порядке отчёта: [(название, номер цикла или None для всего теста), ...]"""
+    sections = [(f"Cycle {cycle['number']} Charts", cycle['number']) for cycle in analysis['cycles']]
+    sections.append(("Overall Test Charts", None))
+    return sections
+
+def render_chart_section(sections, analysis, number, renderer=None):
+    """PNG-графики одного раздела: цикла с номером number или всего теста при number=None"""
+    data = sections[DATA_SECTION]
+    renderer = renderer or ChartRenderer()
+    if number is None:
+        panels = build_panels(data, analysis, 0, len(analysis['time']), overall=True)
+        return renderer.render_panels(panels, "Complete test (normalized time)")
+    cycle = next(cycle for cycle in analysis['cycles'] if cycle['number'] == number)
+    title = f"Cycle {cycle['number']} ({cycle['type']}{', full' if cycle['full'] else ''})"
+    panels = build_panels(data, analysis, cycle['start'], cycle['end'])
+    return renderer.render_panels(panels, title)
+
+def charts_available(sections, analysis):
+    return MATPLOTLIB_AVAILABLE and bool(sections.get(DATA_SECTION)) and len(analysis['time']) > 0
+
+def render_report_charts(sections, analysis):
+    """
+    Графики для отчёта: {название раздела: [PNG, ...]} - по разделу на каждый цикл
+    и общий раздел за всё время тестирования. Без matplotlib возвращает пустой словарь.
+    """
+    if not charts_available(sections, analysis):
+        return {}
+    renderer = ChartRenderer()
+    return {name: render_chart_section(sections, analysis, number, renderer)
+            for name, number in chart_sections(analysis)}
@@ -0,0 +1,182 @@
+import argparse
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import fitz
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+import test
+import tracing
+from parse import DATA_SECTION, parse_for_table
+from plots import ChartRenderer, chart_sections, charts_available, render_chart_section
+from tracing import stage
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк таблицы Data верстается в одном фрагменте
+DATA_FRAGMENT_ROWS = 20000
+PAGE_NUMBER_FONT_SIZE = 7
+
+# Состояние рабочего процесса: секции лога и анализ передаются один раз при запуске
+_worker = {}
+
+def _init_worker(sections, analysis):
+    logging.getLogger().setLevel(logging.WARNING)
+    _worker['sections'] = sections
+    _worker['analysis'] = analysis
+    _worker['renderer'] = None
+
+def _data_table(start, stop):
+    data = _worker['sections'][DATA_SECTION]
+    return parse_for_table({DATA_SECTION: {name: values[start:stop] for name, values in data.items()}})[DATA_SECTION]
+
+def render_fragment(parts):
+    """
+    Вёрстка одного фрагмента в рабочем процессе. parts - [(название, вид, аргумент)]:
+    'table' - готовая таблица, 'data' - диапазон строк Data, 'charts' - номер цикла (None - весь тест).
+    Возвращает PDF фрагмента и страницы начала его разделов.
+    """
+    if not tracing.enabled():
+        tracing.configure_from_env()
+    tables = {}
+    for name, kind, argument in parts:
+        if kind == "table":
+            tables[name] = argument
+        elif kind == "data":
+            tables[name] = _data_table(*argument)
+        else:
+            if _worker['renderer'] is None:
+                _worker['renderer'] = ChartRenderer()
+            tables[name] = render_chart_section(_worker['sections'], _worker['analysis'], argument,
+                                                _worker['renderer'])
+    output = io.BytesIO()
+    pages = test.build_document_compact(tables, output)
+    tracing.flush()
+    return output.getvalue(), pages
+
+def plan_fragments(sections, cycles_info, battery_params):
+    """
+    Разбиение отчёта на независимые фрагменты в том же порядке разделов, что и у build_report:
+    большая таблица Data - на части по DATA_FRAGMENT_ROWS строк, графики - по фрагменту на цикл.
+    Мелкие таблицы присоединяются к следующему тяжёлому фрагменту, чтобы не занимать отдельных страниц.
+    Возвращает список фрагментов и уровни разделов для оглавления.
+    """
+    analysis = cycles_info['analysis']
+    text_tables = parse_for_table({name: content for name, content in sections.items() if name != DATA_SECTION})
+    parts = []
+    levels = {}
+    for name, content in sections.items():
+        if name == DATA_SECTION:
+            rows = len(next(iter(content.values()), [])) if content else 0
+            if rows <= test.LARGE_TABLE_ROWS:
+                parts.append((name, "data", (0, rows)))
+                continue
+            # Равные части: каждая больше LARGE_TABLE_ROWS и верстается быстрой таблицей, как целая
+            bounds = np.linspace(0, rows, -(-rows // DATA_FRAGMENT_ROWS) + 1).astype(int).tolist()
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                part_name = name if start == 0 else f"{name} (rows {start + 1}-{stop})"
+                levels[part_name] = 1 if start == 0 else 2
+                parts.append((part_name, "data", (start, stop)))
+        elif name in text_tables:
+            parts.append((name, "table", text_tables[name]))
+
+    parts.append(("Battery Test Parameters", "table", test.create_battery_parameters_table(battery_params)))
+    if cycles_info['summary_data']:
+        parts.append(("Cycle Summary", "table", cycles_info['summary_data']))
+    plots = charts_available(sections, analysis)
+    if plots:
+        parts.extend((name, "charts", number) for name, number in chart_sections(analysis))
+    parts.append(("Plots Generation Status", "table", test.create_plots_status_section(plots)))
+    parts.append(("Detailed Analysis Information", "table", test.create_detailed_analysis_section()))
+
+    fragments = []
+    pending = []
+    for part in parts:
+        pending.append(part)
+        if part[1] != "table":
+            fragments.append(pending)
+            pending = []
+    if pending:
+        fragments.append(pending)
+    return fragments, levels
+
+def _contents_pdf(entries, first_page):
+    output = io.BytesIO()
+    doc = SimpleDocTemplate(output, pagesize=A4, leftMargin=0.5*cm, rightMargin=0.5*cm,
+                            topMargin=0.7*cm, bottomMargin=0.7*cm)
+    rows = [["Section", "Page"]]
+    rows += [[("    " if level > 1 else "") + name, str(page + first_page)] for level, name, page in entries]
+    table = Table(rows, colWidths=[doc.width - 2*cm, 2*cm], repeatRows=1)
+    table.setStyle(test.COMPACT_TABLE_STYLE)
+    doc.build([Paragraph("<b>Contents</b>", test.COMPACT_TITLE_STYLE), Spacer(1, 4), table])
+    return output.getvalue()
+
+def merge_fragments(fragments, levels, output_file):
+    """
+    Склейка фрагментов: оглавление в начале документа и в закладках PDF,
+    сквозная нумерация страниц "N / всего" внизу каждой страницы.
+    Последовательная вёрстка (test.build_report) передаёт сюда один фрагмент.
+    """
+    body = fitz.open()
+    entries = []
+    for pdf, pages in fragments:
+        offset = body.page_count
+        with fitz.open(stream=pdf, filetype="pdf") as part:
+            body.insert_pdf(part)
+        entries.extend((levels.get(name, 1), name, offset + page) for name, page in pages.items())
+
+    # Оглавление может занять больше страницы - верстаем, пока число его страниц не перестанет меняться
+    contents_pages = 1
+    while True:
+        contents = fitz.open(stream=_contents_pdf(entries, contents_pages), filetype="pdf")
+        if contents.page_count == contents_pages:
+            break
+        contents_pages = contents.page_count
+        contents.close()
+
+    document = contents
+    document.insert_pdf(body)
+    body.close()
+    document.set_toc([[1, "Contents", 1]] + [[level, name, page + contents_pages] for level, name, page in entries])
+    total = document.page_count
+    for number, page in enumerate(document, 1):
+        page.insert_text((page.rect.width - 1.5*cm, page.rect.height - 0.3*cm), f"{number} / {total}",
+                         fontsize=PAGE_NUMBER_FONT_SIZE)
+    if isinstance(output_file, (str, os.PathLike)):
+        document.save(output_file, garbage=1, deflate=True)
+    else:
+        output_file.write(document.tobytes(garbage=1, deflate=True))
+    document.close()
+    return total
+
+def render_report_parallel(sections, cycles_info, battery_params, output_file, workers=None):
+    """Вёрстка разделов отчёта в workers процессах и склейка в один PDF с оглавлением"""
+    workers = workers or os.cpu_count() or 1
+    fragments, levels = plan_fragments(sections, cycles_info, battery_params)
+    with stage("render fragments", rows=len(fragments)):
+        with ProcessPoolExecutor(max_workers=min(workers, len(fragments)), initializer=_init_worker,
+                                 initargs=(sections, cycles_info['analysis'])) as executor:
+            rendered = list(executor.map(render_fragment, fragments))
+    with stage("merge fragments") as info:
+        info['rows'] = merge_fragments(rendered, levels, output_file)
+    logger.info("Фрагментов: %d, процессов: %d, страниц: %d", len(fragments), workers, info['rows'])
+    return output_file
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельная вёрстка PDF-отчёта по одному логу")
+    parser.add_argument("log", help="TSV-лог")
+    parser.add_argument("output", nargs="?", default="simple_table.pdf", help="имя PDF-отчёта")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument("--db", default=None, help="сохранить сводку в базу fleet_db")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    started = time.perf_counter()
+    test.generate_report(args.log, args.output, args.db, args.workers or os.cpu_count() or 1)
+    print(f"{args.output}: {time.perf_counter() - started:.2f} s")
+
+if __name__ == "__main__":
+    main()
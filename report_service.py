@@ -0,0 +1,221 @@
+import argparse
+import collections
+import io
+import json
+import logging
+import os
+import socketserver
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+# Очередь ограничена: сверх этого числа ожидающих отчётов сервис отвечает 503
+MAX_QUEUE = 32
+# Окно, по которому считается пропускная способность, секунды
+THROUGHPUT_WINDOW = 60.0
+
+def _warm_up():
+    """Инициализатор рабочего процесса: reportlab, стили и matplotlib загружаются один раз"""
+    import test
+    import plots
+    logging.getLogger().setLevel(logging.WARNING)
+    return test, plots
+
+def render_pdf(path, uploaded=False):
+    """Отчёт по логу в виде байтов PDF; загруженные файлы не попадают в кэш логов"""
+    import test
+    from parse import parse_sections_file
+    output = io.BytesIO()
+    if uploaded:
+        sections = parse_sections_file(path)
+        if not sections:
+            raise ValueError("Не удалось разобрать загруженный лог")
+        test.build_report(sections, output)
+    else:
+        test.generate_report(path, output)
+    return output.getvalue()
+
+class ReportService:
+    """Пул прогретых рабочих процессов с ограниченной очередью и счётчиками для /metrics"""
+
+    def __init__(self, workers=None, max_queue=MAX_QUEUE):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        self.lock = threading.Lock()
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self.finished = collections.deque()
+        self.started = time.time()
+
+    def submit(self, path, uploaded=False):
+        """Ставит отчёт в очередь; None, если очередь переполнена"""
+        with self.lock:
+            if self.outstanding >= self.workers + self.max_queue:
+                self.rejected += 1
+                return None
+            self.outstanding += 1
+        submitted = time.perf_counter()
+        future = self.executor.submit(render_pdf, path, uploaded)
+        future.add_done_callback(lambda done: self._done(done, submitted))
+        return future
+
+    def _done(self, future, submitted):
+        now = time.time()
+        with self.lock:
+            self.outstanding -= 1
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.busy_seconds += time.perf_counter() - submitted
+            self.finished.append(now)
+            while self.finished and now - self.finished[0] > THROUGHPUT_WINDOW:
+                self.finished.popleft()
+
+    def metrics(self):
+        now = time.time()
+        with self.lock:
+            while self.finished and now - self.finished[0] > THROUGHPUT_WINDOW:
+                self.finished.popleft()
+            done = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'queue_depth': max(self.outstanding - self.workers, 0),
+                'in_progress': min(self.outstanding, self.workers),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'throughput_per_min': len(self.finished) * 60.0 / THROUGHPUT_WINDOW,
+                'avg_latency_s': self.busy_seconds / done if done else 0.0,
+                'uptime_s': now - self.started,
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        """
+        POST /report?path=<путь к логу> - отчёт по файлу на сервере;
+        POST /report с телом запроса - отчёт по загруженному логу;
+        GET /metrics - очередь и пропускная способность, GET /health - проверка.
+        """
+
+        def _send(self, status, body, content_type="application/json; charset=utf-8"):
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/metrics":
+                self._send(200, service.metrics())
+            elif path == "/health":
+                self._send(200, {'status': "ok"})
+            else:
+                self._send(404, {'error': "not found"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/report":
+                self._send(404, {'error': "not found"})
+                return
+            log_path = parse_qs(url.query).get('path', [None])[0]
+            length = int(self.headers.get("Content-Length") or 0)
+            upload = None
+            try:
+                if log_path is None:
+                    if not length:
+                        self._send(400, {'error': "нужен параметр path или лог в теле запроса"})
+                        return
+                    fd, upload = tempfile.mkstemp(suffix=".tsv")
+                    with os.fdopen(fd, 'wb') as file:
+                        remaining = length
+                        while remaining:
+                            block = self.rfile.read(min(remaining, 1024 * 1024))
+                            if not block:
+                                break
+                            file.write(block)
+                            remaining -= len(block)
+                elif not os.path.isfile(log_path):
+                    self._send(404, {'error': f"файл не найден: {log_path}"})
+                    return
+                future = service.submit(upload or log_path, uploaded=upload is not None)
+                if future is None:
+                    self._send(503, {'error': "очередь переполнена"})
+                    return
+                try:
+                    pdf = future.result()
+                except Exception as e:
+                    self._send(500, {'error': str(e)})
+                    return
+                self._send(200, pdf, "application/pdf")
+            finally:
+                if upload and os.path.exists(upload):
+                    os.remove(upload)
+
+        def log_message(self, format, *args):
+            logger.info("%s %s", self.command, self.path)
+
+    return Handler
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler ожидает адрес клиента в виде (host, port)
+        return request, ("unix", 0)
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, unix_socket=None, workers=None, max_queue=MAX_QUEUE):
+    service = ReportService(workers, max_queue)
+    handler = make_handler(service)
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixHTTPServer(unix_socket, handler)
+        address = unix_socket
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{server.server_address[1]}"
+    # Прогрев всех рабочих процессов до первого запроса
+    for future in [service.executor.submit(_warm_up) for _ in range(service.workers)]:
+        future.exception()
+    logger.info("Сервис отчётов: %s, процессов: %d, очередь: %d", address, service.workers, max_queue)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервис построения PDF-отчётов по логам")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix-socket", help="слушать Unix-сокет вместо TCP-порта")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число рабочих процессов")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="предельная длина очереди")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    serve(args.host, args.port, args.unix_socket, args.workers, args.max_queue)
+
+if __name__ == "__main__":
+    main()
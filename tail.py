@@ -0,0 +1,182 @@
+import argparse
+import logging
+import os
+import time
+import numpy as np
+from analysis import IncrementalAnalysis, battery_parameters
+from log_io import StreamDecompressor, compression_of
+from parse import DATA_SECTION, SECTION_HEADER, DataColumnsBuilder, parse_items
+
+logger = logging.getLogger(__name__)
+
+# Период опроса файла и минимальный промежуток между перестроениями PDF, секунды
+POLL_INTERVAL = 2.0
+PDF_REFRESH_INTERVAL = 300.0
+# Размер блока чтения: дописанное за один опрос разбирается по частям, а не читается целиком
+READ_BLOCK = 1024 * 1024
+
+class LogTail:
+    """
+    Чтение лога, который ещё дописывается зарядным устройством. Каждый poll() читает
+    файл с последнего смещения, разбирает только новые полные строки и передаёт
+    новые строки Data в IncrementalAnalysis; начало файла повторно не читается.
+    Сжатый лог (gzip/xz/zstd) распаковывается пошагово: смещение считается в сжатых байтах.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.offset = 0
+        self.partial = b""
+        self.current = None
+        self.builder = None
+        self.text_sections = {}
+        self.data_blocks = []
+        self.analysis = IncrementalAnalysis()
+        self.decompressor = None
+        self.missing = False
+
+    def _reset(self):
+        self.__init__(self.filename)
+
+    def _read_new(self):
+        """Новые полные строки: дописанное с прошлого опроса читается блоками по READ_BLOCK"""
+        try:
+            file = open(self.filename, 'rb')
+        except FileNotFoundError:
+            # Файл удалён или переименован при ротации между опросами - ждём появления нового
+            if not self.missing:
+                logger.warning("Файл '%s' не найден - жду его появления", self.filename)
+            self.missing = True
+            return
+        with file:
+            if self.missing:
+                logger.warning("Файл '%s' снова доступен", self.filename)
+                self.missing = False
+            size = os.fstat(file.fileno()).st_size
+            if size < self.offset:
+                logger.warning("Файл '%s' стал короче - читаю заново", self.filename)
+                self._reset()
+            file.seek(self.offset)
+            # Читаем только то, что было записано к началу опроса: иначе быстро растущий файл не дочитать
+            while self.offset < size:
+                chunk = file.read(min(READ_BLOCK, size - self.offset))
+                if not chunk:
+                    break
+                if self.offset == 0:
+                    kind = compression_of(chunk[:6])
+                    self.decompressor = StreamDecompressor(kind) if kind else None
+                self.offset += len(chunk)
+                if self.decompressor is not None:
+                    chunk = self.decompressor.decompress(chunk)
+                lines = (self.partial + chunk).split(b"\n")
+                # Последняя строка без перевода строки ещё может дописываться
+                self.partial = lines.pop()
+                for line in lines:
+                    yield line.decode('utf-8', errors='replace')
+
+    def poll(self):
+        """Разбирает дописанное с прошлого вызова; возвращает число новых строк Data и номера изменённых циклов"""
+        new_rows = 0
+        changed = set()
+        items_changed = False
+        for line in self._read_new():
+            header = SECTION_HEADER.match(line)
+            if header:
+                if self.builder is not None:
+                    new_rows, changed = self._flush_data(new_rows, changed)
+                self.current = header.group(1).strip()
+                if self.current != DATA_SECTION:
+                    self.text_sections.setdefault(self.current, [])
+                continue
+            if self.current is None or not line.strip():
+                continue
+            if self.current == DATA_SECTION:
+                if self.builder is None:
+                    self.builder = DataColumnsBuilder(line)
+                else:
+                    self.builder.add_line(line)
+            else:
+                self.text_sections[self.current].append(line.rstrip())
+                items_changed = items_changed or self.current == "Items"
+        if items_changed:
+            self.analysis.set_items(parse_items(self.text_sections["Items"]))
+        if self.builder is not None:
+            new_rows, changed = self._flush_data(new_rows, changed)
+        return new_rows, sorted(changed)
+
+    def _flush_data(self, new_rows, changed):
+        columns = self.builder.build()
+        rows = len(next(iter(columns.values()), []))
+        if rows:
+            self.data_blocks.append(columns)
+            changed.update(self.analysis.update(columns))
+        return new_rows + rows, changed
+
+    @property
+    def finished(self):
+        """Устройство дописало итоговую секцию End - тест завершён"""
+        return "End" in self.text_sections
+
+    def sections(self):
+        """Секции в том же виде, что и у parse_sections_file, для построения отчёта"""
+        sections = {name: list(lines) for name, lines in self.text_sections.items()}
+        if self.builder is not None:
+            names = self.builder.names
+            sections[DATA_SECTION] = {
+                name: np.concatenate([block[name] for block in self.data_blocks])
+                if self.data_blocks else np.empty(0, dtype=np.int32)
+                for name in names
+            }
+        return sections
+
+def print_cycles(cycles, numbers):
+    for cycle in cycles:
+        if cycle['number'] not in numbers:
+            continue
+        print(f"  Цикл {cycle['number']}: {cycle['type']}{' (полный)' if cycle['full'] else ''}, "
+              f"{cycle['duration'] / 3600:.2f} h, {cycle['start_voltage']:.3f} -> {cycle['end_voltage']:.3f} V, "
+              f"{cycle['capacity'] * 1000:.0f} mAh, {cycle['energy'] * 1000:.0f} mWh")
+
+def follow(filename, poll_interval=POLL_INTERVAL, pdf=None, pdf_interval=PDF_REFRESH_INTERVAL, once=False):
+    """Следит за логом до появления секции End (или одного прохода при once=True)"""
+    tail = LogTail(filename)
+    last_pdf = None
+    pending = False
+    try:
+        while True:
+            started = time.perf_counter()
+            rows, changed = tail.poll()
+            if rows:
+                print(f"[{time.strftime('%H:%M:%S')}] новых строк: {rows}, всего: {tail.analysis.rows}, "
+                      f"разбор: {(time.perf_counter() - started) * 1000:.1f} ms")
+                print_cycles(tail.analysis.cycle_stats(), changed)
+            done = once or tail.finished
+            pending = pending or rows > 0
+            if pdf and pending and (done or last_pdf is None or time.monotonic() - last_pdf >= pdf_interval):
+                from test import build_report
+                build_report(tail.sections(), pdf)
+                last_pdf = time.monotonic()
+                pending = False
+            if done:
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("\nОстановлено")
+    parameters = battery_parameters(tail.analysis.summary())
+    print(f"Циклов: {len(tail.analysis.cycles)}, время теста: {parameters['TimeTotal']} h")
+    return tail
+
+def main():
+    parser = argparse.ArgumentParser(description="Анализ лога зарядного устройства по мере его записи")
+    parser.add_argument("log", help="TSV-лог")
+    parser.add_argument("-i", "--interval", type=float, default=POLL_INTERVAL, help="период опроса файла, s")
+    parser.add_argument("--pdf", help="периодически перестраивать PDF-отчёт в этот файл")
+    parser.add_argument("--pdf-interval", type=float, default=PDF_REFRESH_INTERVAL,
+                        help="не чаще одного PDF за столько секунд")
+    parser.add_argument("--once", action="store_true", help="разобрать то, что уже записано, и выйти")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    follow(args.log, args.interval, args.pdf, args.pdf_interval, args.once)
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,210 @@
 from parse import *
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from analysis import analyze_log, battery_parameters
+from log_cache import load_sections_cached
+import fleet_db
+from tracing import stage, traced
+from plots import MAX_POINTS, render_report_charts
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable, Image, KeepTogether
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+import io
+import logging
 import os
 import sys
 
+logger = logging.getLogger(__name__)
 tsv_file = "D:\\projects\\VisualStudioCode\\Laba_2_4_5_PDFDocs\\4.1\\data\\2024-09-16_21-23-32.tsv"
 
-def build_document_compact(tables):
-    print("Создание компактного PDF документа...")
+# Таблицы длиннее этого числа строк выводятся в быстром режиме
+LARGE_TABLE_ROWS = 500
+FAST_ROW_HEIGHT = 9
+FAST_FONT_SIZE = 6
+
+# Стили создаются один раз и не меняются, поэтому переиспользуются между отчётами
+_SAMPLE_STYLES = getSampleStyleSheet()
+COMPACT_TEXT_STYLE = ParagraphStyle('CompactText', parent=_SAMPLE_STYLES['Normal'], fontSize=7, leading=9)
+COMPACT_TITLE_STYLE = ParagraphStyle('CompactTitle', parent=_SAMPLE_STYLES['Heading2'], fontSize=12, leading=14)
+# Компактный стиль таблицы
+COMPACT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 2),
+    ('LEFTPADDING', (0, 0), (-1, -1), 2),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+])
+
+class FastTable(Flowable):
+    """
+    Большая таблица, рисуемая прямо на canvas: при переносе делится на части
+    высотой в страницу с повтором заголовка, сетка рисуется одним путём,
+    текст - одним текстовым объектом на столбец
+    """
+
+    def __init__(self, header, rows, col_widths, start=0, stop=None):
+        Flowable.__init__(self)
+        self.header = header
+        self.rows = rows
+        self.col_widths = col_widths
+        self.start = start
+        self.stop = len(rows) if stop is None else stop
+        self.width = sum(col_widths)
+        self.height = FAST_ROW_HEIGHT * (self.stop - self.start + 1)
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        fit = int(availHeight // FAST_ROW_HEIGHT) - 1
+        if fit < 1 or self.start + fit >= self.stop:
+            return []
+        middle = self.start + fit
+        return [FastTable(self.header, self.rows, self.col_widths, self.start, middle),
+                FastTable(self.header, self.rows, self.col_widths, middle, self.stop)]
+
+    def draw(self):
+        canv = self.canv
+        rows = self.rows[self.start:self.stop]
+        xs = [0]
+        for width in self.col_widths:
+            xs.append(xs[-1] + width)
+        ys = [self.height - i * FAST_ROW_HEIGHT for i in range(len(rows) + 2)]
+        baseline = (FAST_ROW_HEIGHT - FAST_FONT_SIZE) / 2 + 1
+
+        canv.saveState()
+        canv.setFillColor(colors.beige)
+        canv.rect(0, 0, self.width, self.height - FAST_ROW_HEIGHT, stroke=0, fill=1)
+        canv.setFillColor(colors.grey)
+        canv.rect(0, self.height - FAST_ROW_HEIGHT, self.width, FAST_ROW_HEIGHT, stroke=0, fill=1)
+        canv.setLineWidth(0.25)
+        canv.grid(xs, ys)
+
+        # Заголовок уменьшаем, чтобы он помещался в ширину столбца
+        header = canv.beginText()
+        header.setFillColor(colors.white)
+        for x, width, cell in zip(xs, self.col_widths, self.header):
+            text_width = stringWidth(cell, 'Helvetica-Bold', FAST_FONT_SIZE)
+            size = min(FAST_FONT_SIZE, FAST_FONT_SIZE * (width - 3) / text_width) if text_width else FAST_FONT_SIZE
+            header.setFont('Helvetica-Bold', size)
+            header.setTextOrigin(x + 2, ys[1] + baseline)
+            header.textOut(cell)
+        canv.drawText(header)
+
+        body = canv.beginText()
+        body.setFont('Helvetica', FAST_FONT_SIZE, FAST_ROW_HEIGHT)
+        body.setFillColor(colors.black)
+        for i, x in enumerate(xs[:-1]):
+            body.setTextOrigin(x + 2, ys[2] + baseline)
+            body.textLines([row[i] for row in rows], trim=0)
+        canv.drawText(body)
+        canv.restoreState()
+
+def build_fast_table(rows, width):
+    """
+    Быстрый режим для больших таблиц: простые строки вместо Paragraph
+    и фиксированные размеры ячеек, стиль задаётся один раз на всю таблицу
+    """
+    rows = [[line] if isinstance(line, str) else line for line in rows if line]
+    if not rows:
+        return None
+    columns = max(len(row) for row in rows)
+    rows = [[str(cell) for cell in row] + [""] * (columns - len(row)) for row in rows]
+    header, body = rows[0], rows[1:] or [[""] * columns]
+    return FastTable(header, body, [width / columns] * columns)
+
+class SectionDocTemplate(SimpleDocTemplate):
+    """Документ, запоминающий страницу начала каждого раздела - для оглавления при склейке"""
+
+    def __init__(self, *args, **kwargs):
+        SimpleDocTemplate.__init__(self, *args, **kwargs)
+        self.section_pages = {}
+
+    def afterFlowable(self, flowable):
+        name = getattr(flowable, 'section_name', None)
+        if name is not None and name not in self.section_pages:
+            self.section_pages[name] = self.page
+
+def _table_rows(tables):
+    return sum(len(content) for content in tables.values() if content)
+
+@traced("build_document_compact")
+def build_document_compact(tables, output_file="simple_table.pdf", fast_rows=LARGE_TABLE_ROWS):
+    logger.info("Создание компактного PDF документа...")
     # Еще более компактные поля
-    doc = SimpleDocTemplate("simple_table.pdf", 
+    doc = SectionDocTemplate(output_file, 
                           pagesize=A4,
                           leftMargin=0.5*cm,
                           rightMargin=0.5*cm,
                           topMargin=0.7*cm,
                           bottomMargin=0.7*cm)
     
-    styles = getSampleStyleSheet()
     story = []
-
-    # Компактный стиль таблицы
-    compact_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('LEFTPADDING', (0, 0), (-1, -1), 2),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 2),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
-    ])
-    
-    # Создаем компактный стиль для текста
-    compact_text_style = styles['Normal']
-    compact_text_style.fontSize = 7
-    compact_text_style.leading = 9
-    
-    compact_title_style = styles['Heading2']
-    compact_title_style.fontSize = 12
-    compact_title_style.leading = 14
     
     for section_name, content in tables.items():
-        print(f"Обработка: {section_name}")
+        logger.debug("Обработка: %s", section_name)
         
-        title = Paragraph(f"<b>{section_name}</b>", compact_title_style)
+        title = Paragraph(f"<b>{section_name}</b>", COMPACT_TITLE_STYLE)
+        title.section_name = section_name
         story.append(title)
         story.append(Spacer(1, 4))
         
-        if content:
+        if content and all(isinstance(image, bytes) for image in content):
+            # Графики в виде PNG из памяти, без временных файлов
+            for i, png in enumerate(content):
+                image_width, image_height = ImageReader(io.BytesIO(png)).getSize()
+                scale = min(doc.width / image_width, (doc.height - 40) / image_height)
+                image = Image(io.BytesIO(png), width=image_width * scale, height=image_height * scale)
+                if i == 0:
+                    # Заголовок не должен отрываться от первого графика
+                    story[-2:] = [KeepTogether(story[-2:] + [image])]
+                else:
+                    story.append(image)
+                story.append(Spacer(1, 8))
+        elif content and fast_rows is not None and len(content) > fast_rows:
+            table = build_fast_table(content, doc.width)
+            if table:
+                story.append(table)
+                story.append(Spacer(1, 8))
+        elif content:
             table_data = []
             for line in content:
                 if isinstance(line, str) and line.strip():
-                    table_data.append([Paragraph(line, compact_text_style)])
+                    table_data.append([Paragraph(line, COMPACT_TEXT_STYLE)])
                 elif isinstance(line, list):
-                    row = [Paragraph(str(cell), compact_text_style) for cell in line]
+                    row = [Paragraph(str(cell), COMPACT_TEXT_STYLE) for cell in line]
                     table_data.append(row)
             
             if table_data:
                 table = Table(table_data)
-                table.setStyle(compact_style)
+                table.setStyle(COMPACT_TABLE_STYLE)
                 story.append(table)
                 story.append(Spacer(1, 8))
     
     if story:
-        doc.build(story)
-        print("Компактный PDF создан успешно!")
+        with stage("reportlab layout", rows=_table_rows(tables)):
+            doc.build(story)
+        logger.info("Компактный PDF создан успешно!")
     else:
-        print("Ошибка: Нет данных для создания документа!")
+        logger.error("Ошибка: Нет данных для создания документа!")
+    # Номера страниц, с которых начинаются разделы
+    return doc.section_pages
 
-def calculate_battery_parameters(parsed_data):
+def calculate_battery_parameters(parsed_data, analysis=None):
     """
     Вычисляет параметры батареи из распарсенных данных
     """
-    parameters = {}
-    
-    # Временная реализация - в реальном коде здесь должен быть анализ данных
-    parameters['CapChg'] = {"average": 2500, "spread": 5.2, "values": [2450, 2550], "unit": "mAh"}
-    parameters['CapDsc'] = {"average": 2400, "spread": 4.8, "values": [2350, 2450], "unit": "mAh"}
-    parameters['EneChg'] = {"average": 9200, "spread": 5.1, "values": [9000, 9400], "unit": "mWh"}
-    parameters['EneDsc'] = {"average": 8800, "spread": 4.9, "values": [8600, 9000], "unit": "mWh"}
-    parameters['TimeChg'] = {"average": 2.5, "spread": 3.2, "values": [2.4, 2.6], "unit": "hours"}
-    parameters['TimeDsc'] = {"average": 2.3, "spread": 3.5, "values": [2.2, 2.4], "unit": "hours"}
-    
-    parameters['CycChg'] = 5
-    parameters['CycChgFull'] = 3
-    parameters['CycDsc'] = 5
-    parameters['CycDscFull'] = 3
-    parameters['TimeTotal'] = 25.5
-    
-    return parameters
+    if analysis is None:
+        analysis = analyze_log(parsed_data)
+    return battery_parameters(analysis)
 
 def create_battery_parameters_table(parameters):
     """Создает таблицу с параметрами батареи на английском"""
@@ -141,42 +251,35 @@ def create_battery_parameters_table(parameters):
     
     return table_data
 
+@traced("analyze_cycle_data", rows=lambda info: len(info['analysis']['time']))
 def analyze_cycle_data(parsed_data):
     """
     Анализирует данные циклов для создания графиков и сводных таблиц
     """
+    logger.info("Analyzing cycle data...")
+    analysis = analyze_log(parsed_data)
+    cycles = analysis['cycles']
+
     cycles_info = {
-        'charge_cycles': [],
-        'discharge_cycles': [],
-        'all_cycles': [],
-        'summary_data': []
+        'charge_cycles': [c for c in cycles if c['type'] == "charge"],
+        'discharge_cycles': [c for c in cycles if c['type'] == "discharge"],
+        'all_cycles': cycles,
+        'summary_data': create_cycles_summary_table(cycles) if cycles else [],
+        'analysis': analysis
     }
     
-    # Упрощенный анализ - в реальном коде здесь должен быть парсинг данных циклов
-    print("Analyzing cycle data...")
-    
-    # Создаем тестовые данные для демонстрации
-    cycles_info['summary_data'] = create_test_cycles_summary_table()
-    
     return cycles_info
 
-def create_test_cycles_summary_table():
-    """Создает тестовую сводную таблицу циклов"""
+def create_cycles_summary_table(cycles):
+    """Создает сводную таблицу циклов"""
     table_data = [["CYCLE SUMMARY TABLE"]]
-    table_data.append(["Cycle", "Type", "Duration (h)", "Start V", "End V", "Capacity (Ah)", "Energy (Wh)"])
-    
-    # Тестовые данные
-    test_cycles = [
-        {"type": "charge", "duration": 7800, "start_voltage": 3.2, "end_voltage": 4.2, "capacity": 2.45, "energy": 9.15},
-        {"type": "discharge", "duration": 7200, "start_voltage": 4.2, "end_voltage": 3.0, "capacity": 2.38, "energy": 8.72},
-        {"type": "charge", "duration": 7900, "start_voltage": 3.0, "end_voltage": 4.2, "capacity": 2.48, "energy": 9.28},
-        {"type": "discharge", "duration": 7100, "start_voltage": 4.2, "end_voltage": 3.1, "capacity": 2.35, "energy": 8.65},
-    ]
+    table_data.append(["Cycle", "Type", "Full", "Duration (h)", "Start V", "End V", "Capacity (Ah)", "Energy (Wh)"])
     
-    for i, cycle in enumerate(test_cycles):
+    for cycle in cycles:
         table_data.append([
-            f"Cycle {i+1}",
+            f"Cycle {cycle['number']}",
             cycle['type'],
+            "yes" if cycle['full'] else "no",
             f"{cycle['duration']/3600:.2f}",
             f"{cycle['start_voltage']:.2f}",
             f"{cycle['end_voltage']:.2f}",
@@ -192,18 +295,18 @@ def create_detailed_analysis_section():
         ["DETAILED CYCLE ANALYSIS INFORMATION"],
         ["", "", "", ""],
         ["Per-Cycle Analysis:", "", "", ""],
-        ["• Voltage/Current", "Battery voltage and absolute current vs time", "All cycles", "cycle_*_voltage_current.png"],
-        ["• Power", "Calculated power vs time", "All cycles", "cycle_*_power.png"],
-        ["• Capacity/Energy", "Cumulative capacity and energy vs time", "All cycles", "cycle_*_capacity_energy.png"],
-        ["• Temperature", "Battery temperature vs time", "If temperature > 0°C", "cycle_*_temperature.png"],
-        ["• Cell Voltages", "Individual cell voltages vs time", "If cell data available", "cycle_*_cell_voltages.png"],
+        ["• Voltage/Current", "Battery voltage and absolute current vs time", "All cycles", "Cycle N Charts"],
+        ["• Power", "Calculated power vs time", "All cycles", "Cycle N Charts"],
+        ["• Capacity/Energy", "Cumulative capacity and energy vs time", "All cycles", "Cycle N Charts"],
+        ["• Temperature", "Battery temperature vs time", "If temperature > 0°C", "Cycle N Charts"],
+        ["• Cell Voltages", "Individual cell voltages vs time", "If cell data available", "Cycle N Charts"],
         ["", "", "", ""],
         ["Overall Test Analysis:", "", "", ""],
-        ["• Voltage/Current", "Normalized voltage and current vs time", "Complete test", "overall_voltage_current.png"],
-        ["• Power", "Power characteristics vs time", "Complete test", "overall_power.png"],
-        ["• Capacity/Energy", "Cumulative values vs time", "Complete test", "overall_capacity_energy.png"],
-        ["• Temperature", "Battery and charger temperature", "If temperature data", "overall_temperature.png"],
-        ["• Input Power", "Input voltage and current", "If input data", "overall_input_power.png"],
+        ["• Voltage/Current", "Normalized voltage and current vs time", "Complete test", "Overall Test Charts"],
+        ["• Power", "Power characteristics vs time", "Complete test", "Overall Test Charts"],
+        ["• Capacity/Energy", "Cumulative values vs time", "Complete test", "Overall Test Charts"],
+        ["• Temperature", "Battery and charger temperature", "If temperature data", "Overall Test Charts"],
+        ["• Input Power", "Input voltage and current", "If input data", "Overall Test Charts"],
         ["", "", "", ""],
         ["Calculation Methods:", "", "", ""],
         ["• Power", "P = |I| × V (calculated from current/voltage)", "", ""],
@@ -219,8 +322,8 @@ def create_plots_status_section(plots_generated):
     
     if plots_generated:
         status_data.append(["Status:", "SUCCESS", "", ""])
-        status_data.append(["Plots Directory:", "plots/", "", ""])
-        status_data.append(["Files Generated:", "Sample plot and analysis graphs", "", ""])
+        status_data.append(["Charts:", "Embedded into this report", "", ""])
+        status_data.append(["Decimation:", f"min/max, up to {MAX_POINTS} points per line", "", ""])
     else:
         status_data.append(["Status:", "DISABLED", "", ""])
         status_data.append(["Reason:", "Matplotlib not available", "", ""])
@@ -228,53 +331,94 @@ def create_plots_status_section(plots_generated):
     
     return status_data
 
-def create_simple_pdf_table():
+def generate_report(tsv_path, output_file="simple_table.pdf", db=None, workers=None):
+    """
+    Разбор лога, анализ циклов и построение PDF; ошибки пробрасываются вызывающему.
+    Если задан db, параметры и сводка по циклам сохраняются в базу fleet_db.
+    При workers > 1 разделы отчёта вёрстаются параллельно (см. report_parallel).
+    """
+    # Читаем и анализируем данные
+    readed_file = load_sections_cached(tsv_path)
+    if not readed_file:
+        raise ValueError(f"Не удалось прочитать данные из '{tsv_path}'")
+    logger.info("Original data loaded successfully")
+    return build_report(readed_file, output_file, db, tsv_path, workers)
+
+@traced("build_report")
+def build_report(readed_file, output_file="simple_table.pdf", db=None, log_path=None, workers=None):
+    """Построение PDF по уже разобранным секциям лога"""
+    # Анализируем данные циклов
+    cycles_info = analyze_cycle_data(readed_file)
+    logger.info("Cycle data analyzed")
+    
+    # Сохраняем числа в общую базу логов
+    if db and log_path:
+        connection = fleet_db.connect(db)
+        try:
+            fleet_db.store_log(connection, log_path, readed_file, cycles_info['analysis'])
+        finally:
+            connection.close()
+        logger.info("Cycle summary stored in '%s'", db)
+    
+    # Вычисляем параметры батареи
+    battery_params = calculate_battery_parameters(readed_file, cycles_info['analysis'])
+    logger.info("Battery parameters calculated")
+    
+    if workers and workers > 1:
+        from report_parallel import render_report_parallel
+        render_report_parallel(readed_file, cycles_info, battery_params, output_file, workers)
+        logger.info("PDF report '%s' generated successfully!", output_file)
+        return output_file
+    
+    # Создаем таблицы для PDF
+    tables = parse_for_table(readed_file)
+    
+    # Добавляем таблицу с параметрами на английском
+    params_table = create_battery_parameters_table(battery_params)
+    tables["Battery Test Parameters"] = params_table
+    
+    # Добавляем сводную таблицу циклов
+    if cycles_info['summary_data']:
+        tables["Cycle Summary"] = cycles_info['summary_data']
+    
+    # Добавляем графики по циклам и за всё время тестирования
+    with stage("render_report_charts") as info:
+        charts = render_report_charts(readed_file, cycles_info['analysis'])
+        info['rows'] = len(charts)
+    tables.update(charts)
+    tables["Plots Generation Status"] = create_plots_status_section(bool(charts))
+    
+    # Добавляем детальную информацию об анализе
+    analysis_section = create_detailed_analysis_section()
+    tables["Detailed Analysis Information"] = analysis_section
+    
+    print_parse_data({name: content for name, content in tables.items() if name not in charts})
+    
+    # Создаем PDF документ; оглавление, закладки и номера страниц добавляются
+    # той же склейкой, что и при параллельной вёрстке, - структура PDF одинакова
+    from report_parallel import merge_fragments
+    body = io.BytesIO()
+    pages = build_document_compact(tables, body)
+    with stage("merge fragments"):
+        merge_fragments([(body.getvalue(), pages)], {}, output_file)
+    
+    logger.info("PDF report '%s' generated successfully!", output_file)
+    
+    if not charts:
+        logger.warning("Plots were not generated due to missing dependencies")
+    return output_file
+
+def create_simple_pdf_table(tsv_path=tsv_file, output_file="simple_table.pdf", db=fleet_db.FLEET_DB):
     """Основная функция создания PDF с улучшенной структурой"""
-    print("Starting PDF report generation...")
+    logger.info("Starting PDF report generation...")
     
     try:
-        # Читаем и анализируем данные
-        readed_file = parse_sections_file(tsv_file)
-        print("Original data loaded successfully")
-        
-        # Вычисляем параметры батареи
-        battery_params = calculate_battery_parameters(readed_file)
-        print("Battery parameters calculated")
-        
-        # Анализируем данные циклов
-        cycles_info = analyze_cycle_data(readed_file)
-        print("Cycle data analyzed")
-        
-        # Создаем таблицы для PDF
-        tables = parse_for_table(readed_file)
-        
-        # Добавляем таблицу с параметрами на английском
-        params_table = create_battery_parameters_table(battery_params)
-        tables["Battery Test Parameters"] = params_table
-        
-        # Добавляем сводную таблицу циклов
-        if cycles_info['summary_data']:
-            tables["Cycle Summary"] = cycles_info['summary_data']
-        
-        # Добавляем детальную информацию об анализе
-        analysis_section = create_detailed_analysis_section()
-        tables["Detailed Analysis Information"] = analysis_section
-        
-        print("\nFinal data structure for PDF:")
-        print_parse_data(tables)
-        
-        # Создаем PDF документ
-        build_document_compact(tables)
-        
-        print(f"\nPDF report 'simple_table.pdf' generated successfully!")
-        
-        print("Plots were not generated due to missing dependencies")
+        generate_report(tsv_path, output_file, db)
             
     except Exception as e:
-        print(f"Error during PDF generation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error during PDF generation: %s", e)
 
 # Запуск
 if __name__ == "__main__":
-    create_simple_pdf_table()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    create_simple_pdf_table(*sys.argv[1:3])
@@ -0,0 +1,27 @@
+"""
+Проверки без сети и без браузера: разбор и анализ логов 4.1 на коротком образце
+и синтетическом логе, поиск ФИПС на локальном сервере FixtureServer
+и заглушках драйвера Selenium.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from log_generator import write_log
+
+@pytest.fixture(scope="session")
+def sample_log():
+    """Короткий настоящий лог зарядного устройства: один цикл заряда"""
+    return os.path.join(ROOT, "4.1", "data", "2024-09-16_21-23-32_short.tsv")
+
+@pytest.fixture(scope="session")
+def generated_log(tmp_path_factory):
+    """Синтетический лог: четыре цикла заряд/разряд по 5000 строк, из них 250 - покой"""
+    path = str(tmp_path_factory.mktemp("logs") / "generated.tsv")
+    write_log(path, rows=20000, cycles=4)
+    return path
@@ -0,0 +1,27 @@
+import pytest
+from analysis import analyze_log, battery_parameters
+from parse import parse_sections_file
+
+def test_sample_log_is_one_charge_cycle(sample_log):
+    analysis = analyze_log(parse_sections_file(sample_log))
+    assert analysis['v_min'] == 6400 and analysis['v_max'] == 8360
+    assert [cycle['type'] for cycle in analysis['cycles']] == ["charge"]
+    assert analysis['cycles'][0]['capacity'] == pytest.approx(0.1975, abs=1e-3)
+
+def test_generated_log_cycles_and_capacities(generated_log):
+    analysis = analyze_log(parse_sections_file(generated_log))
+    cycles = analysis['cycles']
+    # Лог из conftest: четыре цикла по 5000 строк
+    assert len(cycles) == 4
+    assert [cycle['type'] for cycle in cycles] == ["charge", "discharge"] * 2
+    assert all(cycle['full'] for cycle in cycles)
+    # Каждый цикл - 4750 строк работы с шагом 1 с, покой в цикл не входит
+    assert [cycle['start'] for cycle in cycles] == [0, 5000, 10000, 15000]
+    assert all(cycle['duration'] == 4749 for cycle in cycles)
+    # Разряд постоянным током 1000 мА; заряд - CC, затем спад тока на этапе CV
+    for cycle in cycles:
+        expected = 1.319 if cycle['type'] == "discharge" else 1.1706
+        assert cycle['capacity'] == pytest.approx(expected, abs=2e-3)
+    parameters = battery_parameters(analysis)
+    assert parameters['CycChg'] == parameters['CycDsc'] == 2
+    assert parameters['CapDsc']['average'] == pytest.approx(1319, abs=2)
@@ -0,0 +1,55 @@
+import pytest
+import cert_index
+from cert_index import LINK_COLUMN, CertIndex
+
+RECORDS = [
+    {'Название': "Система управления базой знаний", 'Авторы': "Петрова Анна Сергеевна",
+     'Регистрационный номер': "2023610001", LINK_COLUMN: "https://www1.fips.ru/fips_servlet?DocNumber=2023610001"},
+    {'Название': "Система питания импульсной нагрузки", 'Авторы': "Иванов Иван Иванович",
+     'Регистрационный номер': "2023612345", LINK_COLUMN: "https://www1.fips.ru/fips_servlet?DocNumber=2023612345"},
+]
+
+@pytest.fixture
+def index(tmp_path):
+    with CertIndex(str(tmp_path / "index")) as index:
+        index.add(RECORDS)
+        yield index
+
+def numbers(records):
+    return [record['Регистрационный номер'] for record in records]
+
+def test_match_requires_the_same_title(index):
+    assert numbers(index.match("Система управления базой знаний")) == ["2023610001"]
+    assert numbers(index.match("системы управления базой знаний")) == ["2023610001"]
+    # Нечёткий поиск считает это совпадением, строгий - нет
+    assert numbers(index.lookup("Система управления базой данных")) == ["2023610001"]
+    assert index.match("Система управления базой данных") == []
+    assert index.match("система") == []
+
+def test_match_requires_exact_surnames(index):
+    assert numbers(index.lookup("Система управления базой знаний", "Петров")) == ["2023610001"]
+    assert index.match("Система управления базой знаний", "Петров") == []
+    assert index.match(authors="Петров") == []
+    assert numbers(index.match("Система управления базой знаний", "Петрова А. С.")) == ["2023610001"]
+    assert numbers(index.match(authors="Иванов")) == ["2023612345"]
+
+def test_find_goes_remote_on_near_miss(index, monkeypatch):
+    import fips_bulk
+    calls = []
+
+    class Searcher:
+        def __init__(self, base_url=None):
+            pass
+
+        def close(self):
+            pass
+
+    def search_one(searcher, query, max_docs=10, cache=None):
+        calls.append(query)
+        return []
+
+    monkeypatch.setattr("fips_http.FIPSHttpSearch", Searcher)
+    monkeypatch.setattr(fips_bulk, "search_one", search_one)
+    assert cert_index.find(index, "Система питания импульсной нагрузки")[1] == 'local'
+    assert cert_index.find(index, "Система питания")[1] == 'remote'
+    assert calls == [{'title': "Система питания", 'authors': ""}]
@@ -0,0 +1,40 @@
+import os
+import numpy as np
+import pytest
+from analysis import analyze_log
+from cycle_index import index_path, load_cycle, load_index
+from log_generator import write_log
+from parse import DATA_SECTION, parse_sections_file
+
+@pytest.fixture(scope="module")
+def full(generated_log):
+    sections = parse_sections_file(generated_log)
+    return sections, analyze_log(sections)['cycles']
+
+@pytest.mark.parametrize("include_rest", [False, True])
+def test_load_cycle_matches_slice_of_full_parse(generated_log, full, include_rest):
+    sections, cycles = full
+    index = load_index(generated_log)
+    assert len(index['cycles']) == len(cycles)
+    rows = len(sections[DATA_SECTION]['Vout(mv)'])
+    for i, cycle in enumerate(cycles):
+        stop = cycle['end']
+        if include_rest:
+            stop = cycles[i + 1]['start'] if i + 1 < len(cycles) else rows
+        part = load_cycle(generated_log, cycle['number'], include_rest, index)
+        assert part['Items'] == sections['Items']
+        assert part['End'] == sections['End']
+        for name, values in sections[DATA_SECTION].items():
+            assert np.array_equal(part[DATA_SECTION][name], values[cycle['start']:stop]), (cycle['number'], name)
+
+def test_load_cycle_rejects_unknown_number(generated_log):
+    with pytest.raises(IndexError):
+        load_cycle(generated_log, 0)
+
+def test_index_is_rebuilt_when_log_changes(tmp_path):
+    path = str(tmp_path / "log.tsv")
+    write_log(path, rows=4000, cycles=2)
+    assert len(load_index(path)['cycles']) == 2
+    assert os.path.exists(index_path(path))
+    write_log(path, rows=6000, cycles=3)
+    assert len(load_index(path)['cycles']) == 3
@@ -0,0 +1,171 @@
+import os
+import pytest
+from selenium.common.exceptions import WebDriverException
+import laba_4_3
+from fips_bulk import read_queries, search_one
+from fips_cache import FIPSCache
+from fips_details import LINK_COLUMN, DetailFetcher
+from fips_fixture import BASE_DIR, FixtureServer
+from fips_http import VIEW_STATE, FIPSHttpSearch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BASE_URL = "https://www1.fips.ru/iiss/search.xhtml"
+FORM_PAGE = "<html><body><form><input id='docName' type='text'><button>Найти</button></form></body></html>"
+RESULTS_PAGE = ("<html><body><table><tr><td>2023612345</td><td>"
+                "<a href='https://www1.fips.ru/registers-doc-view/fips_servlet?DB=EVM&id=2023612345'>"
+                "Система питания импульсной нагрузки</a></td></tr></table></body></html>")
+
+class FakeElement:
+    def __init__(self, driver):
+        self.driver = driver
+        self.value = ""
+
+    def clear(self):
+        self.value = ""
+
+    def send_keys(self, text):
+        self.value += text
+
+    def get_attribute(self, name):
+        return self.value if name == 'value' else 'text'
+
+    def is_enabled(self):
+        return True
+
+class FakeDriver:
+    """Драйвер Chrome с одной формой поиска: после нажатия кнопки отдаёт страницу выдачи"""
+
+    def __init__(self, *args, fail=False, **kwargs):
+        self.fail = fail
+        self.current_url = "about:blank"
+        self.page_source = ""
+        self.field = FakeElement(self)
+        self.button = FakeElement(self)
+
+    def get(self, url):
+        if self.fail:
+            raise WebDriverException("net::ERR_CONNECTION_RESET")
+        self.current_url = url
+        self.page_source = FORM_PAGE
+
+    def execute_script(self, script, *args):
+        if args and args[0] is self.button:
+            self.current_url = BASE_URL + "?result"
+            self.page_source = RESULTS_PAGE
+        return True
+
+    def find_element(self, by, value):
+        return self.field
+
+    def find_elements(self, by, value):
+        if "Найти" in value:
+            return [self.button]
+        if "href" in value:
+            return [self.field] if self.page_source == RESULTS_PAGE else []
+        return []
+
+    def quit(self):
+        pass
+
+@pytest.fixture
+def searcher_factory(monkeypatch):
+    monkeypatch.setattr(laba_4_3, "ChromeDriverManager", lambda: type("Manager", (), {"install": lambda self: ""})())
+    monkeypatch.setattr(laba_4_3, "Service", lambda *args, **kwargs: None)
+
+    def create(fail=False):
+        monkeypatch.setattr(laba_4_3.webdriver, "Chrome", lambda *args, **kwargs: FakeDriver(fail=fail))
+        return laba_4_3.FIPSSearch(headless=True, base_url=BASE_URL)
+    return create
+
+def fixture_server():
+    """Сервер-заглушка ФИПС на страницах из tests/fixtures"""
+    return FixtureServer(
+        routes={"/iiss/search.xhtml": os.path.join(FIXTURES, "search_form.html"),
+                "/registers-doc-view/fips_servlet": os.path.join(FIXTURES, "document_page.html")},
+        post_routes={"/iiss/search.xhtml": os.path.join(FIXTURES, "search_results.html")})
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = FIPSCache(str(tmp_path / "fips_cache.db"))
+    yield cache
+    cache.close()
+
+def test_search_one_caches_selenium_results(searcher_factory, cache):
+    searcher = searcher_factory()
+    rows = search_one(searcher, {'title': "Система питания", 'authors': ""}, cache=cache)
+    assert rows[0]['Название'] == "Система питания импульсной нагрузки"
+    assert rows[0]['Регистрационный номер'] == "2023612345"
+    entry = cache.get_query("Система питания", "")
+    assert entry['page_url'] == BASE_URL + "?result"
+    assert entry['html'] == RESULTS_PAGE
+    assert searcher.last_error is None
+
+def test_search_one_caches_by_title_only(searcher_factory, cache):
+    searcher = searcher_factory()
+    search_one(searcher, {'title': "Система питания", 'authors': "Иванов"}, cache=cache)
+    # Авторы в запрос к сайту не попадают - и в ключ кэша тоже
+    assert cache.get_query("Система питания", "Иванов") is None
+    assert cache.get_query("Система питания", "")['html'] == RESULTS_PAGE
+    with pytest.raises(ValueError):
+        search_one(searcher, {'title': "", 'authors': "Иванов"}, cache=cache)
+    assert cache.stats()['queries'] == 1
+
+def test_read_queries_skips_rows_without_title(tmp_path, caplog):
+    path = tmp_path / "queries.csv"
+    path.write_text("Название,Авторы\nСистема питания,Иванов\n,Петрова\n\nБаза знаний,\n", encoding='utf-8')
+    assert read_queries(str(path)) == [{'title': "Система питания", 'authors': "Иванов"},
+                                       {'title': "База знаний", 'authors': ""}]
+    assert "Петрова" in caplog.text
+
+def test_search_one_does_not_cache_selenium_failure(searcher_factory, cache, caplog):
+    searcher = searcher_factory(fail=True)
+    with pytest.raises(RuntimeError, match="ERR_CONNECTION_RESET"):
+        search_one(searcher, {'title': "Система питания", 'authors': ""}, cache=cache)
+    assert cache.get_query("Система питания", "", allow_stale=True) is None
+    # Сбой уходит в журнал модуля, а не в stdout
+    assert [record.levelname for record in caplog.records if record.name == "laba_4_3"] == ["WARNING"]
+    assert "ERR_CONNECTION_RESET" in caplog.text
+
+def test_http_search_posts_jsf_form_to_fixture():
+    with fixture_server() as server:
+        searcher = FIPSHttpSearch(base_url=server.url + "/iiss/search.xhtml")
+        try:
+            assert searcher.search_document(title="Система питания"), searcher.last_error
+            assert searcher.extract_document_links()
+        finally:
+            searcher.close()
+    assert ('GET', '/iiss/search.xhtml') in server.requests
+    path, form = server.posts[0]
+    assert path == "/iiss/search.xhtml"
+    assert form[VIEW_STATE] == "-3591416286042713416:2290451138471129872"
+    assert form["searchForm:docName"] == "Система питания"
+    assert form["searchForm:search"] == "searchForm:search"
+    assert "q" not in form
+    assert searcher.results[0]['Регистрационный номер'] == "2023612345"
+
+def test_http_search_rejects_page_without_search_form():
+    # Сохранённая страница выбора БД: JSF-формы без поля названия и поиск по сайту в шапке
+    routes = {"/iiss/search.xhtml": os.path.join(BASE_DIR, "page_source.html")}
+    with FixtureServer(routes=routes) as server:
+        searcher = FIPSHttpSearch(base_url=server.url + "/iiss/search.xhtml")
+        try:
+            assert not searcher.search_document(title="Система питания")
+        finally:
+            searcher.close()
+    assert "JSF-формы поиска" in searcher.last_error
+    assert not server.posts
+    assert all(path.startswith("/iiss/search.xhtml") for _, path in server.requests)
+
+@pytest.mark.parametrize("with_cache", [False, True])
+def test_detail_fetcher_forgets_finished_downloads(with_cache, cache):
+    with fixture_server() as server:
+        url = server.url + "/registers-doc-view/fips_servlet?DB=EVM&DocNumber=2023612345"
+        rows = [{LINK_COLUMN: url}, {LINK_COLUMN: url}]
+        fetcher = DetailFetcher(workers=2, cache=cache if with_cache else None)
+        try:
+            fetcher.fill(rows)
+        finally:
+            fetcher.close()
+    assert fetcher.pending == {}
+    assert fetcher.fetched == 1
+    assert all(row['Регистрационный номер'] == "2023612345" for row in rows)
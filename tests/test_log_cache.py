@@ -0,0 +1,72 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import log_cache
+from log_cache import load_sections_cached
+from parse import DATA_SECTION, parse_sections_file
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Счётчик настоящих разборов текста: попадание в кэш его не увеличивает"""
+    calls = []
+
+    def counting(filename):
+        calls.append(filename)
+        return parse_sections_file(filename)
+
+    monkeypatch.setattr(log_cache, "parse_sections_file", counting)
+    return calls
+
+def assert_same_sections(actual, expected):
+    assert list(actual) == list(expected)
+    for name, content in expected.items():
+        if name == DATA_SECTION:
+            assert list(actual[name]) == list(content)
+            for column, values in content.items():
+                assert np.array_equal(actual[name][column], values), column
+        else:
+            assert actual[name] == content
+
+def test_cache_round_trip(tmp_path, parses, sample_log):
+    log = str(tmp_path / "log.tsv")
+    shutil.copy(sample_log, log)
+    cache_dir = str(tmp_path / "cache")
+    first = load_sections_cached(log, cache_dir)
+    second = load_sections_cached(log, cache_dir)
+    assert len(parses) == 1
+    assert_same_sections(first, parse_sections_file(sample_log))
+    assert_same_sections(second, first)
+    # Столбцы из кэша отображаются в память, а не читаются целиком
+    assert isinstance(second[DATA_SECTION]['Vout(mv)'].base, np.memmap)
+
+def test_cache_is_invalidated_when_log_changes(tmp_path, parses, sample_log):
+    log = str(tmp_path / "log.tsv")
+    shutil.copy(sample_log, log)
+    cache_dir = str(tmp_path / "cache")
+    before = load_sections_cached(log, cache_dir)
+    with open(sample_log, 'r', encoding='utf-8') as file:
+        text = file.read()
+    with open(log, 'w', encoding='utf-8') as file:
+        file.write(text.replace("0:0:1  \t19999", "0:0:1  \t29999", 1) + "\n")
+    after = load_sections_cached(log, cache_dir)
+    assert len(parses) == 2
+    assert before[DATA_SECTION]['Vin(mv)'][1] == 19999
+    assert after[DATA_SECTION]['Vin(mv)'][1] == 29999
+
+def test_content_hash_detects_same_size_and_mtime(tmp_path, parses, sample_log):
+    log = str(tmp_path / "log.tsv")
+    shutil.copy(sample_log, log)
+    stat = os.stat(log)
+    cache_dir = str(tmp_path / "cache")
+    load_sections_cached(log, cache_dir, content_hash=True)
+    with open(sample_log, 'r', encoding='utf-8') as file:
+        text = file.read()
+    with open(log, 'w', encoding='utf-8') as file:
+        file.write(text.replace("0:0:1  \t19999", "0:0:1  \t29999", 1))
+    os.utime(log, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    after = load_sections_cached(log, cache_dir, content_hash=True)
+    assert len(parses) == 2
+    assert after[DATA_SECTION]['Vin(mv)'][1] == 29999
+    assert load_sections_cached(log, cache_dir, content_hash=True)[DATA_SECTION]['Vin(mv)'][1] == 29999
+    assert len(parses) == 2
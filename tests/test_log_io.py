@@ -0,0 +1,70 @@
+import bz2
+import gzip
+import lzma
+import numpy as np
+import pytest
+from log_io import ZSTD_AVAILABLE, StreamDecompressor, detect_compression
+from parse import DATA_SECTION, parse_sections_file
+from tail import LogTail
+
+def compress(kind, data):
+    if kind == "gzip":
+        return gzip.compress(data)
+    if kind == "xz":
+        return lzma.compress(data)
+    if kind == "bz2":
+        return bz2.compress(data)
+    import zstandard
+    return zstandard.ZstdCompressor().compress(data)
+
+KINDS = [("gzip", ".gz"), ("xz", ".xz"), ("bz2", ".bz2"),
+         pytest.param("zstd", ".zst", marks=pytest.mark.skipif(not ZSTD_AVAILABLE, reason="нет zstandard"))]
+
+def assert_same_sections(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name, content in expected.items():
+        if name == DATA_SECTION:
+            assert actual[name].keys() == content.keys()
+            for column, values in content.items():
+                assert np.array_equal(actual[name][column], values), column
+        else:
+            assert actual[name] == content
+
+@pytest.fixture(scope="module")
+def sample(sample_log):
+    with open(sample_log, 'rb') as file:
+        return file.read()
+
+@pytest.mark.parametrize("kind, extension", KINDS)
+def test_compressed_log_parses_like_plain(tmp_path, sample, kind, extension, sample_log):
+    path = tmp_path / ("log.tsv" + extension)
+    path.write_bytes(compress(kind, sample))
+    assert detect_compression(str(path)) == kind
+    assert_same_sections(parse_sections_file(str(path)), parse_sections_file(sample_log))
+
+def test_format_is_detected_by_content(tmp_path, sample, sample_log):
+    path = tmp_path / "log.tsv"
+    path.write_bytes(gzip.compress(sample))
+    assert_same_sections(parse_sections_file(str(path)), parse_sections_file(sample_log))
+
+@pytest.mark.parametrize("kind, extension", KINDS)
+def test_stream_decompressor_joins_streams(sample, kind, extension):
+    half = len(sample) // 2
+    data = compress(kind, sample[:half]) + compress(kind, sample[half:])
+    decompressor = StreamDecompressor(kind)
+    output = b"".join(decompressor.decompress(data[i:i + 1000]) for i in range(0, len(data), 1000))
+    assert output == sample
+
+def test_log_tail_follows_gzip_members(tmp_path, sample, sample_log):
+    path = tmp_path / "live.tsv.gz"
+    path.write_bytes(b"")
+    tail = LogTail(str(path))
+    # Устройство сбрасывает буфер отдельными gzip-членами
+    for start in range(0, len(sample), 10000):
+        with open(path, 'ab') as file:
+            file.write(gzip.compress(sample[start:start + 10000]))
+        tail.poll()
+    assert tail.finished
+    expected = parse_sections_file(sample_log)
+    for column, values in expected[DATA_SECTION].items():
+        assert np.array_equal(tail.sections()[DATA_SECTION][column], values)
@@ -0,0 +1,33 @@
+import numpy as np
+from parse import DATA_SECTION, TIME_COLUMN, DataColumnsBuilder, parse_sections_file
+
+HEADER = "Time(h/m/s) \tVout(mv) \tIout(mA) \tCapa(mah)"
+
+def test_fast_path_rejects_rows_of_wrong_width():
+    lines = ["0:0:0 \t8100 \t133 \t0",
+             "0:0:1 \t8278 \t751 \t0 \t99",
+             "0:0:2 \t8331 \t920 \t1",
+             "0:0:3 \t8351",
+             "0:0:4 \t8360 \t1000 \t2"]
+    builder = DataColumnsBuilder(HEADER)
+    # Общее число полей совпадает с 5 строками по 4 столбца, но две строки битые
+    assert builder._convert_fast(lines) is None
+    block, kept = builder.convert(lines)
+    assert kept.tolist() == [0, 2, 4]
+    assert block.tolist() == [[0, 8100, 133, 0], [2, 8331, 920, 1], [4, 8360, 1000, 2]]
+
+def test_fast_and_slow_paths_agree(sample_log):
+    with open(sample_log, 'r', encoding='utf-8') as file:
+        lines = file.read().split("==Data==", 1)[1].split("==End==", 1)[0].strip().splitlines()
+    builder = DataColumnsBuilder(lines[0])
+    fast = builder._convert_fast(lines[1:])
+    slow, kept = builder._convert_slow(lines[1:])
+    assert len(kept) == len(lines) - 1
+    assert np.array_equal(fast, slow)
+
+def test_parse_sample_log(sample_log):
+    data = parse_sections_file(sample_log)[DATA_SECTION]
+    assert len(data[TIME_COLUMN]) > 1000
+    assert data[TIME_COLUMN][:3].tolist() == [0, 1, 2]
+    assert data['Vout(mv)'][:3].tolist() == [8100, 8278, 8331]
+    assert all(values.dtype == np.int32 for values in data.values())
@@ -0,0 +1,32 @@
+import fitz
+import pytest
+from parse import parse_sections_file
+from test import build_report
+
+def outline(path):
+    with fitz.open(path) as document:
+        toc = document.get_toc()
+        # Номер "N / всего" - последний текст на каждой странице
+        numbers = [" ".join(page.get_text().split()[-3:]) for page in document]
+        return document.page_count, toc, numbers
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_report_has_contents_and_page_numbers(tmp_path, workers, sample_log):
+    path = str(tmp_path / "report.pdf")
+    build_report(parse_sections_file(sample_log), path, workers=workers)
+    pages, toc, numbers = outline(path)
+    assert toc[0] == [1, "Contents", 1]
+    names = [name for _, name, _ in toc]
+    for name in ("Items", "Data", "Battery Test Parameters", "Cycle Summary", "Detailed Analysis Information"):
+        assert name in names
+    assert all(2 <= page <= pages for _, _, page in toc[1:])
+    assert numbers == [f"{n} / {pages}" for n in range(1, pages + 1)]
+
+def test_serial_and_parallel_reports_have_the_same_structure(tmp_path, sample_log):
+    sections = parse_sections_file(sample_log)
+    serial, parallel = str(tmp_path / "serial.pdf"), str(tmp_path / "parallel.pdf")
+    build_report(sections, serial)
+    build_report(sections, parallel, workers=2)
+    serial_toc, parallel_toc = outline(serial)[1], outline(parallel)[1]
+    assert [(level, name) for level, name, _ in serial_toc] == [(level, name) for level, name, _ in parallel_toc]
+    assert serial_toc[1][2] == parallel_toc[1][2] == 2
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from analysis import IncrementalAnalysis, analyze_log
+from parse import DATA_SECTION, parse_items, parse_sections_file
+import tail as tail_module
+from tail import LogTail
+
+def assert_same_cycles(actual, expected):
+    assert len(actual) == len(expected)
+    for got, cycle in zip(actual, expected):
+        for key, value in cycle.items():
+            assert got[key] == pytest.approx(value, rel=1e-9, abs=1e-9), (cycle['number'], key)
+
+def incremental(sections, bounds):
+    analysis = IncrementalAnalysis(parse_items(sections.get("Items", [])))
+    data = sections[DATA_SECTION]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        analysis.update({name: values[start:stop] for name, values in data.items()})
+    return analysis
+
+@pytest.mark.parametrize("splits", [
+    [],
+    [1],
+    [4750, 5000],
+    [4749, 4751, 5001, 9999, 10000],
+    "random",
+])
+def test_incremental_analysis_matches_full_analysis(generated_log, splits):
+    sections = parse_sections_file(generated_log)
+    rows = len(next(iter(sections[DATA_SECTION].values())))
+    if splits == "random":
+        splits = sorted(np.random.default_rng(1).choice(np.arange(1, rows), 40, replace=False).tolist())
+    analysis = incremental(sections, [0] + splits + [rows])
+    expected = analyze_log(sections)
+    assert_same_cycles(analysis.cycle_stats(), expected['cycles'])
+    assert analysis.summary()['total_time'] == expected['total_time']
+
+def test_log_tail_reads_a_growing_file(tmp_path, sample_log):
+    with open(sample_log, 'rb') as file:
+        content = file.read()
+    path = tmp_path / "live.tsv"
+    tail = LogTail(str(path))
+    path.write_bytes(b"")
+    # Куски обрываются посреди строк и заголовков секций
+    for start in range(0, len(content), 7919):
+        with open(path, 'ab') as file:
+            file.write(content[start:start + 7919])
+        tail.poll()
+    assert tail.finished
+    expected = parse_sections_file(sample_log)
+    sections = tail.sections()
+    for name, values in expected[DATA_SECTION].items():
+        assert np.array_equal(sections[DATA_SECTION][name], values)
+    assert_same_cycles(tail.analysis.cycle_stats(), analyze_log(expected)['cycles'])
+
+def test_log_tail_reads_in_bounded_blocks(tmp_path, monkeypatch, sample_log):
+    monkeypatch.setattr(tail_module, "READ_BLOCK", 4096)
+    path = tmp_path / "live.tsv"
+    with open(sample_log, 'rb') as file:
+        path.write_bytes(file.read())
+    reads = []
+    tail = LogTail(str(path))
+
+    def recording_open(*args, **kwargs):
+        file = open(*args, **kwargs)
+        read = file.read
+
+        def bounded(size=-1):
+            reads.append(size)
+            return read(size)
+        file.read = bounded
+        return file
+
+    # open подменяется только внутри модуля tail
+    monkeypatch.setattr(tail_module, "open", recording_open, raising=False)
+    rows, _ = tail.poll()
+    assert rows == len(parse_sections_file(sample_log)[DATA_SECTION]['Vout(mv)'])
+    assert len(reads) > 10 and all(0 < size <= 4096 for size in reads)
+
+def test_log_tail_survives_removed_file(tmp_path, caplog, sample_log):
+    path = tmp_path / "live.tsv"
+    with open(sample_log, 'rb') as file:
+        content = file.read()
+    path.write_bytes(content[:20000])
+    tail = LogTail(str(path))
+    first, _ = tail.poll()
+    path.unlink()
+    assert tail.poll() == (0, [])
+    assert tail.poll() == (0, [])
+    assert caplog.text.count("не найден") == 1
+    # После ротации появился новый, более короткий файл - он читается с начала
+    path.write_bytes(content[:10000])
+    rows, _ = tail.poll()
+    assert 0 < rows < first
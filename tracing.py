@@ -0,0 +1,177 @@
+"""
+Трассировка этапов построения отчёта и поиска ФИПС.
+
+Включается переменными окружения (или configure()):
+    REPORT_TRACE=trace.json        файл трассы
+    REPORT_TRACE_FORMAT=chrome     json (по умолчанию) или chrome - формат trace-event для chrome://tracing
+    REPORT_TRACE_MEMORY=1          замерять пиковую память tracemalloc (замедляет работу в разы)
+    REPORT_PROFILE=report.prof     дамп cProfile за всё время работы процесса
+
+Для каждого этапа пишутся время (стенное и процессорное), число строк и, по запросу, пик памяти.
+В выключенном состоянии stage() и traced() сводятся к одной проверке.
+"""
+import atexit
+import contextlib
+import cProfile
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+
+def _process_path(path):
+    # Рабочие процессы пишут в свой файл: trace.json -> trace.<pid>.json
+    if multiprocessing.parent_process() is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{os.getpid()}{extension}"
+
+class Tracer:
+    """Накопитель записей об этапах одного процесса"""
+
+    def __init__(self, path=None, chrome=False, memory=False, profile=None):
+        self.path = path
+        self.chrome = chrome
+        self.memory = memory
+        self.profile_path = profile
+        self.origin = time.perf_counter()
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.profiler = None
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextlib.contextmanager
+    def stage(self, name, **args):
+        """Замер этапа; в словарь args можно дописать, например, rows"""
+        stack = self._stack()
+        frame = {'peak': 0}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+        stack.append(frame)
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield args
+        finally:
+            wall = time.perf_counter() - started
+            cpu = time.thread_time() - cpu_started
+            stack.pop()
+            event = {
+                'name': name,
+                'start': started - self.origin,
+                'wall': wall,
+                'cpu': cpu,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+            }
+            if self.memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+                event['peak_memory'] = max(peak - frame['base'], 0)
+            event.update(args)
+            with self.lock:
+                self.events.append(event)
+
+    def _chrome_events(self, events):
+        trace = []
+        for event in events:
+            details = {key: value for key, value in event.items()
+                       if key not in ('name', 'start', 'wall', 'pid', 'tid')}
+            trace.append({
+                'name': event['name'], 'ph': "X", 'cat': "report",
+                'ts': round(event['start'] * 1e6, 1), 'dur': round(event['wall'] * 1e6, 1),
+                'pid': event['pid'], 'tid': event['tid'], 'args': details,
+            })
+        return {'traceEvents': trace, 'displayTimeUnit': "ms"}
+
+    def flush(self):
+        """Записывает трассу текущего процесса (файл перезаписывается целиком) и дамп профиля"""
+        pid = os.getpid()
+        with self.lock:
+            events = [event for event in self.events if event['pid'] == pid]
+        if self.path:
+            path = _process_path(self.path)
+            content = self._chrome_events(events) if self.chrome else {'stages': events}
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(content, file, ensure_ascii=False, indent=1)
+            logger.info("Трасса записана в %s (этапов: %d)", path, len(events))
+        if self.profiler:
+            self.profiler.disable()
+            path = _process_path(self.profile_path)
+            self.profiler.dump_stats(path)
+            self.profiler.enable()
+            logger.info("Профиль cProfile записан в %s", path)
+
+def configure(path=None, chrome=False, memory=False, profile=None):
+    """Включает трассировку (path и/или profile); без аргументов выключает"""
+    global _tracer
+    if _tracer is not None and _tracer.profiler:
+        _tracer.profiler.disable()
+    _tracer = Tracer(path, chrome, memory, profile) if (path or profile) else None
+    return _tracer
+
+def configure_from_env():
+    path = os.environ.get("REPORT_TRACE")
+    profile = os.environ.get("REPORT_PROFILE")
+    if not (path or profile):
+        return None
+    return configure(path, os.environ.get("REPORT_TRACE_FORMAT", "json").lower() == "chrome",
+                     os.environ.get("REPORT_TRACE_MEMORY", "0") == "1", profile)
+
+def enabled():
+    return _tracer is not None
+
+def stage(name, **args):
+    """Контекст этапа: with stage("parse") as info: ... info['rows'] = n"""
+    if _tracer is None:
+        return contextlib.nullcontext(args)
+    return _tracer.stage(name, **args)
+
+def traced(name=None, rows=None):
+    """Декоратор этапа; rows(result) - число строк, которое попадёт в трассу"""
+    def decorate(function):
+        stage_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.stage(stage_name) as info:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    try:
+                        info['rows'] = rows(result)
+                    except Exception:
+                        pass
+                return result
+        return wrapper
+    return decorate
+
+def flush():
+    if _tracer is not None:
+        _tracer.flush()
+
+configure_from_env()
+atexit.register(flush)